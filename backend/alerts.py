@@ -0,0 +1,221 @@
+import threading
+import time
+from collections import deque
+
+# Seconds between two alerts of the same kind from the same source
+DEFAULT_COOLDOWNS = {"geofence": 3600}
+
+
+class TwilioTransport:
+    """Send alerts as SMS through a Twilio client"""
+
+    def __init__(self, client, from_number, to_number):
+        self.client = client
+        self.from_number = from_number
+        self.to_number = to_number
+
+    def send(self, body):
+        message = self.client.messages.create(body=body, from_=self.from_number, to=self.to_number)
+        return f"SID: {message.sid}"
+
+
+class FileTransport:
+    """Append alerts to a local file, one per line; for running without network access"""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+
+    def send(self, body):
+        line = body.replace("\n", " | ")
+        with self.lock, open(self.path, "a") as f:
+            f.write(f"{time.strftime('%Y-%m-%d %H:%M:%S')}\t{line}\n")
+        return f"written to {self.path}"
+
+
+class LoopbackTransport:
+    """Keep alerts in memory (see .sent); for tests"""
+
+    def __init__(self):
+        self.sent = []
+
+    def send(self, body):
+        self.sent.append(body)
+        return f"loopback #{len(self.sent)}"
+
+
+def make_transport(name, client=None, from_number=None, to_number=None, path="alerts.log"):
+    """Transport by name: "twilio" (default), "file" or "loopback" """
+    name = (name or "twilio").lower()
+    if name == "file":
+        return FileTransport(path)
+    if name == "loopback":
+        return LoopbackTransport()
+    if name != "twilio":
+        print(f"[WARN] Unknown alert transport {name}, using twilio")
+    return TwilioTransport(client, from_number, to_number)
+
+
+def parse_cooldowns(value, defaults=DEFAULT_COOLDOWNS):
+    """Per-kind cooldowns from ALERT_COOLDOWNS ("geofence=3600,startup=0") on top of the defaults"""
+    cooldowns = dict(defaults)
+    for entry in (value or "").split(","):
+        kind, sep, seconds = entry.partition("=")
+        if not entry.strip():
+            continue
+        try:
+            cooldowns[kind.strip()] = float(seconds)
+        except ValueError:
+            print(f"[WARN] Ignoring ALERT_COOLDOWNS entry: {entry}")
+    return cooldowns
+
+
+class Alert:
+    def __init__(self, kind, message, source, accepted_at):
+        self.kind = kind
+        self.message = message
+        self.source = source
+        self.accepted_at = accepted_at
+
+    @property
+    def key(self):
+        return (self.kind, self.source, self.message)
+
+
+class AlertDispatcher:
+    """Deliver alerts from one background thread so callers never wait on the network.
+
+    submit() only checks the cooldown for (kind, source), skips an alert
+    identical to one already queued, and appends to a bounded queue that drops
+    its oldest alert when full. The worker collects whatever arrives within
+    batch_window into one message and sends it, retrying with exponential
+    backoff. A dropped alert or a failed delivery clears the cooldown it
+    started, so the next alert can try again; a newer alert's cooldown stays. enabled() is checked at delivery time (the SMS on/off setting).
+    Cooldowns are measured with clock(); replay.py passes the log's timestamps.
+    """
+
+    def __init__(self, transport, cooldowns=None, default_cooldown=0, queue_size=100, batch_window=2.0,
+                 max_batch=10, max_retries=3, retry_backoff=1.0, enabled=None, clock=time.monotonic):
+        self.transport = transport
+        self.cooldowns = DEFAULT_COOLDOWNS if cooldowns is None else cooldowns
+        self.default_cooldown = default_cooldown
+        self.queue_size = max(1, int(queue_size))
+        self.batch_window = batch_window
+        self.max_batch = max(1, int(max_batch))
+        self.max_retries = max(0, int(max_retries))
+        self.retry_backoff = retry_backoff
+        self.enabled = enabled or (lambda: True)
+        self.clock = clock
+
+        self.queue = deque()
+        self.pending = set()
+        self.last_accepted = {}  # (kind, source) -> the alert that started its cooldown
+        self.condition = threading.Condition()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.counts = {"accepted": 0, "suppressed": 0, "dropped": 0, "sent": 0, "failed": 0, "disabled": 0}
+
+    def submit(self, kind, message, source=None):
+        """Queue an alert without blocking; False if it was rate limited or a duplicate"""
+        now = self.clock()
+        alert = Alert(kind, message, source, now)
+        with self.condition:
+            last = self.last_accepted.get((kind, source))
+            if alert.key in self.pending or (
+                    last is not None and now - last.accepted_at < self.cooldowns.get(kind, self.default_cooldown)):
+                self.counts["suppressed"] += 1
+                return False
+
+            if len(self.queue) >= self.queue_size:
+                dropped = self.queue.popleft()
+                self.pending.discard(dropped.key)
+                # It was never sent, so it must not hold back the next alert of its kind for a whole cooldown
+                self._release_cooldown(dropped)
+                self.counts["dropped"] += 1
+            self.queue.append(alert)
+            self.pending.add(alert.key)
+            self.last_accepted[(kind, source)] = alert
+            self.counts["accepted"] += 1
+
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="alert-dispatcher", daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+        return True
+
+    def send_now(self, body):
+        """Send one message synchronously, bypassing the queue; returns a description of the outcome"""
+        if not self.enabled():
+            return f"SMS Disabled: {body}"
+        try:
+            return f"SMS sent: {body} ({self.transport.send(body)})"
+        except Exception as e:
+            return f"Failed to send SMS: {e}"
+
+    def _collect(self):
+        """Wait for alerts and return up to max_batch of them, gathered over batch_window"""
+        with self.condition:
+            while not self.queue:
+                if self.stop_event.is_set():
+                    return None
+                self.condition.wait(1.0)
+            deadline = time.monotonic() + self.batch_window
+            while len(self.queue) < self.max_batch and not self.stop_event.is_set():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self.condition.wait(remaining)
+            return [self.queue.popleft() for _ in range(min(self.max_batch, len(self.queue)))]
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            body = "\n".join(alert.message for alert in batch)
+            if not self.enabled():
+                print(f"SMS Disabled: {body}")
+                self._finish(batch, "disabled")
+                continue
+
+            for attempt in range(self.max_retries + 1):
+                try:
+                    result = self.transport.send(body)
+                    print(f"SMS sent: {body} ({result})")
+                    self._finish(batch, "sent")
+                    break
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        print(f"Failed to send SMS after {attempt + 1} attempts: {e}")
+                        self._finish(batch, "failed")
+                    elif self.stop_event.wait(self.retry_backoff * 2 ** attempt):
+                        self._finish(batch, "failed")
+                        break
+
+    def _finish(self, batch, outcome):
+        with self.condition:
+            for alert in batch:
+                self.pending.discard(alert.key)
+                if outcome == "failed":
+                    # Let the next occurrence try again instead of waiting out the cooldown
+                    self._release_cooldown(alert)
+            self.counts[outcome] += len(batch)
+
+    def _release_cooldown(self, alert):
+        """Clear the cooldown for the alert's kind and source if this alert started it (caller holds the lock)"""
+        key = (alert.kind, alert.source)
+        if self.last_accepted.get(key) is alert:
+            del self.last_accepted[key]
+
+    def stats(self):
+        with self.condition:
+            return dict(self.counts, queued=len(self.queue))
+
+    def close(self, timeout=5):
+        """Deliver what is queued (without further retries) and stop the worker"""
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+            thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
@@ -0,0 +1,291 @@
+"""Analyse recorded videos to completion as fast as possible, across a pool of worker processes.
+
+Unlike main.py and the server, nothing is displayed, paced to real time or
+looped. Each video is read once, every --frame-skip-th frame goes through the
+model in batches of --batch, and the detections go through the same tracking,
+counting and zone logic as the live analysis (counting.FrameCounter). Each
+worker process loads the model once and takes whole videos from the queue.
+Every finished video adds one JSON line of summary to --out (default stdout):
+peak and mean counts, per-species breakdown, zone totals and geofence
+events. A video that fails (including when its worker process dies or can't
+load the model) gets a line with an "error" instead. A final JSON line on
+stderr gives the total throughput, and the exit status is 1 if any video
+failed.
+
+Usage: python analyze_batch.py videos/ other.mp4 --workers 4 --out summaries.jsonl
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+
+from config import env_flag
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".mpg", ".mpeg", ".wmv")
+# Events listed per video in the summary (all are counted)
+MAX_EVENTS = 1000
+
+# Set in each worker by init_worker
+worker_model = None
+worker_options = None
+
+
+def find_videos(paths):
+    """(path, name) of the video files in a list of files and directories (searched recursively), in a stable order.
+
+    name is the path relative to the directory it was found in (just the file
+    name for files listed directly), without the extension. It names the
+    video's detection log, so a numeric suffix keeps it unique.
+    """
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                videos.extend((os.path.join(root, name), os.path.relpath(os.path.join(root, name), path))
+                              for name in sorted(files) if name.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            videos.append((path, os.path.basename(path)))
+
+    named = []
+    used = set()
+    for path, relative in videos:
+        name = base = os.path.splitext(relative)[0]
+        suffix = 1
+        while name in used:
+            suffix += 1
+            name = f"{base}-{suffix}"
+        used.add(name)
+        named.append((path, name))
+    return named
+
+
+def init_worker(options, threads):
+    global worker_model, worker_options
+    import torch
+    from backends import load_model
+
+    if threads:
+        # Workers share the CPU; without this each would start one thread per core
+        torch.set_num_threads(threads)
+    worker_options = options
+    worker_model = load_model(options["weights"], options["backend"], options["imgsz"], options["int8"],
+                              options["cache_dir"], options["int8_data"])
+
+
+def analyse_video(path, name):
+    """Summary dict for one video, run with the worker's model"""
+    try:
+        return _analyse_video(path, name, worker_model, worker_options)
+    except Exception as e:
+        return {"video": path, "error": str(e)}
+
+
+def _analyse_video(path, name, model, options):
+    from counting import FrameCounter
+    from detlog import DetectionLogWriter
+    from postprocess import extract_detections
+    from tracking import CameraTracker
+    from zones import default_zones, parse_zones
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError("could not open video")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    frame_skip = options["frame_skip"]
+
+    zones = parse_zones(options["zones"]) if options["zones"] else default_zones(options["geofence_line_y"])
+    counter = FrameCounter(model.names, zones, options["id_lifetime_frames"])
+    tracker = CameraTracker(frame_rate=fps / frame_skip)
+    detection_log = None
+
+    started = time.monotonic()
+    decoded = analysed = 0
+    fish_sum = peak = 0
+    species_sum, species_peak = {}, {}
+    events, event_count = [], 0
+
+    def process(frame_indices, frames):
+        nonlocal detection_log, analysed, fish_sum, peak, event_count
+        results = model.predict(frames, conf=options["conf"], iou=options["iou"], imgsz=options["imgsz"],
+                                verbose=False)
+        for frame_index, frame, result in zip(frame_indices, frames, results):
+            detections = extract_detections(tracker.update(result))
+            species_count, crossed_zones = counter.update(frame_index, detections, frame.shape)
+            if options["detection_log_dir"]:
+                if detection_log is None:
+                    # Laid out like the input directories, so videos with the same file name don't collide
+                    log_path = os.path.join(options["detection_log_dir"], f"{name}.dlog")
+                    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+                    detection_log = DetectionLogWriter(log_path, model.names, frame.shape, name, path, zones)
+                detection_log.write(frame_index, detections, frame_index / fps)
+
+            analysed += 1
+            fish_sum += counter.total_fish
+            peak = max(peak, counter.total_fish)
+            for species, count in species_count.items():
+                species_sum[species] = species_sum.get(species, 0) + count
+                species_peak[species] = max(species_peak.get(species, 0), count)
+            if crossed_zones:
+                event_count += 1
+                if len(events) < MAX_EVENTS:
+                    events.append({"frame": frame_index, "time_s": round(frame_index / fps, 3),
+                                   "zones": crossed_zones})
+
+    try:
+        frame_indices, frames = [], []
+        while True:
+            # Skipped frames are only grabbed, not decoded into an image
+            if decoded % frame_skip:
+                if not cap.grab():
+                    break
+                decoded += 1
+                continue
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frame_indices.append(decoded)
+            frames.append(frame)
+            decoded += 1
+            if len(frames) >= options["batch"]:
+                process(frame_indices, frames)
+                frame_indices, frames = [], []
+        if frames:
+            process(frame_indices, frames)
+    finally:
+        cap.release()
+        if detection_log is not None:
+            detection_log.close()
+
+    elapsed = time.monotonic() - started
+    unique_species = counter.unique_species_count()
+    return {
+        "video": path,
+        "frames_decoded": decoded,
+        "frames_analysed": analysed,
+        "duration_s": round(decoded / fps, 2),
+        "elapsed_s": round(elapsed, 2),
+        "fps": round(decoded / elapsed, 1) if elapsed > 0 else None,
+        "peak_fish": peak,
+        "mean_fish": round(fish_sum / analysed, 3) if analysed else 0,
+        "unique_fish_total": counter.tracks.unique_total,
+        "species": {
+            species: {
+                "mean": round(species_sum.get(species, 0) / analysed, 3) if analysed else 0,
+                "peak": species_peak.get(species, 0),
+                "unique": unique_species.get(species, 0),
+            }
+            for species in sorted(set(species_sum) | set(unique_species))
+        },
+        "zones": counter.zone_engine.snapshot(),
+        "geofence_events": event_count,
+        "events": events,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("inputs", nargs="+", help="video files and/or directories")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--threads", type=int, default=0, help="torch threads per worker (default: cores / workers)")
+    parser.add_argument("--out", help="write summaries as JSON lines to this file (default stdout)")
+    parser.add_argument("--weights", default=os.getenv("PT_FILE"))
+    parser.add_argument("--backend", default=os.getenv("INFERENCE_BACKEND", "pytorch").lower())
+    parser.add_argument("--int8", action="store_true",
+                        default=env_flag("INFERENCE_INT8"))
+    parser.add_argument("--imgsz", type=int, default=int(os.getenv("INFERENCE_IMGSZ", 640)))
+    parser.add_argument("--cache-dir", default=os.getenv("MODEL_CACHE_DIR", "model_cache"))
+    parser.add_argument("--int8-data", default=os.getenv("INT8_DATA"))
+    parser.add_argument("--batch", type=int, default=int(os.getenv("INFER_BATCH_SIZE", 4)))
+    parser.add_argument("--frame-skip", type=int, default=1, help="analyse every Nth frame")
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--iou", type=float, default=0.5)
+    parser.add_argument("--zones", default=os.getenv("GEOFENCE_ZONES"),
+                        help="GEOFENCE_ZONES-style inline JSON or file; its \"*\" entry is used")
+    parser.add_argument("--lifetime", type=int, default=30, help="frames an unseen track ID stays counted")
+    parser.add_argument("--detection-log-dir", help="also write a .dlog per video for replay.py")
+    args = parser.parse_args()
+
+    from zones import load_zone_config, parse_zones
+
+    videos = find_videos(args.inputs)
+    if not videos:
+        sys.exit("No videos found")
+    zones = load_zone_config(args.zones).get("*")
+    if zones:
+        try:
+            parse_zones(zones)
+        except ValueError as e:
+            sys.exit(f"Invalid zones: {e}")
+
+    options = {
+        "weights": args.weights, "backend": args.backend, "imgsz": args.imgsz, "int8": args.int8,
+        "cache_dir": args.cache_dir, "int8_data": args.int8_data, "batch": max(1, args.batch),
+        "frame_skip": max(1, args.frame_skip), "conf": args.conf, "iou": args.iou, "zones": zones,
+        "geofence_line_y": 50, "id_lifetime_frames": args.lifetime, "detection_log_dir": args.detection_log_dir,
+    }
+    workers = max(1, min(args.workers, len(videos)))
+    threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+    out = open(args.out, "w") if args.out else sys.stdout
+    started = time.monotonic()
+    summaries = []
+
+    def emit(summary):
+        summaries.append(summary)
+        out.write(json.dumps(summary) + "\n")
+        out.flush()
+        status = summary.get("error") or f"{summary['frames_decoded']} frames at {summary['fps']} fps"
+        print(f"[INFO] {len(summaries)}/{len(videos)} {summary['video']}: {status}", file=sys.stderr)
+
+    try:
+        if workers == 1:
+            try:
+                init_worker(options, threads)
+            except Exception as e:
+                for video, _ in videos:
+                    emit({"video": video, "error": f"could not load the model: {e}"})
+            else:
+                for video, name in videos:
+                    emit(analyse_video(video, name))
+        else:
+            # spawn, not fork: torch's thread pools don't survive a fork
+            with ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=init_worker, initargs=(options, threads)) as pool:
+                futures = {pool.submit(analyse_video, video, name): video for video, name in videos}
+                for future in as_completed(futures):
+                    try:
+                        emit(future.result())
+                    except BrokenProcessPool as e:
+                        # A worker died or its initializer failed (e.g. the model didn't load); every video
+                        # still queued fails the same way, and the ones already finished are kept
+                        emit({"video": futures[future], "error": f"worker process failed: {e}"})
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    elapsed = time.monotonic() - started
+    done = [s for s in summaries if "error" not in s]
+    frames = sum(s["frames_decoded"] for s in done)
+    duration = sum(s["duration_s"] for s in done)
+    failed = len(summaries) - len(done)
+    # On stderr, so stdout only carries the per-video summaries
+    print(json.dumps({
+        "videos": len(videos),
+        "failed": failed,
+        "workers": workers,
+        "frames": frames,
+        "elapsed_s": round(elapsed, 2),
+        "fps": round(frames / elapsed, 1) if elapsed > 0 else None,
+        "realtime_factor": round(duration / elapsed, 2) if elapsed > 0 else None,
+    }), file=sys.stderr)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
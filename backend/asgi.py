@@ -0,0 +1,109 @@
+"""ASGI entry point for high-concurrency streaming.
+
+The streaming routes (/video_feed, /video_feed.mp4, /annotated_feed,
+/analyze_stream and their /cameras/<camera_id>/... counterparts) run as async
+generators on the event loop, so idle SSE and video clients cost no OS thread. Every other route
+(/status, /settings, /start_analysis, /cameras, ...) is served by the same
+Flask app through a WSGI adapter.
+
+Run with: python asgi.py   (or: uvicorn asgi:asgi_app --host 0.0.0.0 --port 5000)
+"""
+import os
+
+import uvicorn
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Mount, Route
+
+import server
+from broadcast import SSE_KEEPALIVE
+from fmp4 import ffmpeg_available
+
+MJPEG_MEDIA_TYPE = 'multipart/x-mixed-replace; boundary=frame'
+STREAM_HEADERS = {"Access-Control-Allow-Origin": "*", "Cache-Control": "no-cache"}
+SSE_KEEPALIVE_INTERVAL = 15.0
+
+
+def lookup_camera(request):
+    """The camera named in the path, or the default one for the original single-feed routes"""
+    return server.lookup_camera(request.path_params.get("camera_id"))
+
+
+def unknown_camera(request):
+    camera_id = request.path_params.get("camera_id", server.DEFAULT_CAMERA_ID)
+    return JSONResponse({"error": f"Unknown camera: {camera_id}"}, status_code=404, headers=STREAM_HEADERS)
+
+
+async def video_feed(request):
+    """Stream plain video frames without annotations"""
+    camera = lookup_camera(request)
+    if camera is None:
+        return unknown_camera(request)
+
+    return StreamingResponse(camera.video_feed_hub.subscribe_async(),
+                             media_type=MJPEG_MEDIA_TYPE, headers=STREAM_HEADERS)
+
+
+async def video_feed_mp4(request):
+    """Stream the plain video as H.264 in fragmented MP4, encoded once for all viewers"""
+    camera = lookup_camera(request)
+    if camera is None:
+        return unknown_camera(request)
+    if not ffmpeg_available(server.FFMPEG_BIN):
+        return JSONResponse({"error": f"{server.FFMPEG_BIN} not found; the MP4 feed needs ffmpeg with libx264"},
+                            status_code=503, headers=STREAM_HEADERS)
+
+    # Joins at the newest fragment, which starts with a keyframe
+    return StreamingResponse(camera.mp4_feed_hub.subscribe_async(replay_latest=True),
+                             media_type="video/mp4", headers=STREAM_HEADERS)
+
+
+async def annotated_feed(request):
+    """Stream the analysed frames with boxes, IDs, species labels and counts drawn on"""
+    if server.model_loader.failed():
+        return JSONResponse({"error": "Model not loaded."}, status_code=500, headers=STREAM_HEADERS)
+    camera = lookup_camera(request)
+    if camera is None:
+        return unknown_camera(request)
+
+    # Queued until the model is ready if it is still loading
+    server.request_start(camera, "/annotated_feed")
+    return StreamingResponse(camera.annotated_feed_hub.subscribe_async(),
+                             media_type=MJPEG_MEDIA_TYPE, headers=STREAM_HEADERS)
+
+
+async def analyze_stream(request):
+    """Stream analysis results as Server-Sent Events"""
+    print("[SSE] /analyze_stream endpoint HIT")
+    if server.model_loader.failed():
+        return JSONResponse({"error": "Model not loaded."}, status_code=500, headers=STREAM_HEADERS)
+    camera = lookup_camera(request)
+    if camera is None:
+        return unknown_camera(request)
+
+    server.request_start(camera, "/analyze_stream")
+    # No producer to watch here, so the subscriber only needs to wake for keepalives
+    stream = camera.analysis_hub.subscribe_async(timeout=SSE_KEEPALIVE_INTERVAL, replay_latest=True,
+                                                 keepalive=SSE_KEEPALIVE,
+                                                 keepalive_interval=SSE_KEEPALIVE_INTERVAL)
+    return StreamingResponse(stream, media_type="text/event-stream", headers=STREAM_HEADERS)
+
+
+asgi_app = Starlette(routes=[
+    Route('/video_feed', video_feed, methods=["GET"]),
+    Route('/video_feed.mp4', video_feed_mp4, methods=["GET"]),
+    Route('/annotated_feed', annotated_feed, methods=["GET"]),
+    Route('/analyze_stream', analyze_stream, methods=["GET"]),
+    Route('/cameras/{camera_id}/video_feed', video_feed, methods=["GET"]),
+    Route('/cameras/{camera_id}/video_feed.mp4', video_feed_mp4, methods=["GET"]),
+    Route('/cameras/{camera_id}/annotated_feed', annotated_feed, methods=["GET"]),
+    Route('/cameras/{camera_id}/analyze_stream', analyze_stream, methods=["GET"]),
+    Mount('/', app=WSGIMiddleware(server.app)),
+])
+
+if __name__ == '__main__':
+    port = int(os.getenv("PORT", 5000))
+    print(f"[INFO] Starting ASGI server on http://0.0.0.0:{port}")
+    print("[INFO] Analysis will start when /analyze_stream endpoint is accessed")
+    uvicorn.run(asgi_app, host="0.0.0.0", port=port)
@@ -0,0 +1,132 @@
+"""Inference backends for CPU-only nodes.
+
+"pytorch" runs the .pt weights as they are. "onnx" (ONNX Runtime) and
+"openvino" run an exported copy. The export is cached under MODEL_CACHE_DIR,
+keyed by a hash of the .pt file and the input size, so it happens once per
+weights file rather than on every start. Exported models are loaded through
+ultralytics too. predict() and track() behave the same as with the .pt, so
+the shared scheduler, per-camera trackers and main.py need no changes.
+
+INT8: for onnx, the exported graph is dynamically quantised with ONNX
+Runtime (no calibration data needed). For openvino, ultralytics' INT8 export
+needs a calibration dataset (int8_data, a dataset YAML).
+
+onnx needs the onnx and onnxruntime packages and openvino needs openvino.
+They are optional (commented out in requirements.txt); load_model() raises
+ImportError naming the missing package instead of failing mid-export.
+"""
+import hashlib
+import importlib.util
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+BACKENDS = ("pytorch", "onnx", "openvino")
+# Packages each exported backend needs on top of ultralytics
+BACKEND_PACKAGES = {"onnx": ("onnx", "onnxruntime"), "openvino": ("openvino",)}
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """Short SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def cached_export_path(weights, backend, imgsz, int8, cache_dir):
+    """Where the export of these weights for this backend, input size and precision is cached"""
+    stem = os.path.splitext(os.path.basename(weights))[0]
+    key = f"{stem}-{file_hash(weights)}-{imgsz}{'-int8' if int8 else ''}"
+    if backend == "onnx":
+        return os.path.join(cache_dir, f"{key}.onnx")
+    # ultralytics recognises OpenVINO models by this directory suffix
+    return os.path.join(cache_dir, f"{key}_openvino_model")
+
+
+def check_backend_packages(backend):
+    """Raise ImportError if a package the backend needs is not installed"""
+    missing = [name for name in BACKEND_PACKAGES.get(backend, ()) if importlib.util.find_spec(name) is None]
+    if missing:
+        raise ImportError(f"INFERENCE_BACKEND={backend} needs {', '.join(missing)}: pip install {' '.join(missing)}")
+
+
+@contextmanager
+def export_lock(target):
+    """Hold an exclusive lock file next to an export target, so processes export the same model one at a time"""
+    with open(f"{target}.lock", "w") as lock_file:
+        try:
+            import fcntl
+        except ImportError:
+            # No flock (Windows): concurrent exports both run, and the rename below keeps the first
+            yield
+            return
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def export_cached(weights, backend, imgsz=640, int8=False, cache_dir="model_cache", int8_data=None):
+    """Export the .pt weights for a backend unless a cached export exists; returns the export's path"""
+    target = cached_export_path(weights, backend, imgsz, int8, cache_dir)
+    if os.path.exists(target):
+        print(f"[INFO] Using cached {backend} export: {target}")
+        return target
+
+    os.makedirs(cache_dir, exist_ok=True)
+    with export_lock(target):
+        if os.path.exists(target):
+            # Another process exported it while this one waited for the lock
+            print(f"[INFO] Using cached {backend} export: {target}")
+            return target
+        print(f"[INFO] Exporting {weights} for {backend} (imgsz={imgsz}, int8={int8}); this runs once")
+        _export(weights, backend, imgsz, int8, cache_dir, int8_data, target)
+    return target
+
+
+def _export(weights, backend, imgsz, int8, cache_dir, int8_data, target):
+    from ultralytics import YOLO
+
+    # Export from a private copy: ultralytics writes next to the weights, which may be read-only,
+    # and nothing half-written must ever appear at the target
+    workdir = tempfile.mkdtemp(prefix="export-", dir=cache_dir)
+    try:
+        local_weights = os.path.join(workdir, os.path.basename(weights))
+        shutil.copyfile(weights, local_weights)
+        options = {"format": backend, "imgsz": imgsz, "dynamic": True}
+        if backend == "openvino" and int8:
+            options.update(int8=True, data=int8_data)
+        exported = YOLO(local_weights).export(**options)
+
+        if backend == "onnx" and int8:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            quantized = os.path.join(workdir, "quantized.onnx")
+            quantize_dynamic(exported, quantized, weight_type=QuantType.QUInt8)
+            exported = quantized
+
+        try:
+            os.replace(exported, target)
+        except OSError:
+            # A non-empty directory can't be replaced; if another export got there first, use that one
+            if not os.path.exists(target):
+                raise
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def load_model(weights, backend="pytorch", imgsz=640, int8=False, cache_dir="model_cache", int8_data=None):
+    """Load the detector for the chosen backend, exporting (once) if it needs an exported model"""
+    from ultralytics import YOLO
+
+    backend = (backend or "pytorch").lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend}; expected one of {', '.join(BACKENDS)}")
+    if backend == "pytorch":
+        return YOLO(weights)
+    check_backend_packages(backend)
+    return YOLO(export_cached(weights, backend, imgsz, int8, cache_dir, int8_data), task="detect")
@@ -0,0 +1,49 @@
+import time
+
+
+class FrameBatcher:
+    """Collect frames for batched inference until the batch is full or the oldest frame has waited too long"""
+
+    def __init__(self, max_batch_size=4, max_wait_ms=100):
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.frame_indices = []
+        self.frames = []
+        self.first_added_at = None
+
+    def __len__(self):
+        return len(self.frames)
+
+    def add(self, frame_index, frame):
+        """Queue a frame (in decode order) for the next batch"""
+        if not self.frames:
+            self.first_added_at = time.monotonic()
+        self.frame_indices.append(frame_index)
+        self.frames.append(frame)
+
+    def ready(self):
+        """True when the batch is full or its oldest frame has reached the wait limit"""
+        if not self.frames:
+            return False
+        if len(self.frames) >= self.max_batch_size:
+            return True
+        return time.monotonic() - self.first_added_at >= self.max_wait
+
+    def drain(self):
+        """Return (frame_indices, frames) in the order they were added and reset the batch"""
+        frame_indices, frames = self.frame_indices, self.frames
+        self.frame_indices, self.frames = [], []
+        self.first_added_at = None
+        return frame_indices, frames
+
+
+def track_batch(model, frames, conf=0.5, iou=0.5, imgsz=640):
+    """Run one tracked inference call over a list of frames.
+
+    Ultralytics feeds a list source through a single tracker in list order, so
+    track IDs stay consistent with the frame-by-frame behaviour.
+    """
+    if not frames:
+        return []
+    source = frames if len(frames) > 1 else frames[0]
+    return model.track(source, persist=True, conf=conf, iou=iou, imgsz=imgsz, verbose=False)
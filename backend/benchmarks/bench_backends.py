@@ -0,0 +1,130 @@
+"""Compare inference backends on CPU: throughput and agreement with the PyTorch weights.
+
+Frames are read from a video (every --stride-th frame, up to --frames) and
+run through each backend with the server's batch size. Load time covers the
+export on a cold cache and only the load on a warm one. Agreement matches each
+frame's boxes to the PyTorch boxes greedily, by IoU >= --match-iou within the
+same class. It reports the fraction of PyTorch boxes matched (recall), the
+fraction of backend boxes matched (precision) and the mean IoU of the matches.
+The script prints one JSON line per backend.
+
+Usage: python benchmarks/bench_backends.py --video video.mp4 --backends pytorch,onnx,onnx-int8,openvino
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backends import load_model
+from postprocess import extract_detections
+
+
+def read_frames(video, count, stride):
+    cap = cv2.VideoCapture(video)
+    frames = []
+    index = 0
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if index % stride == 0:
+            frames.append(frame)
+        index += 1
+    cap.release()
+    return frames
+
+
+def box_iou(a, b):
+    """(N, M) IoU matrix between two sets of xyxy boxes"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return intersection / (area_a[:, None] + area_b[None, :] - intersection + 1e-9)
+
+
+def match(reference, candidate, min_iou):
+    """Greedy same-class matching; returns (matched pairs, their IoUs)"""
+    if len(reference) == 0 or len(candidate) == 0:
+        return 0, []
+    iou = box_iou(reference.xyxy, candidate.xyxy)
+    iou[reference.cls[:, None] != candidate.cls[None, :]] = 0
+    ious = []
+    while True:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[i, j] < min_iou:
+            break
+        ious.append(float(iou[i, j]))
+        iou[i, :] = 0
+        iou[:, j] = 0
+    return len(ious), ious
+
+
+def run_backend(name, args, frames):
+    backend, _, precision = name.partition("-")
+    started = time.monotonic()
+    model = load_model(args.weights, backend, args.imgsz, precision == "int8", args.cache_dir, args.int8_data)
+    load_s = time.monotonic() - started
+
+    predict = dict(conf=args.conf, iou=0.5, imgsz=args.imgsz, verbose=False)
+    model.predict(frames[:args.batch], **predict)  # warm-up
+
+    detections = []
+    started = time.monotonic()
+    for i in range(0, len(frames), args.batch):
+        detections.extend(extract_detections(result) for result in model.predict(frames[i:i + args.batch], **predict))
+    elapsed = time.monotonic() - started
+    return {"backend": name, "load_s": round(load_s, 2), "fps": round(len(frames) / elapsed, 2),
+            "boxes": sum(len(d) for d in detections)}, detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--weights", default=os.getenv("PT_FILE"))
+    parser.add_argument("--video", default=os.getenv("VIDEO_FEED"))
+    parser.add_argument("--backends", default="pytorch,onnx,onnx-int8,openvino")
+    parser.add_argument("--frames", type=int, default=100)
+    parser.add_argument("--stride", type=int, default=2)
+    parser.add_argument("--batch", type=int, default=int(os.getenv("INFER_BATCH_SIZE", 4)))
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--match-iou", type=float, default=0.5)
+    parser.add_argument("--cache-dir", default=os.getenv("MODEL_CACHE_DIR", "model_cache"))
+    parser.add_argument("--int8-data", default=os.getenv("INT8_DATA"))
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.frames, args.stride)
+    if not frames:
+        sys.exit(f"No frames read from {args.video}")
+
+    baseline = None
+    for name in ["pytorch"] + [b for b in args.backends.split(",") if b and b != "pytorch"]:
+        try:
+            result, detections = run_backend(name, args, frames)
+        except Exception as e:
+            print(json.dumps({"backend": name, "error": str(e)}), flush=True)
+            continue
+        if name == "pytorch":
+            baseline = detections
+        elif baseline is not None:
+            matched = [match(ref, det, args.match_iou) for ref, det in zip(baseline, detections)]
+            n_matched = sum(n for n, _ in matched)
+            ious = [iou for _, frame_ious in matched for iou in frame_ious]
+            reference_boxes = sum(len(d) for d in baseline)
+            result.update({
+                "recall_vs_pytorch": round(n_matched / reference_boxes, 4) if reference_boxes else None,
+                "precision_vs_pytorch": round(n_matched / result["boxes"], 4) if result["boxes"] else None,
+                "mean_iou": round(float(np.mean(ious)), 4) if ious else None,
+            })
+        print(json.dumps(result), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,310 @@
+"""Benchmark the analysis loop stage by stage on synthetic video, with the real model or a stub detector.
+
+Synthetic clips are generated (and cached in --video-dir) for each resolution
+and object count: ellipses drifting and bouncing over a textured background.
+Each case then runs in a fresh child process, so memory high-water marks
+don't carry over. The child runs the per-frame stages of Camera.run_analysis
+in sequence: decode, motion gate, inference, tracking, counting (extract
+detections and FrameCounter), annotate (overlays and JPEG encoding, as for
+an /annotated_feed viewer), and publish (the SSE snapshot). Each stage is
+timed per frame. The stub detector finds the ellipses by thresholding a
+downscaled frame. It is deterministic and cheap, so stub runs show the
+overhead outside inference on its own.
+
+With --frame-skip N only every Nth frame is decoded and analysed, and the
+others are only grabbed, as in the decode stage. fps always counts source
+frames, so it says how much video a second of analysis covers.
+With --tiles N inference runs through TiledDetector with up to N crops of
+--imgsz per frame, as with TILED_INFERENCE, so tiled and whole-frame runs can
+be compared.
+
+Each case prints one JSON line: fps, per-stage mean/p50/p95/p99 in ms, and
+the peak RSS. With --out the lines also go to a file. --compare reads such a
+file from an earlier release and adds the fps ratio and the p95 change per
+stage for matching cases.
+
+Usage: python benchmarks/bench_pipeline.py --detectors stub,model --resolutions 1280x720,1920x1080 --objects 5,20
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STAGES = ("decode", "motion", "inference", "tracking", "counting", "annotate", "publish")
+STUB_NAMES = {0: "tilapia", 1: "catfish", 2: "carp"}
+
+
+def make_video(path, width, height, frames, objects, fps=30, seed=0):
+    """Write a clip of `objects` ellipses moving at constant speed and bouncing off the edges"""
+    rng = np.random.default_rng(seed)
+    background = cv2.GaussianBlur(rng.integers(40, 90, (height, width, 3), dtype=np.uint8), (0, 0), 5)
+    size = np.column_stack([rng.uniform(0.02, 0.05, objects) * width, rng.uniform(0.015, 0.03, objects) * height])
+    position = rng.uniform(0.1, 0.9, (objects, 2)) * (width, height)
+    velocity = rng.uniform(-0.004, 0.004, (objects, 2)) * (width, height)
+    colors = rng.integers(150, 255, (objects, 3)).tolist()
+
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+    for _ in range(frames):
+        frame = background.copy()
+        for (x, y), (a, b), color in zip(position.tolist(), size.tolist(), colors):
+            cv2.ellipse(frame, (int(x), int(y)), (int(a), int(b)), 0, 0, 360, color, -1)
+        writer.write(frame)
+        position += velocity
+        for axis, limit in ((0, width), (1, height)):
+            bounce = (position[:, axis] < size[:, axis]) | (position[:, axis] > limit - size[:, axis])
+            velocity[bounce, axis] *= -1
+            position[:, axis] = np.clip(position[:, axis], size[:, axis], limit - size[:, axis])
+    writer.release()
+
+
+class StubDetector:
+    """Stands in for the YOLO model: boxes around bright blobs, found on a 320-wide copy of the frame"""
+
+    names = STUB_NAMES
+
+    def __init__(self, width=320):
+        self.width = width
+
+    def _detect(self, frame):
+        import torch
+        from ultralytics.engine.results import Results
+
+        height, width = frame.shape[:2]
+        scale = width / self.width
+        small = cv2.resize(frame, (self.width, max(1, round(height / scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        _, mask = cv2.threshold(gray, 120, 255, cv2.THRESH_BINARY)
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(mask)
+        # The class comes from the blob's brightness, so a fish keeps it in every crop and frame
+        boxes = [[x * scale, y * scale, (x + w) * scale, (y + h) * scale, 0.9,
+                  int(np.median(gray[labels == label])) // 32 % len(self.names)]
+                 for label, (x, y, w, h, area) in enumerate(stats.tolist()) if label and area >= 4]
+        data = torch.tensor(boxes, dtype=torch.float32) if boxes else torch.zeros((0, 6))
+        return Results(frame, path="", names=self.names, boxes=data)
+
+    def predict(self, frames, conf=0.5, iou=0.5, imgsz=None, verbose=False):
+        return [self._detect(frame) for frame in frames]
+
+
+def percentiles(samples):
+    values = np.asarray(samples) * 1000
+    if len(values) == 0:
+        return None
+    return {
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+    }
+
+
+def run_case(case):
+    """Child process: run the analysis stages over one clip and return the result dict"""
+    from cameras import Camera, CameraRegistry
+    from counting import FrameCounter
+    from motion import MotionGate
+    from overlay import draw_counts, draw_detection, draw_zones, resize_for_display
+    from postprocess import extract_detections
+    from tracking import CameraTracker
+    from zones import default_zones
+
+    if case["detector"] == "stub":
+        model = StubDetector()
+    else:
+        from backends import load_model
+        model = load_model(case["weights"], case["backend"], case["imgsz"], False, case["cache_dir"], None)
+    if case["tiles"]:
+        from tiling import TiledDetector
+        model = TiledDetector(model, case["imgsz"], 0.2, case["tiles"])
+
+    cap = cv2.VideoCapture(case["video"])
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30
+    camera = Camera("bench", case["video"], CameraRegistry(model, None))
+    counter = FrameCounter(model.names, default_zones(case["height"] // 2))
+    tracker = CameraTracker(frame_rate=fps)
+    gate = MotionGate(enabled=case["motion_gate"])
+    timings = {stage: [] for stage in STAGES}
+    batch, last_result, boxes = case["batch"], None, 0
+    predict = dict(conf=0.5, iou=0.5, imgsz=case["imgsz"], verbose=False)
+    model.predict([np.zeros((case["imgsz"], case["imgsz"], 3), dtype=np.uint8)], **predict)  # warm-up
+
+    def timed(stage, started):
+        now = time.perf_counter()
+        timings[stage].append(now - started)
+        return now
+
+    def process(items):
+        nonlocal last_result, boxes
+        started = time.perf_counter()
+        inferred = [frame for _, frame, infer in items if infer]
+        results = iter(model.predict(inferred, **predict) if inferred else [])
+        if inferred:
+            # One batched call; its time is shared across the frames it covered
+            elapsed = time.perf_counter() - started
+            timings["inference"].extend([elapsed / len(inferred)] * len(inferred))
+
+        for frame_index, frame, infer in items:
+            started = time.perf_counter()
+            if infer:
+                last_result = tracker.update(next(results))
+                started = timed("tracking", started)
+            detections = extract_detections(last_result)
+            boxes += len(detections)
+            species_count, crossed_zones = counter.update(frame_index, detections, frame.shape)
+            started = timed("counting", started)
+
+            if case["annotate"]:
+                draw_zones(frame, counter.zone_engine.zones)
+                for (x1, y1, x2, y2), object_id, class_id in zip(detections.xyxy.tolist(), detections.ids.tolist(),
+                                                                 detections.cls.tolist()):
+                    draw_detection(frame, x1, y1, x2, y2, object_id if object_id >= 0 else None,
+                                   model.names.get(class_id, "Unknown"))
+                draw_counts(frame, counter.total_fish, species_count)
+                cv2.imencode(".jpg", resize_for_display(frame))
+                started = timed("annotate", started)
+
+            camera.update_analysis_results(counter.total_fish, species_count, counter.tracks.active_ids(),
+                                           bool(crossed_zones), frame_index,
+                                           unique_fish_total=counter.tracks.unique_total,
+                                           unique_species_count=counter.unique_species_count(),
+                                           zones=counter.zone_engine.snapshot())
+            timed("publish", started)
+
+    started_run = time.perf_counter()
+    items, frames = [], 0
+    while True:
+        started = time.perf_counter()
+        if frames % case["frame_skip"]:
+            # Skipped frames are only grabbed, never decoded into an image
+            ret, frame = cap.grab(), None
+        else:
+            ret, frame = cap.read()
+        if not ret:
+            break
+        started = timed("decode", started)
+        frames += 1
+        if frame is None:
+            continue
+        infer = gate.should_infer(frame) or last_result is None
+        timed("motion", started)
+        items.append((frames - 1, frame, infer))
+        if len(items) >= batch:
+            process(items)
+            items = []
+    if items:
+        process(items)
+    elapsed = time.perf_counter() - started_run
+    cap.release()
+
+    return {
+        "detector": case["detector"],
+        "resolution": f"{case['width']}x{case['height']}",
+        "objects": case["objects"],
+        "frames": frames,
+        "batch": batch,
+        "frame_skip": case["frame_skip"],
+        "tiles": case["tiles"],
+        "motion_gate": case["motion_gate"],
+        "annotate": case["annotate"],
+        "fps": round(frames / elapsed, 2),
+        "boxes_per_frame": round(boxes / frames, 2) if frames else 0,
+        "unique_fish_total": counter.tracks.unique_total,
+        "stages": {stage: percentiles(samples) for stage, samples in timings.items() if samples},
+        # ru_maxrss is in kilobytes on Linux
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def compare(result, baseline):
+    """Add fps ratio and per-stage p95 change against a matching baseline result"""
+    result["vs_baseline"] = {
+        "fps_ratio": round(result["fps"] / baseline["fps"], 3) if baseline.get("fps") else None,
+        "p95_change_ms": {
+            stage: round(stats["p95_ms"] - baseline["stages"][stage]["p95_ms"], 3)
+            for stage, stats in result["stages"].items()
+            if stats and (baseline.get("stages") or {}).get(stage)
+        },
+    }
+
+
+def case_key(result):
+    return (result["detector"], result["resolution"], result["objects"], result["batch"],
+            result.get("frame_skip", 1), result.get("tiles", 0), result["motion_gate"], result["annotate"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--detectors", default="stub,model", help="stub and/or model")
+    parser.add_argument("--resolutions", default="1280x720,1920x1080")
+    parser.add_argument("--objects", default="5,20", help="moving objects per clip")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--batch", type=int, default=int(os.getenv("INFER_BATCH_SIZE", 4)))
+    parser.add_argument("--frame-skip", type=int, default=1, help="analyse every Nth frame, grab the rest")
+    parser.add_argument("--tiles", type=int, default=0, help="tiled inference with up to N crops per frame")
+    parser.add_argument("--motion-gate", action="store_true", help="reuse detections on static frames")
+    parser.add_argument("--no-annotate", action="store_true", help="skip the overlay and JPEG stage")
+    parser.add_argument("--weights", default=os.getenv("PT_FILE"))
+    parser.add_argument("--backend", default=os.getenv("INFERENCE_BACKEND", "pytorch").lower())
+    parser.add_argument("--imgsz", type=int, default=int(os.getenv("INFERENCE_IMGSZ", 640)))
+    parser.add_argument("--cache-dir", default=os.getenv("MODEL_CACHE_DIR", "model_cache"))
+    parser.add_argument("--video-dir", default="bench_videos")
+    parser.add_argument("--out", help="also write the JSON lines to this file")
+    parser.add_argument("--compare", help="JSON lines from an earlier run to compare against")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case(json.loads(args.child))), flush=True)
+        return
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = {case_key(result): result for result in map(json.loads, f) if "error" not in result}
+
+    os.makedirs(args.video_dir, exist_ok=True)
+    out = open(args.out, "w") if args.out else None
+    try:
+        for resolution in args.resolutions.split(","):
+            width, height = map(int, resolution.lower().split("x"))
+            for objects in map(int, args.objects.split(",")):
+                video = os.path.join(args.video_dir, f"synthetic-{width}x{height}-{objects}-{args.frames}.mp4")
+                if not os.path.exists(video):
+                    make_video(video, width, height, args.frames, objects)
+                for detector in args.detectors.split(","):
+                    case = {
+                        "detector": detector, "video": video, "width": width, "height": height,
+                        "objects": objects, "batch": max(1, args.batch), "frame_skip": max(1, args.frame_skip),
+                        "tiles": max(0, args.tiles), "motion_gate": args.motion_gate,
+                        "annotate": not args.no_annotate, "weights": args.weights, "backend": args.backend,
+                        "imgsz": args.imgsz, "cache_dir": args.cache_dir,
+                    }
+                    child = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", json.dumps(case)],
+                                           capture_output=True, text=True)
+                    lines = [line for line in child.stdout.splitlines() if line.startswith("{")]
+                    if child.returncode != 0 or not lines:
+                        result = {"detector": detector, "resolution": resolution, "objects": objects,
+                                  "error": (child.stderr.strip().splitlines() or ["failed"])[-1]}
+                    else:
+                        result = json.loads(lines[-1])
+                        if case_key(result) in baseline:
+                            compare(result, baseline[case_key(result)])
+                    line = json.dumps(result)
+                    print(line, flush=True)
+                    if out:
+                        out.write(line + "\n")
+    finally:
+        if out:
+            out.close()
+
+
+if __name__ == '__main__':
+    main()
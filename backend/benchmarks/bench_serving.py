@@ -0,0 +1,143 @@
+"""Compare the threaded Flask server with the ASGI server under many idle stream clients.
+
+For each mode the server runs in-process on a local port and the analysis is
+started. N raw sockets then open /analyze_stream or /video_feed and never
+read, like dashboards left open in background tabs. One probe client counts
+SSE updates, which is the number of frames the analysis loop finished. The
+script prints one JSON line per mode: analysed fps with and without the idle
+clients, the process thread count and the RSS.
+
+Usage: python benchmarks/bench_serving.py --mode both --clients 500 --duration 20
+"""
+import argparse
+import json
+import os
+import resource
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from metrics import process_rss_bytes
+
+
+def start_threaded(port):
+    from werkzeug.serving import make_server
+
+    import server
+    httpd = make_server("127.0.0.1", port, server.app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd.shutdown
+
+
+def start_asgi(port):
+    import uvicorn
+
+    from asgi import asgi_app
+    config = uvicorn.Config(asgi_app, host="127.0.0.1", port=port, log_level="warning",
+                            backlog=4096, timeout_keep_alive=3600)
+    uv_server = uvicorn.Server(config)
+    threading.Thread(target=uv_server.run, daemon=True).start()
+    while not uv_server.started:
+        time.sleep(0.05)
+
+    def shutdown():
+        uv_server.should_exit = True
+    return shutdown
+
+
+def open_idle_client(port, path):
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+    return sock
+
+
+def probe_fps(port, duration):
+    """Count SSE data events (one per analysed frame) on a reading client"""
+    sock = socket.create_connection(("127.0.0.1", port))
+    sock.sendall(b"GET /analyze_stream HTTP/1.1\r\nHost: localhost\r\n\r\n")
+    sock.settimeout(1.0)
+    events, pending = 0, b""
+    # Let the first (replayed) snapshot through before timing
+    started = None
+    deadline = time.monotonic() + duration + 30
+    while time.monotonic() < deadline:
+        try:
+            chunk = sock.recv(65536)
+        except socket.timeout:
+            continue
+        if not chunk:
+            break
+        pending += chunk
+        *messages, pending = pending.split(b"\n\n")
+        count = sum(1 for message in messages if b"data: " in message)
+        if started is None:
+            if count:
+                started = time.monotonic()
+                deadline = started + duration
+            continue
+        events += count
+    sock.close()
+    elapsed = time.monotonic() - started if started else duration
+    return events / elapsed if elapsed > 0 else 0.0
+
+
+def run_mode(mode, port, clients, duration):
+    shutdown = start_threaded(port) if mode == "threaded" else start_asgi(port)
+    import server
+    server.start_analysis_thread()
+    time.sleep(3)  # warm-up
+
+    baseline_fps = probe_fps(port, duration)
+
+    sockets = []
+    for i in range(clients):
+        path = "/analyze_stream" if i % 2 == 0 else "/video_feed"
+        sockets.append(open_idle_client(port, path))
+    time.sleep(2)
+    loaded_fps = probe_fps(port, duration)
+
+    rss = process_rss_bytes()
+    result = {
+        "mode": mode,
+        "idle_clients": clients,
+        "analysed_fps_no_clients": round(baseline_fps, 2),
+        "analysed_fps_with_clients": round(loaded_fps, 2),
+        "threads": threading.active_count(),
+        "rss_mb": round(rss / 2 ** 20, 1) if rss is not None else None,
+    }
+
+    for sock in sockets:
+        sock.close()
+    server.stop_analysis_thread()
+    shutdown()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=["threaded", "asgi", "both"], default="both")
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--port", type=int, default=5099)
+    args = parser.parse_args()
+
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, args.clients * 4 + 256)), hard))
+
+    if args.mode == "both":
+        # Each mode gets a fresh process so threads and memory don't carry over
+        for offset, mode in enumerate(["threaded", "asgi"]):
+            subprocess.run([sys.executable, os.path.abspath(__file__), "--mode", mode,
+                            "--clients", str(args.clients), "--duration", str(args.duration),
+                            "--port", str(args.port + offset)], check=False)
+        return
+
+    print(json.dumps(run_mode(args.mode, args.port, args.clients, args.duration)), flush=True)
+
+
+if __name__ == '__main__':
+    main()
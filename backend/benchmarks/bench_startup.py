@@ -0,0 +1,78 @@
+"""Measure server cold start and first-frame latency.
+
+Each run is a fresh Python process, so nothing is cached in memory. The
+parent notes the wall time just before spawning it. The child imports
+server, requests / and POSTs /start_analysis straight away. It then records
+when /status first reports the model as loaded and when the first analysed
+frame is published. The first frame is the second update after the start:
+the first update is the "running" snapshot. Times are seconds from process
+spawn. The script prints one JSON line per run.
+
+Usage: python benchmarks/bench_startup.py --runs 3
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def measure(spawned_at, timeout):
+    def since_spawn():
+        return round(time.time() - spawned_at, 3)
+
+    import server
+    imported = since_spawn()
+
+    client = server.app.test_client()
+    client.get("/")
+    http_ready = since_spawn()
+
+    camera = server.lookup_camera()
+    start_sequence, _ = camera.analysis_hub.latest()
+    start_response = client.post("/start_analysis")
+
+    model_ready = first_frame = None
+    sequence = start_sequence
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline and first_frame is None:
+        if model_ready is None and client.get("/status").get_json().get("model_loaded"):
+            model_ready = since_spawn()
+        sequence, _ = camera.analysis_hub.wait_for_newer(sequence, timeout=0.02)
+        if sequence >= start_sequence + 2:
+            first_frame = since_spawn()
+    if model_ready is None and first_frame is not None:
+        model_ready = first_frame
+
+    server.stop_analysis_thread()
+    return {
+        "import_s": imported,
+        "http_ready_s": http_ready,
+        "start_analysis_status": start_response.status_code,
+        "model_ready_s": model_ready,
+        "first_frame_s": first_frame,
+        "model": server.model_loader.status() if hasattr(server, "model_loader") else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--child", type=float, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        print(json.dumps(measure(args.child, args.timeout)), flush=True)
+        os._exit(0)  # skip joining daemon threads and interpreter teardown
+
+    for _ in range(args.runs):
+        subprocess.run([sys.executable, os.path.abspath(__file__), "--child", repr(time.time()),
+                        "--timeout", str(args.timeout)], check=False)
+
+
+if __name__ == '__main__':
+    main()
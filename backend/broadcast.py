@@ -0,0 +1,203 @@
+import asyncio
+import threading
+import time
+
+
+def mjpeg_part(jpeg_bytes):
+    """Wrap an encoded JPEG as one part of a multipart/x-mixed-replace stream"""
+    return b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg_bytes + b'\r\n'
+
+
+def sse_event(data):
+    """Encode an already serialised JSON string as one Server-Sent Events message"""
+    return f"data: {data}\n\n".encode()
+
+
+SSE_KEEPALIVE = b": keepalive\n\n"
+
+
+class StreamHub:
+    """Ring buffer of encoded payloads (JPEG parts, SSE events) published once and read by any number of subscribers.
+
+    Subscribers always jump to the newest payload, so a slow client skips frames
+    instead of holding back the producer or the other clients. If a producer
+    function is given, it is started in a background thread when the first
+    subscriber arrives. It should keep publishing while `hub.wanted()` is True.
+    A producer whose payloads can't be decoded on their own (fragmented MP4)
+    sets a header with set_header(); each subscriber gets it before its first
+    payload, and again if the header changes.
+    """
+
+    def __init__(self, name, producer=None, capacity=4, linger=5.0):
+        self.name = name
+        self.producer = producer
+        self.capacity = max(1, int(capacity))
+        self.linger = linger
+        self.buffer = [None] * self.capacity
+        self.header = None
+        self.sequence = 0
+        self.subscribers = 0
+        self.last_unsubscribe = time.monotonic()
+        self.producer_thread = None
+        self.condition = threading.Condition()
+        # One asyncio.Event per event loop, so a publish costs one wake-up per loop, not per client
+        self.loop_events = {}
+
+    def publish(self, payload):
+        """Store a new frame and wake every waiting subscriber"""
+        with self.condition:
+            self.sequence += 1
+            self.buffer[self.sequence % self.capacity] = payload
+            self.condition.notify_all()
+            for loop in list(self.loop_events):
+                if loop.is_closed():
+                    del self.loop_events[loop]
+                else:
+                    loop.call_soon_threadsafe(self._wake_loop, loop)
+
+    def set_header(self, header):
+        """Set the payload sent ahead of each subscriber's first one; the buffered payloads belong to the
+        previous header, so they are dropped"""
+        with self.condition:
+            self.header = header
+            self.buffer = [None] * self.capacity
+
+    def _with_header(self, payload, sent_header):
+        """(payload, header sent): payload with the current header in front if this subscriber hasn't had it"""
+        header = self.header
+        if header is None or header is sent_header:
+            return payload, sent_header
+        return header + payload, header
+
+    def _wake_loop(self, loop):
+        """Runs on `loop`: release everyone waiting on its current event and arm a fresh one"""
+        with self.condition:
+            event = self.loop_events.pop(loop, None)
+        if event is not None:
+            event.set()
+
+    def _loop_event(self):
+        loop = asyncio.get_running_loop()
+        with self.condition:
+            event = self.loop_events.get(loop)
+            if event is None:
+                event = self.loop_events[loop] = asyncio.Event()
+            return event
+
+    def latest(self):
+        """Return (sequence, payload) of the newest frame, or (0, None) before the first publish"""
+        with self.condition:
+            return self.sequence, self.buffer[self.sequence % self.capacity]
+
+    def wait_for_newer(self, last_sequence, timeout=1.0):
+        """Block until a frame newer than last_sequence exists; returns the newest (sequence, payload)"""
+        with self.condition:
+            self.condition.wait_for(lambda: self.sequence > last_sequence, timeout)
+            return self.sequence, self.buffer[self.sequence % self.capacity]
+
+    def wanted(self):
+        """True while someone is subscribed, or the last one left less than `linger` seconds ago"""
+        with self.condition:
+            return self.subscribers > 0 or time.monotonic() - self.last_unsubscribe < self.linger
+
+    def producer_alive(self):
+        return self.producer_thread is not None and self.producer_thread.is_alive()
+
+    def _ensure_producer(self):
+        with self.condition:
+            if self.producer is not None and not self.producer_alive():
+                self.producer_thread = threading.Thread(target=self.producer, args=(self,),
+                                                        name=f"{self.name}-producer", daemon=True)
+                self.producer_thread.start()
+
+    def _add_subscriber(self):
+        with self.condition:
+            self.subscribers += 1
+        self._ensure_producer()
+
+    def _remove_subscriber(self):
+        with self.condition:
+            self.subscribers -= 1
+            self.last_unsubscribe = time.monotonic()
+
+    def _producer_lost(self, restarted):
+        """Called when a wait timed out: returns (give_up, restarted)"""
+        if self.producer is None or self.producer_alive():
+            return False, restarted
+        # The producer may have been winding down just as we subscribed; retry once
+        if restarted:
+            return True, restarted
+        self._ensure_producer()
+        return False, True
+
+    def subscribe(self, timeout=1.0, replay_latest=False, keepalive=None, keepalive_interval=15.0):
+        """Yield each newest payload as it is published, until the producer stops or the client goes away.
+
+        With replay_latest the current payload is sent straight away. If a
+        keepalive payload is given it is sent after keepalive_interval seconds
+        without news, which also lets the server notice clients that went away.
+        """
+        self._add_subscriber()
+        try:
+            last_sequence, payload = self.latest()
+            sent_header = None
+            if replay_latest and payload is not None:
+                payload, sent_header = self._with_header(payload, sent_header)
+                yield payload
+            restarted = False
+            last_sent = time.monotonic()
+            while True:
+                sequence, payload = self.wait_for_newer(last_sequence, timeout)
+                if sequence == last_sequence:
+                    if keepalive is not None and time.monotonic() - last_sent >= keepalive_interval:
+                        last_sent = time.monotonic()
+                        yield keepalive
+                    give_up, restarted = self._producer_lost(restarted)
+                    if give_up:
+                        return
+                    continue
+                restarted = False
+                last_sequence = sequence
+                if payload is None:
+                    # Dropped by set_header() as it was published
+                    continue
+                last_sent = time.monotonic()
+                payload, sent_header = self._with_header(payload, sent_header)
+                yield payload
+        finally:
+            self._remove_subscriber()
+
+    async def subscribe_async(self, timeout=1.0, replay_latest=False, keepalive=None, keepalive_interval=15.0):
+        """Async version of subscribe() for the ASGI server; idle subscribers cost no thread"""
+        self._add_subscriber()
+        try:
+            last_sequence, payload = self.latest()
+            sent_header = None
+            if replay_latest and payload is not None:
+                payload, sent_header = self._with_header(payload, sent_header)
+                yield payload
+            restarted = False
+            last_sent = time.monotonic()
+            while True:
+                # Take the event before looking at the buffer so a publish in between is not missed
+                event = self._loop_event()
+                sequence, payload = self.latest()
+                if sequence > last_sequence:
+                    restarted = False
+                    last_sequence = sequence
+                    if payload is not None:
+                        last_sent = time.monotonic()
+                        payload, sent_header = self._with_header(payload, sent_header)
+                        yield payload
+                    continue
+                try:
+                    await asyncio.wait_for(event.wait(), timeout)
+                except asyncio.TimeoutError:
+                    if keepalive is not None and time.monotonic() - last_sent >= keepalive_interval:
+                        last_sent = time.monotonic()
+                        yield keepalive
+                    give_up, restarted = self._producer_lost(restarted)
+                    if give_up:
+                        return
+        finally:
+            self._remove_subscriber()
@@ -0,0 +1,571 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+from flask import json
+
+from broadcast import StreamHub, mjpeg_part, sse_event
+from capture import LiveCapture, is_live_source
+from config import TRUE_VALUES, env_flag
+from counting import FrameCounter, geofence_alert_message
+from detlog import DetectionLogWriter
+from fmp4 import Fmp4Encoder
+from frame_skip import AdaptiveFrameSkip
+from metrics import FRAME_ERRORS, FRAMES_ANALYSED, STAGE_SECONDS
+from motion import MotionGate
+from overlay import draw_counts, draw_detection, draw_zones, resize_for_display
+from pipeline import DropOldestQueue, QueueClosed, decode_stage, live_decode_stage, start_stage
+from postprocess import extract_detections
+from rolling import SpeciesWindows, parse_windows
+from zones import default_zones
+
+DEFAULT_CAMERA_ID = "default"
+
+# Pipeline stage queues (frames waiting for inference, results waiting for post-processing).
+# A full queue drops its oldest entry so the analysis stays close to real time.
+DECODE_QUEUE_DEPTH = int(os.getenv("DECODE_QUEUE_DEPTH", 8))
+RESULT_QUEUE_DEPTH = int(os.getenv("RESULT_QUEUE_DEPTH", 8))
+STAGE_JOIN_TIMEOUT = 4  # seconds, inside the 5 second join in Camera.stop
+
+# Frame skipping: FRAME_SKIP is the starting factor; when adaptive, it is tuned at runtime so
+# inference takes TARGET_REALTIME_RATIO seconds per second of source video (split across cameras)
+FRAME_SKIP = int(os.getenv("FRAME_SKIP", 2))
+MAX_FRAME_SKIP = int(os.getenv("MAX_FRAME_SKIP", 10))
+ADAPTIVE_FRAME_SKIP = env_flag("ADAPTIVE_FRAME_SKIP", True)
+TARGET_REALTIME_RATIO = float(os.getenv("TARGET_REALTIME_RATIO", 0.8))
+
+# Motion gate: an analysed frame where less than MOTION_THRESHOLD of the (downscaled) pixels changed
+# reuses the previous detections instead of running the model, at most MOTION_MAX_REUSE times in a row
+MOTION_GATE = env_flag("MOTION_GATE", True)
+MOTION_THRESHOLD = float(os.getenv("MOTION_THRESHOLD", 0.002))
+MOTION_PIXEL_DELTA = int(os.getenv("MOTION_PIXEL_DELTA", 25))
+MOTION_MAX_REUSE = int(os.getenv("MOTION_MAX_REUSE", 10))
+
+# Live sources (RTSP/HTTP URLs, device indexes) are read by a grabber thread that keeps only the newest
+# frame and reconnects with backoff. LIVE_CAPTURE is auto (decided by the source), true or false
+LIVE_CAPTURE = os.getenv("LIVE_CAPTURE", "auto").lower()
+CAPTURE_BUFFER_SIZE = int(os.getenv("CAPTURE_BUFFER_SIZE", 1))
+CAPTURE_DECODER_THREADS = int(os.getenv("CAPTURE_DECODER_THREADS", 0))  # 0 leaves the OpenCV default
+CAPTURE_OPEN_TIMEOUT_MS = int(os.getenv("CAPTURE_OPEN_TIMEOUT_MS", 10000))
+CAPTURE_READ_TIMEOUT_MS = int(os.getenv("CAPTURE_READ_TIMEOUT_MS", 5000))
+CAPTURE_RECONNECT_MAX_S = float(os.getenv("CAPTURE_RECONNECT_MAX_S", 30))
+
+# H.264 feed (/video_feed.mp4): the plain video encoded once by ffmpeg as fragmented MP4 and shared by
+# every viewer. Width in pixels (the height keeps the aspect ratio), target bitrate, seconds between
+# keyframes (each starts a fragment, so also the join delay) and the most frames per second encoded
+MP4_FEED_WIDTH = int(os.getenv("MP4_FEED_WIDTH", 960))
+MP4_FEED_BITRATE = os.getenv("MP4_FEED_BITRATE", "800k")
+MP4_FEED_GOP_SECONDS = float(os.getenv("MP4_FEED_GOP_SECONDS", 1.0))
+MP4_FEED_MAX_FPS = float(os.getenv("MP4_FEED_MAX_FPS", 15))
+MP4_FEED_PRESET = os.getenv("MP4_FEED_PRESET", "veryfast")
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+
+# Rolling per-species statistics (mean/max/min count, unique tracks) in the /analyze_stream payload,
+# over each of these windows in seconds
+SPECIES_WINDOWS = parse_windows(os.getenv("SPECIES_WINDOWS", "10,60,600"))
+
+# Detection log: when set, each analysis run appends its per-frame detections to
+# DETECTION_LOG_DIR/<camera>-<start time>.dlog for offline replay (see replay.py)
+DETECTION_LOG_DIR = os.getenv("DETECTION_LOG_DIR")
+
+
+def parse_camera_sources(video_feed, cameras_env):
+    """Build {camera_id: source} from VIDEO_FEED and CAMERAS ("tank1=/videos/a.mp4,tank2=rtsp://...")"""
+    sources = OrderedDict()
+    if video_feed or not cameras_env:
+        sources[DEFAULT_CAMERA_ID] = video_feed
+    for entry in (cameras_env or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        camera_id, sep, source = entry.partition("=")
+        if not sep:
+            print(f"[WARN] Ignoring CAMERAS entry without an id: {entry}")
+            continue
+        sources[camera_id.strip()] = source.strip()
+    return sources
+
+
+class Camera:
+    """One video source with its own analysis thread, results, stream hubs, tracker and geofence zones"""
+
+    def __init__(self, camera_id, source, registry, zones=None):
+        self.camera_id = camera_id
+        self.source = source
+        self.registry = registry
+        # Zones from zones.parse_zones; None keeps the original single geofence line
+        self.zones = zones
+
+        # Analysis thread management
+        self.analysis_thread = None
+        self.analysis_running = False
+        self.analysis_stop_event = threading.Event()
+        self.control_lock = threading.Lock()
+        self.frame_skip_controller = None
+        self.motion_gate = None
+        self.capture = None
+
+        # Shared variables for analysis results (thread-safe with locks)
+        self.analysis_lock = threading.Lock()
+        self.current_analysis = {
+            "camera_id": camera_id,
+            "total_fish": 0,
+            "species_count": {},
+            "active_fish_ids": {},
+            "unique_fish_total": 0,
+            "unique_species_count": {},
+            "species_windows": {},
+            "geofence_crossed": False,
+            "zones": {},
+            "frame_count": 0,
+            "last_update": time.time(),
+            "system_status": "stopped"
+        }
+
+        self.analysis_hub = StreamHub(f"{camera_id}-analysis-results")
+        self.video_feed_hub = StreamHub(f"{camera_id}-video-feed", self.produce_video_feed)
+        self.mp4_feed_hub = StreamHub(f"{camera_id}-mp4-feed", self.produce_mp4_feed)
+        # Published by the analysis loop itself, so no second decoder is needed
+        self.annotated_feed_hub = StreamHub(f"{camera_id}-annotated-feed")
+
+    def update_analysis_results(self, total_fish, species_count, active_fish_ids, geofence_crossed, frame_count,
+                                status="running", unique_fish_total=0, unique_species_count=None, zones=None,
+                                species_windows=None):
+        """Thread-safe update of analysis results, pushed to /analyze_stream subscribers.
+
+        The dicts passed in are built fresh for each call and are stored as they are.
+        """
+        with self.analysis_lock:
+            self.current_analysis.update({
+                "total_fish": total_fish,
+                "species_count": species_count,
+                "active_fish_ids": active_fish_ids,
+                "unique_fish_total": unique_fish_total,
+                "unique_species_count": unique_species_count or {},
+                "species_windows": species_windows or {},
+                "geofence_crossed": geofence_crossed,
+                "zones": zones or {},
+                "frame_count": frame_count,
+                "last_update": time.time(),
+                "system_status": status
+            })
+            results = self.current_analysis.copy()
+        self.publish_analysis_results(results)
+
+    def publish_analysis_results(self, results=None):
+        """Serialise the analysis snapshot once and wake every /analyze_stream subscriber with the same bytes"""
+        if results is None:
+            results = self.get_analysis_results()
+        results["timestamp"] = time.time()
+        results.update(self.registry.stream_extras())
+        self.analysis_hub.publish(sse_event(json.dumps(results)))
+
+    def get_analysis_results(self):
+        """Thread-safe get analysis results"""
+        with self.analysis_lock:
+            return self.current_analysis.copy()
+
+    def status(self):
+        results = self.get_analysis_results()
+        return {
+            "camera_id": self.camera_id,
+            "source": self.source,
+            "system_status": results["system_status"],
+            "analysis_running": self.analysis_running,
+            "last_update": results["last_update"],
+            "frame_count": results["frame_count"],
+            "total_fish": results["total_fish"],
+            "unique_fish_total": results["unique_fish_total"],
+            "zones": [zone.name for zone in self.zones] if self.zones else ["geofence"],
+            "frame_skip": self.frame_skip_controller.snapshot() if self.frame_skip_controller else None,
+            "motion": self.motion_gate.snapshot() if self.motion_gate else None,
+            "capture": self.capture.snapshot() if self.capture else {"live": self.is_live()}
+        }
+
+    def is_live(self):
+        """Whether this camera's source is read as a live stream (newest frame, reconnects) or as a file"""
+        if LIVE_CAPTURE in ("auto", ""):
+            return is_live_source(self.source)
+        return LIVE_CAPTURE in TRUE_VALUES
+
+    def open_live_capture(self):
+        return LiveCapture(self.source, self.camera_id, CAPTURE_BUFFER_SIZE, CAPTURE_DECODER_THREADS,
+                           CAPTURE_OPEN_TIMEOUT_MS, CAPTURE_READ_TIMEOUT_MS, CAPTURE_RECONNECT_MAX_S).start()
+
+    def run_analysis(self):
+        """Core fish detection and analysis logic from main.py, for this camera"""
+        model = self.registry.model
+        if model is None:
+            print("[ERROR] Model not loaded for analysis")
+            return
+
+        video_path = self.source
+        live = self.is_live()
+        if not video_path or (not live and not os.path.exists(video_path)):
+            print(f"[ERROR] Video path invalid for camera {self.camera_id}: {video_path}")
+            return
+
+        if live:
+            # Keeps retrying in the background if the source isn't up yet; a stop() meanwhile ends the run
+            self.capture = self.open_live_capture()
+            if not self.capture.wait_connected(CAPTURE_OPEN_TIMEOUT_MS / 1000, self.analysis_stop_event):
+                if self.analysis_stop_event.is_set():
+                    self.capture.release()
+                    return
+                print(f"[WARN] Live source for camera {self.camera_id} not reachable yet, still trying")
+            fps = self.capture.fps
+        else:
+            self.capture = None
+            cap = cv2.VideoCapture(video_path)
+            if not cap.isOpened():
+                print(f"[ERROR] Could not open video for analysis on camera {self.camera_id}")
+                return
+            fps = cap.get(cv2.CAP_PROP_FPS)
+
+        # Settings from main.py
+        geofence_line_y = 50
+        if fps == 0:
+            print("Warning: Unable to fetch FPS. Defaulting to 30.")
+            fps = 30
+
+        self.frame_skip_controller = AdaptiveFrameSkip(fps, initial_skip=FRAME_SKIP, max_skip=MAX_FRAME_SKIP,
+                                                       target_ratio=TARGET_REALTIME_RATIO,
+                                                       adaptive=ADAPTIVE_FRAME_SKIP)
+        self.motion_gate = MotionGate(MOTION_THRESHOLD, MOTION_PIXEL_DELTA, MOTION_MAX_REUSE, enabled=MOTION_GATE)
+        id_lifetime_frames = 30
+        counter = FrameCounter(model.names, self.zones or default_zones(geofence_line_y), id_lifetime_frames)
+        tracks, zone_engine = counter.tracks, counter.zone_engine
+        species_windows = SpeciesWindows(SPECIES_WINDOWS, model.names)
+        detection_log = None
+
+        print(f"[INFO] Starting fish detection analysis on camera {self.camera_id}...")
+        self.analysis_running = True
+
+        # Send startup SMS when analysis actually starts
+        self.registry.alert_handler(self, "AquaAnalyzer System is Live: Monitoring has started.", "startup")
+
+        # Update status to running; start_time is what /status measures uptime from
+        with self.analysis_lock:
+            self.current_analysis["start_time"] = time.time()
+        self.update_analysis_results(0, {}, {}, False, 0, "running")
+
+        # Decoding runs as its own stage and inference on the shared scheduler
+        # (with this camera's own tracker); this thread does the post-processing
+        scheduler = self.registry.scheduler
+        # Imported here, not at module level: it pulls in torch and ultralytics, which the
+        # server loads in the background (see model_loader.py)
+        from tracking import CameraTracker
+        # A live source keeps about one batch queued, so a busy pipeline drops stale frames, not fresh ones
+        decode_queue = scheduler.make_queue(scheduler.max_batch_size if live else DECODE_QUEUE_DEPTH)
+        result_queue = DropOldestQueue(RESULT_QUEUE_DEPTH)
+        if live:
+            stages = [
+                start_stage(f"{self.camera_id}-decode", live_decode_stage, self.capture, decode_queue,
+                            self.analysis_stop_event, self.frame_skip_controller, self.motion_gate),
+            ]
+        else:
+            stages = [
+                start_stage(f"{self.camera_id}-decode", decode_stage, cap, decode_queue, self.analysis_stop_event,
+                            self.frame_skip_controller, fps, self.motion_gate, self.camera_id),
+            ]
+        scheduler.register(self.camera_id, decode_queue, result_queue, CameraTracker(frame_rate=fps),
+                           self.frame_skip_controller)
+
+        try:
+            while not self.analysis_stop_event.is_set():
+                try:
+                    item = result_queue.get(timeout=0.1)
+                except QueueClosed:
+                    break
+                if item is None:
+                    continue
+
+                current_frame, frame, result = item
+                started = time.perf_counter()
+
+                try:
+                    # One host transfer, then whole-array counting and geofence tests
+                    detections = extract_detections(result)
+                    species_count, crossed_zones = counter.update(current_frame, detections, frame.shape)
+                    species_windows.update(time.monotonic(), species_count, detections)
+                    geofence_crossed = bool(crossed_zones)
+
+                    if DETECTION_LOG_DIR:
+                        if detection_log is None:
+                            detection_log = DetectionLogWriter(
+                                os.path.join(DETECTION_LOG_DIR,
+                                             f"{self.camera_id}-{time.strftime('%Y%m%d-%H%M%S')}.dlog"),
+                                model.names, frame.shape, self.camera_id, self.source, zone_engine.zones)
+                        detection_log.write(current_frame, detections)
+
+                    # Overlays are only drawn while someone is watching /annotated_feed
+                    annotate = self.annotated_feed_hub.wanted()
+                    if annotate:
+                        draw_zones(frame, zone_engine.zones)
+                        for (x1, y1, x2, y2), object_id, class_id in zip(detections.xyxy.tolist(),
+                                                                         detections.ids.tolist(),
+                                                                         detections.cls.tolist()):
+                            draw_detection(frame, x1, y1, x2, y2, object_id if object_id >= 0 else None,
+                                           model.names.get(class_id, "Unknown"))
+
+                    total_fish_count = counter.total_fish
+
+                    if annotate:
+                        draw_counts(frame, total_fish_count, species_count)
+                        _, buffer = cv2.imencode('.jpg', resize_for_display(frame))
+                        self.annotated_feed_hub.publish(mjpeg_part(buffer.tobytes()))
+
+                    published = time.perf_counter()
+                    STAGE_SECONDS.observe(published - started, self.camera_id, "postprocess")
+
+                    # Update shared analysis results
+                    self.update_analysis_results(total_fish_count, species_count, tracks.active_ids(),
+                                                 geofence_crossed, current_frame,
+                                                 unique_fish_total=tracks.unique_total,
+                                                 unique_species_count=counter.unique_species_count(),
+                                                 zones=zone_engine.snapshot(),
+                                                 species_windows=species_windows.snapshot())
+                    if self.registry.history is not None:
+                        self.registry.history.record(self.camera_id, total_fish_count, species_count,
+                                                     tracks.unique_total)
+
+                    # Queue an SMS alert if a geofence is crossed; the dispatcher applies the cooldown
+                    if geofence_crossed:
+                        self.registry.alert_handler(self, geofence_alert_message(crossed_zones), "geofence")
+                    STAGE_SECONDS.observe(time.perf_counter() - published, self.camera_id, "publish")
+                    FRAMES_ANALYSED.inc(self.camera_id)
+                    if live:
+                        self.capture.record_latency(current_frame)
+
+                except Exception as e:
+                    print(f"Error during processing frame {current_frame} on camera {self.camera_id}: {e}")
+                    FRAME_ERRORS.inc(self.camera_id, "postprocess")
+
+        except Exception as e:
+            print(f"[ERROR] Analysis loop error on camera {self.camera_id}: {e}")
+        finally:
+            # Make sure the decode stage winds down too, within stop()'s join budget
+            self.analysis_stop_event.set()
+            scheduler.unregister(self.camera_id)
+            deadline = time.monotonic() + STAGE_JOIN_TIMEOUT
+            for stage in stages:
+                stage.join(timeout=max(0, deadline - time.monotonic()))
+                if stage.is_alive():
+                    print(f"[WARN] Stage {stage.name} did not stop in time")
+            if detection_log is not None:
+                detection_log.close()
+            self.analysis_running = False
+            # The run's lifetime counts stay visible after it stops
+            self.update_analysis_results(0, {}, {}, False, max(counter.last_frame, 0), "stopped",
+                                         unique_fish_total=tracks.unique_total,
+                                         unique_species_count=counter.unique_species_count(),
+                                         zones=zone_engine.snapshot(),
+                                         species_windows=species_windows.snapshot())
+            print(f"[INFO] Fish detection analysis stopped on camera {self.camera_id}")
+
+    def start(self):
+        """Start this camera's analysis thread"""
+        with self.control_lock:
+            # Several stream clients may arrive at once; only the first starts a thread
+            if self.analysis_running or (self.analysis_thread and self.analysis_thread.is_alive()):
+                print(f"[INFO] Analysis already running on camera {self.camera_id}")
+                return False
+
+            # Reset the stop event
+            self.analysis_stop_event.clear()
+
+            self.analysis_thread = threading.Thread(target=self.run_analysis, name=f"{self.camera_id}-analysis",
+                                                    daemon=True)
+            self.analysis_thread.start()
+        print(f"[INFO] Analysis thread started for camera {self.camera_id}")
+        return True
+
+    def ensure_started(self, endpoint):
+        """Start the analysis on behalf of a stream endpoint; True if this call started it"""
+        if self.analysis_running:
+            return False
+        print(f"[INFO] Starting analysis thread for camera {self.camera_id} from {endpoint}")
+        return self.start()
+
+    def stop(self):
+        """Stop this camera's analysis thread"""
+        # The thread may still be opening its source, before analysis_running is set
+        if not self.analysis_running and not (self.analysis_thread and self.analysis_thread.is_alive()):
+            print(f"[INFO] Analysis not running on camera {self.camera_id}")
+            return False
+
+        print(f"[INFO] Stopping analysis thread for camera {self.camera_id}...")
+        self.analysis_stop_event.set()
+
+        if self.analysis_thread and self.analysis_thread.is_alive():
+            self.analysis_thread.join(timeout=5)  # Wait up to 5 seconds for thread to stop
+
+        self.analysis_running = False
+        self.mark_stopped()
+        print(f"[INFO] Analysis thread stopped for camera {self.camera_id}")
+        return True
+
+    def mark_stopped(self):
+        """Publish the stopped state: the per-frame fields are cleared, while the run's lifetime counts,
+        zone totals and species windows stay as the analysis thread left them"""
+        with self.analysis_lock:
+            self.current_analysis.update({
+                "total_fish": 0,
+                "species_count": {},
+                "active_fish_ids": {},
+                "geofence_crossed": False,
+                "last_update": time.time(),
+                "system_status": "stopped"
+            })
+            results = self.current_analysis.copy()
+        self.publish_analysis_results(results)
+
+    def feed_frames(self, hub):
+        """This camera's source frames for a shared feed producer, while hub.wanted().
+
+        Live sources give each newest frame as it arrives; files are paced to their FPS and looped.
+        """
+        if self.is_live():
+            capture = self.open_live_capture()
+            try:
+                while hub.wanted():
+                    newest = capture.read_newest(timeout=1.0)
+                    if newest is not None:
+                        yield newest[1]
+            finally:
+                capture.release()
+            return
+
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            print(f"[ERROR] Could not open video for streaming on camera {self.camera_id}")
+            return
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30
+        frame_interval = 1.0 / fps
+        next_frame_at = time.monotonic()
+
+        try:
+            while hub.wanted():
+                success, frame = cap.read()
+                if not success:
+                    # Restart video when it ends
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+
+                yield frame
+
+                # A shared producer has no client back-pressure, so pace it to the source FPS
+                next_frame_at += frame_interval
+                delay = next_frame_at - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    next_frame_at = time.monotonic()
+        finally:
+            cap.release()
+
+    def produce_video_feed(self, hub):
+        """Decode, resize and JPEG-encode this camera's source once for all /video_feed subscribers"""
+        frames = self.feed_frames(hub)
+        try:
+            for frame in frames:
+                # Resize to match main.py, encode once and publish (plain video, no annotations)
+                _, buffer = cv2.imencode('.jpg', resize_for_display(frame))
+                hub.publish(mjpeg_part(buffer.tobytes()))
+        except Exception as e:
+            print(f"[ERROR] Video streaming error on camera {self.camera_id}: {e}")
+        finally:
+            frames.close()
+
+    def produce_mp4_feed(self, hub):
+        """Encode this camera's source to fragmented MP4 once for all /video_feed.mp4 subscribers"""
+        frames = self.feed_frames(hub)
+        encoder = None
+        min_interval = 1.0 / MP4_FEED_MAX_FPS if MP4_FEED_MAX_FPS > 0 else 0
+        last_encoded = 0
+        try:
+            for frame in frames:
+                now = time.monotonic()
+                if now - last_encoded < min_interval:
+                    continue
+                last_encoded = now
+
+                height, width = frame.shape[:2]
+                if encoder is None:
+                    # The size is fixed by the first frame; a source that changes size is scaled to it
+                    scale = min(1.0, MP4_FEED_WIDTH / width)
+                    encoder = Fmp4Encoder(width * scale, height * scale, MP4_FEED_BITRATE, MP4_FEED_GOP_SECONDS,
+                                          MP4_FEED_PRESET, FFMPEG_BIN, on_init=hub.set_header,
+                                          on_fragment=hub.publish, name=hub.name).start()
+                if (width, height) != (encoder.width, encoder.height):
+                    frame = cv2.resize(frame, (encoder.width, encoder.height), interpolation=cv2.INTER_AREA)
+                if not encoder.write(frame):
+                    print(f"[ERROR] ffmpeg stopped encoding the MP4 feed of camera {self.camera_id}")
+                    break
+        except Exception as e:
+            print(f"[ERROR] MP4 streaming error on camera {self.camera_id}: {e}")
+        finally:
+            frames.close()
+            if encoder is not None:
+                encoder.close()
+            # The next producer starts a new stream with its own init segment
+            hub.set_header(None)
+
+
+class CameraRegistry:
+    """Every configured camera, all sharing one loaded model through one inference scheduler.
+
+    stream_extras() returns fields added to every streamed payload (the global
+    settings flags). alert_handler(camera, message, kind) queues an alert without
+    blocking and returns True if it was accepted. Every analysed frame's counts
+    are recorded in `history` (a HistoryStore) when one is given.
+    """
+
+    def __init__(self, model, scheduler, stream_extras=None, alert_handler=None, history=None):
+        self.model = model
+        self.scheduler = scheduler
+        self.stream_extras = stream_extras or dict
+        self.alert_handler = alert_handler or (lambda camera, message, kind: False)
+        self.history = history
+        self.cameras = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, camera_id, source, zones=None):
+        """Register a new camera; raises ValueError if the id is already taken"""
+        with self.lock:
+            if camera_id in self.cameras:
+                raise ValueError(f"Camera already exists: {camera_id}")
+            camera = self.cameras[camera_id] = Camera(camera_id, source, self, zones)
+        print(f"[INFO] Camera {camera_id} registered: {source}")
+        return camera
+
+    def remove(self, camera_id):
+        """Stop and forget a camera; returns False if it was not registered"""
+        with self.lock:
+            camera = self.cameras.pop(camera_id, None)
+        if camera is None:
+            return False
+        camera.stop()
+        return True
+
+    def get(self, camera_id):
+        with self.lock:
+            return self.cameras.get(camera_id)
+
+    def default(self):
+        """The camera behind the original single-feed routes"""
+        with self.lock:
+            if DEFAULT_CAMERA_ID in self.cameras:
+                return self.cameras[DEFAULT_CAMERA_ID]
+            return next(iter(self.cameras.values()), None)
+
+    def all(self):
+        with self.lock:
+            return list(self.cameras.values())
+
+    def stop_all(self):
+        for camera in self.all():
+            camera.stop()
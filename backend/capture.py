@@ -0,0 +1,195 @@
+import threading
+import time
+from urllib.parse import urlparse
+
+import cv2
+import numpy as np
+
+from metrics import CAPTURE_DROPPED, CAPTURE_LATENCY, CAPTURE_RECONNECTS, STAGE_SECONDS
+
+LIVE_SCHEMES = ("rtsp", "rtsps", "rtmp", "http", "https", "udp", "tcp", "srt")
+
+
+def is_live_source(source):
+    """True for camera streams (URLs, device indexes, /dev/video*), False for video files"""
+    source = str(source)
+    return source.isdigit() or source.startswith("/dev/video") or urlparse(source).scheme.lower() in LIVE_SCHEMES
+
+
+def open_capture(source, buffer_size=1, decoder_threads=0, open_timeout_ms=10000, read_timeout_ms=5000):
+    """Open a live source with the decoder settings applied (those this OpenCV build supports)"""
+    if str(source).isdigit():
+        cap = cv2.VideoCapture(int(source))
+    else:
+        params = []
+        for name, value in (("CAP_PROP_OPEN_TIMEOUT_MSEC", open_timeout_ms),
+                            ("CAP_PROP_READ_TIMEOUT_MSEC", read_timeout_ms),
+                            ("CAP_PROP_N_THREADS", decoder_threads)):
+            if value and hasattr(cv2, name):
+                params += [getattr(cv2, name), int(value)]
+        cap = cv2.VideoCapture(source, cv2.CAP_FFMPEG, params) if params else cv2.VideoCapture(source)
+    if buffer_size:
+        # Honoured by some backends only; the grabber thread keeps latency low regardless
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+    return cap
+
+
+class LiveCapture:
+    """Read a live source on its own thread and always hand out the newest frame.
+
+    The grabber reads as fast as the source delivers, so OpenCV's internal
+    buffer never backs up behind a slow analysis loop. Each frame replaces
+    the previous one; a frame replaced before anyone took it counts as
+    dropped (this includes frames passed over by frame skipping, and those
+    reported by count_dropped()). When a read fails, the source is reopened
+    with exponential backoff (up to reconnect_max seconds). Frames get an
+    ever-increasing sequence number, and capture_time(seq) gives the time a
+    recent frame was read (time.monotonic), so consumers can measure
+    capture-to-result latency.
+    """
+
+    def __init__(self, source, camera_id=None, buffer_size=1, decoder_threads=0, open_timeout_ms=10000,
+                 read_timeout_ms=5000, reconnect_max=30.0, history=512):
+        self.source = source
+        self.camera_id = camera_id
+        self.options = (buffer_size, decoder_threads, open_timeout_ms, read_timeout_ms)
+        self.reconnect_max = reconnect_max
+        self.fps = 0
+        self.state = "connecting"
+        self.sequence = -1
+        self.frame = None
+        self.taken = -1
+        self.captured = 0
+        self.dropped = 0
+        self.reconnects = 0
+        self.latency = None
+        self.times = np.zeros(history)
+        self.condition = threading.Condition()
+        self.connected = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name=f"{self.camera_id}-capture", daemon=True)
+        self.thread.start()
+        return self
+
+    def _run(self):
+        backoff = 0.5
+        while not self.stop_event.is_set():
+            cap = open_capture(self.source, *self.options)
+            if not cap.isOpened():
+                cap.release()
+                self._set_state("reconnecting")
+                print(f"[WARN] Could not open {self.source} on camera {self.camera_id}; retrying in {backoff:.1f}s")
+                self.stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.reconnect_max)
+                continue
+
+            self.fps = cap.get(cv2.CAP_PROP_FPS) or self.fps
+            self._set_state("streaming")
+            self.connected.set()
+            read_ok = False
+            try:
+                while not self.stop_event.is_set():
+                    started = time.perf_counter()
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    STAGE_SECONDS.observe(time.perf_counter() - started, self.camera_id, "decode")
+                    if not read_ok:
+                        read_ok, backoff = True, 0.5
+                    self._publish(frame)
+            finally:
+                cap.release()
+
+            if not self.stop_event.is_set():
+                self.reconnects += 1
+                CAPTURE_RECONNECTS.inc(self.camera_id)
+                self._set_state("reconnecting")
+                print(f"[WARN] Lost {self.source} on camera {self.camera_id}; reconnecting in {backoff:.1f}s")
+                self.stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.reconnect_max)
+        self._set_state("stopped")
+
+    def _set_state(self, state):
+        with self.condition:
+            self.state = state
+            self.condition.notify_all()
+
+    def _publish(self, frame):
+        now = time.monotonic()
+        with self.condition:
+            if self.sequence > self.taken:
+                self.dropped += 1
+                CAPTURE_DROPPED.inc(self.camera_id)
+            self.sequence += 1
+            self.frame = frame
+            self.times[self.sequence % len(self.times)] = now
+            self.captured += 1
+            self.condition.notify_all()
+
+    def read_newest(self, min_sequence=None, timeout=1.0):
+        """Wait for a frame with sequence >= min_sequence (default: one not taken yet); (sequence, frame) or None"""
+        with self.condition:
+            wanted = self.taken + 1 if min_sequence is None else min_sequence
+            if not self.condition.wait_for(lambda: self.sequence >= wanted or self.stop_event.is_set(), timeout):
+                return None
+            if self.sequence < wanted:
+                return None
+            self.taken = self.sequence
+            return self.sequence, self.frame
+
+    def count_dropped(self, count=1):
+        """Count frames taken from the capture but discarded downstream before analysis"""
+        with self.condition:
+            self.dropped += count
+        CAPTURE_DROPPED.inc(self.camera_id, amount=count)
+
+    def capture_time(self, sequence):
+        """time.monotonic() when frame `sequence` was read, or None if it's too old to remember"""
+        if sequence < 0 or self.sequence - sequence >= len(self.times):
+            return None
+        return float(self.times[sequence % len(self.times)])
+
+    def record_latency(self, sequence):
+        """Record the capture-to-now latency of frame `sequence` (called once its results are published)"""
+        captured_at = self.capture_time(sequence)
+        if captured_at is not None:
+            latency = time.monotonic() - captured_at
+            CAPTURE_LATENCY.observe(latency, self.camera_id)
+            # Smoothed for /status; the histogram has the distribution
+            self.latency = latency if self.latency is None else 0.9 * self.latency + 0.1 * latency
+
+    def wait_connected(self, timeout=None, stop_event=None):
+        """True once the source is open; gives up after `timeout` seconds or as soon as stop_event is set"""
+        if stop_event is None:
+            return self.connected.wait(timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not stop_event.is_set():
+            remaining = 0.1 if deadline is None else min(0.1, deadline - time.monotonic())
+            if remaining <= 0:
+                break
+            if self.connected.wait(remaining):
+                return True
+        return self.connected.is_set()
+
+    def release(self):
+        self.stop_event.set()
+        with self.condition:
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+
+    def snapshot(self):
+        """Counters for status reporting"""
+        with self.condition:
+            return {
+                "live": True,
+                "state": self.state,
+                "fps": self.fps,
+                "frames_captured": self.captured,
+                "frames_dropped": self.dropped,
+                "reconnects": self.reconnects,
+                "latency_s": None if self.latency is None else round(self.latency, 3),
+            }
@@ -0,0 +1,12 @@
+import os
+
+# Values an on/off environment variable is on for (compared lower-cased)
+TRUE_VALUES = ("1", "true", "yes")
+
+
+def env_flag(name, default=False):
+    """Read an on/off environment variable: on for "1", "true" or "yes" in any case, `default` if unset"""
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in TRUE_VALUES
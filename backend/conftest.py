@@ -0,0 +1,30 @@
+import cv2
+import pytest
+
+from benchmarks.bench_pipeline import StubDetector, make_video
+
+
+@pytest.fixture(scope="session")
+def synthetic_video(tmp_path_factory):
+    """A short clip of moving ellipses from the pipeline benchmark, which StubDetector finds"""
+    path = str(tmp_path_factory.mktemp("video") / "synthetic.mp4")
+    make_video(path, 480, 270, 60, 4)
+    return path
+
+
+@pytest.fixture(scope="session")
+def synthetic_frames(synthetic_video):
+    cap = cv2.VideoCapture(synthetic_video)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+@pytest.fixture
+def stub_detector():
+    return StubDetector()
@@ -0,0 +1,45 @@
+from postprocess import count_species
+from tracks import TrackRegistry
+from zones import ZoneEngine
+
+
+def geofence_alert_message(crossed_zones):
+    return f"ALERT: Geofence {', '.join(crossed_zones)} crossed! Oxygen levels may be low."
+
+
+class FrameCounter:
+    """Counting and zone state for one stream of frames.
+
+    Both the live analysis loop and detection log replay (replay.py) feed it
+    the same FrameDetections, so tuning zones or the ID lifetime against a log
+    gives the counts the live system would have produced. A frame index lower
+    than the previous one means the video looped, and the active tracks and
+    zone memberships are reset.
+    """
+
+    def __init__(self, names, zones, id_lifetime_frames=30):
+        self.names = names
+        self.tracks = TrackRegistry(id_lifetime_frames)
+        self.zone_engine = ZoneEngine(zones)
+        self.last_frame = -1
+
+    def update(self, frame_index, detections, frame_shape):
+        """Count one frame; returns (species_count, names of the alerting zones crossed)"""
+        if frame_index < self.last_frame:
+            self.tracks.clear_active()
+            self.zone_engine.reset()
+        self.last_frame = frame_index
+
+        species_count = count_species(detections.cls, self.names)
+        # Also drops the IDs that have not been seen for id_lifetime_frames
+        self.tracks.update(detections.ids, detections.cls, frame_index)
+        # Crossings are judged from each track's movement since its last sighting
+        crossed_zones = self.zone_engine.update(detections, frame_shape)
+        return species_count, crossed_zones
+
+    @property
+    def total_fish(self):
+        return len(self.tracks)
+
+    def unique_species_count(self):
+        return self.tracks.unique_species_count(self.names)
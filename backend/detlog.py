@@ -0,0 +1,135 @@
+import json
+import os
+import struct
+import time
+
+import numpy as np
+
+from postprocess import FrameDetections
+
+MAGIC = b"AQDL"
+VERSION = 1
+# Records start after a fixed-size header so the file can be memory-mapped at a known offset
+HEADER_SIZE = 4096
+
+# One row per detection. A frame with no detections is written as one row with cls -1,
+# so replay still sees it (tracks expire and counts drop to zero on empty frames).
+RECORD_DTYPE = np.dtype([
+    ("frame", "<i8"),
+    ("time", "<f8"),
+    ("xyxy", "<f4", (4,)),
+    ("conf", "<f4"),
+    ("cls", "<i4"),
+    ("id", "<i4"),
+])
+
+
+def encode_header(meta):
+    body = json.dumps(meta).encode()
+    if len(body) > HEADER_SIZE - 12:
+        raise ValueError("Detection log header too large")
+    return (MAGIC + struct.pack("<II", VERSION, len(body)) + body).ljust(HEADER_SIZE, b"\0")
+
+
+def read_header(f):
+    raw = f.read(HEADER_SIZE)
+    if len(raw) < HEADER_SIZE or raw[:4] != MAGIC:
+        raise ValueError("Not a detection log")
+    version, length = struct.unpack("<II", raw[4:12])
+    if version != VERSION:
+        raise ValueError(f"Unsupported detection log version {version}")
+    return json.loads(raw[12:12 + length])
+
+
+class DetectionLogWriter:
+    """Append one camera run's per-frame detections to a binary log.
+
+    The header records the class names, frame size and zones of the run, so a
+    replay needs nothing else. Rows are buffered and appended every
+    flush_rows rows (and on close); a crash loses at most that buffer. A
+    partially written last row is ignored by the reader.
+    """
+
+    def __init__(self, path, names, frame_shape, camera_id=None, source=None, zones=None, flush_rows=4096):
+        self.path = path
+        self.flush_rows = flush_rows
+        self.buffer = []
+        self.buffered = 0
+        meta = {
+            "camera_id": camera_id,
+            "source": source,
+            "names": {str(k): v for k, v in names.items()},
+            "frame_shape": list(frame_shape[:2]),
+            "zones": [zone.to_dict() for zone in zones or []],
+            "created": time.time(),
+        }
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.file = open(path, "wb")
+        self.file.write(encode_header(meta))
+
+    def write(self, frame_index, detections, timestamp=None):
+        rows = np.zeros(max(1, len(detections)), dtype=RECORD_DTYPE)
+        rows["frame"] = frame_index
+        rows["time"] = time.time() if timestamp is None else timestamp
+        if len(detections):
+            rows["xyxy"] = detections.xyxy
+            rows["conf"] = detections.conf
+            rows["cls"] = detections.cls
+            rows["id"] = detections.ids
+        else:
+            rows["cls"] = -1
+        self.buffer.append(rows)
+        self.buffered += len(rows)
+        if self.buffered >= self.flush_rows:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write(np.concatenate(self.buffer).tobytes())
+            self.file.flush()
+            self.buffer = []
+            self.buffered = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+class DetectionLog:
+    """Read a detection log through a memory map.
+
+    records is a structured array over the file; frames() walks it one frame at
+    a time as FrameDetections, slicing the map without copying the columns.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.meta = read_header(f)
+        self.names = {int(k): v for k, v in self.meta["names"].items()}
+        self.frame_shape = tuple(self.meta["frame_shape"])
+        count = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r", offset=HEADER_SIZE, shape=(count,)) \
+            if count else np.empty(0, dtype=RECORD_DTYPE)
+
+    def __len__(self):
+        """Number of frames in the log"""
+        if len(self.records) == 0:
+            return 0
+        return int(np.count_nonzero(np.diff(self.records["frame"]))) + 1
+
+    def frames(self):
+        """Yield (frame_index, timestamp, FrameDetections) for every logged frame, in order"""
+        records = self.records
+        if len(records) == 0:
+            return
+        frame = np.asarray(records["frame"])
+        # A frame's rows are contiguous; a new frame starts wherever the index changes
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(frame)) + 1, [len(records)]))
+        xyxy, conf, cls, ids, times = (records["xyxy"], records["conf"], records["cls"], records["id"],
+                                       records["time"])
+        for start, end in zip(starts[:-1], starts[1:]):
+            if cls[start] < 0:
+                start = end
+            yield int(frame[end - 1]), float(times[end - 1]), FrameDetections(
+                xyxy[start:end], cls[start:end].astype(np.int64), ids[start:end].astype(np.int64), conf[start:end])
@@ -0,0 +1,124 @@
+import shutil
+import struct
+import subprocess
+import threading
+
+# Boxes that make up the initialisation segment; everything after is moof + mdat fragments
+INIT_BOXES = (b"ftyp", b"moov")
+
+
+def ffmpeg_available(ffmpeg="ffmpeg"):
+    return shutil.which(ffmpeg) is not None
+
+
+def even(value):
+    """H.264 with 4:2:0 chroma needs even frame dimensions"""
+    return max(2, int(value) // 2 * 2)
+
+
+def read_exact(stream, size):
+    data = stream.read(size)
+    return data if data is not None and len(data) == size else None
+
+
+class Fmp4Encoder:
+    """Encode BGR frames to H.264 in fragmented MP4, with an ffmpeg subprocess.
+
+    Raw frames go to ffmpeg's stdin; its stdout is split into MP4 boxes on a
+    reader thread. The ftyp + moov boxes are the initialisation segment,
+    passed once to on_init. After that, each moof + mdat pair is one
+    fragment, passed to on_fragment. A keyframe is forced every gop_seconds
+    and a fragment is cut at each keyframe, so every fragment can be the
+    first one a viewer plays (after the init segment). Frames are timestamped
+    by the wall clock as they are written, so dropped or late frames keep
+    playback in real time.
+    """
+
+    def __init__(self, width, height, bitrate="800k", gop_seconds=1.0, preset="veryfast", ffmpeg="ffmpeg",
+                 on_init=None, on_fragment=None, name="fmp4"):
+        self.width = even(width)
+        self.height = even(height)
+        self.bitrate = bitrate
+        self.gop_seconds = gop_seconds
+        self.preset = preset
+        self.ffmpeg = ffmpeg
+        self.on_init = on_init
+        self.on_fragment = on_fragment
+        self.name = name
+        self.process = None
+        self.reader = None
+        self.fragments = 0
+
+    def command(self):
+        return [
+            self.ffmpeg, "-hide_banner", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{self.width}x{self.height}",
+            # Millisecond time base for the wall clock timestamps (the default 1/25 s would collide)
+            "-framerate", "1000", "-use_wallclock_as_timestamps", "1", "-i", "pipe:0",
+            "-an", "-c:v", "libx264", "-preset", self.preset, "-tune", "zerolatency",
+            "-profile:v", "main", "-pix_fmt", "yuv420p",
+            "-b:v", str(self.bitrate), "-maxrate", str(self.bitrate), "-bufsize", str(self.bitrate),
+            "-force_key_frames", f"expr:gte(t,n_forced*{self.gop_seconds})", "-fps_mode", "passthrough",
+            "-f", "mp4", "-movflags", "empty_moov+default_base_moof+frag_keyframe", "-flush_packets", "1",
+            "pipe:1",
+        ]
+
+    def start(self):
+        self.process = subprocess.Popen(self.command(), stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        self.reader = threading.Thread(target=self._read_output, name=f"{self.name}-reader", daemon=True)
+        self.reader.start()
+        return self
+
+    def _read_output(self):
+        stdout = self.process.stdout
+        init, fragment = [], []
+        while True:
+            header = read_exact(stdout, 8)
+            if header is None:
+                break
+            size, box_type = struct.unpack(">I4s", header)
+            if size == 1:
+                # 64-bit box size follows the type
+                large = read_exact(stdout, 8)
+                if large is None:
+                    break
+                header += large
+                size = struct.unpack(">Q", large)[0]
+            body = read_exact(stdout, size - len(header))
+            if body is None:
+                break
+
+            if box_type in INIT_BOXES:
+                init.append(header + body)
+                if box_type == b"moov" and self.on_init is not None:
+                    self.on_init(b"".join(init))
+                continue
+            fragment.append(header + body)
+            if box_type == b"mdat":
+                self.fragments += 1
+                if self.on_fragment is not None:
+                    self.on_fragment(b"".join(fragment))
+                fragment = []
+
+    def write(self, frame):
+        """Encode one frame (width x height, BGR); False once ffmpeg has gone away"""
+        try:
+            self.process.stdin.write(frame.tobytes())
+            return True
+        except (BrokenPipeError, ValueError, OSError):
+            return False
+
+    def close(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        if self.reader is not None:
+            self.reader.join(timeout=2)
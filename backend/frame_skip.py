@@ -0,0 +1,68 @@
+import math
+import threading
+
+
+class AdaptiveFrameSkip:
+    """Pick the frame skip factor that keeps inference at a target share of real time.
+
+    The real-time ratio is the inference time spent per second of source video:
+    per_frame_latency * source_fps / skip. The controller keeps an exponential
+    moving average of per-frame inference latency and chooses the smallest skip
+    whose ratio stays under the target. Lowering the skip needs some headroom
+    so the factor doesn't flap between two values. When several cameras share
+    one model, each gets a share of the target (see set_share).
+    """
+
+    def __init__(self, source_fps, initial_skip=2, min_skip=1, max_skip=10,
+                 target_ratio=0.8, smoothing=0.2, headroom=0.85, adaptive=True):
+        self.source_fps = source_fps if source_fps > 0 else 30
+        self.min_skip = max(1, int(min_skip))
+        self.max_skip = max(self.min_skip, int(max_skip))
+        self.skip = min(max(int(initial_skip), self.min_skip), self.max_skip)
+        self.target_ratio = target_ratio
+        self.smoothing = smoothing
+        self.headroom = headroom
+        self.adaptive = adaptive
+        self.share = 1.0
+        self.frame_latency = None
+        self.lock = threading.Lock()
+
+    def record_inference(self, latency, frames=1):
+        """Feed the wall time of one inference call covering `frames` frames"""
+        if not self.adaptive or frames <= 0:
+            return
+        per_frame = latency / frames
+        with self.lock:
+            if self.frame_latency is None:
+                self.frame_latency = per_frame
+            else:
+                self.frame_latency += self.smoothing * (per_frame - self.frame_latency)
+
+            target = self.target_ratio * self.share
+            needed = math.ceil(self.frame_latency * self.source_fps / target)
+            if needed > self.skip:
+                self.skip = min(needed, self.max_skip)
+            elif needed < self.skip and self.realtime_ratio(self.skip - 1) < target * self.headroom:
+                self.skip = max(self.skip - 1, self.min_skip)
+
+    def set_share(self, share):
+        """Fraction of the inference budget this source may use (1/N for N cameras on one model)"""
+        self.share = min(max(share, 0.01), 1.0)
+
+    def realtime_ratio(self, skip=None):
+        """Inference seconds per second of video at the given (or current) skip"""
+        if self.frame_latency is None:
+            return None
+        return self.frame_latency * self.source_fps / (skip or self.skip)
+
+    def snapshot(self):
+        """Current controller state for status reporting"""
+        ratio = self.realtime_ratio()
+        return {
+            "frame_skip": self.skip,
+            "adaptive_frame_skip": self.adaptive,
+            "source_fps": self.source_fps,
+            "inference_share": round(self.share, 3),
+            "inference_ms_per_frame": None if self.frame_latency is None else round(self.frame_latency * 1000, 2),
+            "realtime_ratio": None if ratio is None else round(ratio, 3),
+        }
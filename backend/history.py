@@ -0,0 +1,233 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+
+# Rollup resolutions in seconds, and how long each is kept on disk (None = forever)
+RESOLUTIONS = {"second": 1, "minute": 60, "hour": 3600}
+RETENTION = {"raw": 24 * 3600, "second": 7 * 86400, "minute": 90 * 86400, "hour": None}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS samples (
+    camera TEXT NOT NULL, ts REAL NOT NULL, total_fish INTEGER NOT NULL,
+    unique_fish INTEGER NOT NULL, species TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS samples_camera_ts ON samples (camera, ts);
+CREATE TABLE IF NOT EXISTS rollups (
+    camera TEXT NOT NULL, resolution INTEGER NOT NULL, bucket INTEGER NOT NULL,
+    samples INTEGER NOT NULL, fish_sum INTEGER NOT NULL, fish_min INTEGER NOT NULL, fish_max INTEGER NOT NULL,
+    unique_fish INTEGER NOT NULL, species_sum TEXT NOT NULL,
+    PRIMARY KEY (camera, resolution, bucket)
+) WITHOUT ROWID;
+"""
+
+
+class Bucket:
+    """Running aggregate of the frames in one rollup interval"""
+
+    __slots__ = ("start", "samples", "fish_sum", "fish_min", "fish_max", "unique_fish", "species_sum")
+
+    def __init__(self, start):
+        self.start = start
+        self.samples = 0
+        self.fish_sum = 0
+        self.fish_min = None
+        self.fish_max = None
+        self.unique_fish = 0
+        self.species_sum = {}
+
+    def add(self, total_fish, unique_fish, species_count):
+        self.samples += 1
+        self.fish_sum += total_fish
+        self.fish_min = total_fish if self.fish_min is None else min(self.fish_min, total_fish)
+        self.fish_max = total_fish if self.fish_max is None else max(self.fish_max, total_fish)
+        self.unique_fish = unique_fish
+        for species, count in species_count.items():
+            self.species_sum[species] = self.species_sum.get(species, 0) + count
+
+    def row(self, camera_id, resolution):
+        return (camera_id, resolution, self.start, self.samples, self.fish_sum, self.fish_min, self.fish_max,
+                self.unique_fish, json.dumps(self.species_sum))
+
+
+def pick_resolution(span, limit=5000):
+    """Finest rollup that covers a query range in at most `limit` points (else the coarsest)"""
+    for name, seconds in RESOLUTIONS.items():
+        if span / seconds <= limit:
+            return name
+    return "hour"
+
+
+def rollup_point(bucket, samples, fish_sum, fish_min, fish_max, unique_fish, species_sum):
+    return {
+        "t": bucket,
+        "samples": samples,
+        "fish_avg": round(fish_sum / samples, 3),
+        "fish_min": fish_min,
+        "fish_max": fish_max,
+        "unique_fish_total": unique_fish,
+        "species_avg": {species: round(total / samples, 3) for species, total in species_sum.items()},
+    }
+
+
+class HistoryStore:
+    """Per-frame fish counts for every camera, kept as a bounded history on disk.
+
+    record() is cheap enough for the analysis loop. It appends to an in-memory
+    ring of recent frames and folds the frame into the open per-second,
+    per-minute and per-hour buckets. Raw frames and buckets queue up for a
+    writer thread, which spills them to SQLite every flush_interval seconds
+    in one transaction and prunes rows past their retention. Range queries
+    read the rollup table through its primary key and never scan raw frames,
+    except for resolution "raw". Memory is bounded by the ring size, plus the
+    open buckets and one flush interval of pending rows.
+    """
+
+    def __init__(self, path="history.db", ring_size=10000, flush_interval=5.0, retention=None):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.retention = dict(RETENTION, **(retention or {}))
+        self.ring = {}
+        self.ring_size = ring_size
+        self.open_buckets = {}
+        self.pending_samples = []
+        self.pending_rollups = []
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+        db = self._connect()
+        try:
+            db.executescript(SCHEMA)
+        finally:
+            db.close()
+        self.thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self.thread.start()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=10, check_same_thread=False)
+        # WAL lets queries read while the writer thread appends
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        return db
+
+    def record(self, camera_id, total_fish, species_count, unique_fish=0, timestamp=None):
+        """Add one analysed frame's counts"""
+        timestamp = time.time() if timestamp is None else timestamp
+        with self.lock:
+            ring = self.ring.get(camera_id)
+            if ring is None:
+                ring = self.ring[camera_id] = deque(maxlen=self.ring_size)
+            ring.append((timestamp, total_fish, unique_fish, species_count))
+            self.pending_samples.append((camera_id, timestamp, total_fish, unique_fish, json.dumps(species_count)))
+
+            for resolution in RESOLUTIONS.values():
+                start = int(timestamp // resolution * resolution)
+                bucket = self.open_buckets.get((camera_id, resolution))
+                if bucket is None or bucket.start != start:
+                    if bucket is not None:
+                        self.pending_rollups.append(bucket.row(camera_id, resolution))
+                    bucket = self.open_buckets[(camera_id, resolution)] = Bucket(start)
+                bucket.add(total_fish, unique_fish, species_count)
+
+    def _run(self):
+        db = self._connect()
+        last_prune = 0
+        while not self.stop_event.wait(self.flush_interval):
+            try:
+                self._flush(db)
+                if time.time() - last_prune > 3600:
+                    self._prune(db)
+                    last_prune = time.time()
+            except sqlite3.Error as e:
+                print(f"[ERROR] History write failed: {e}")
+        db.close()
+
+    def _flush(self, db):
+        with self.lock:
+            if not self.pending_samples and not self.pending_rollups:
+                return
+            samples, self.pending_samples = self.pending_samples, []
+            rollups, self.pending_rollups = self.pending_rollups, []
+            # Open buckets are rewritten on every flush, so a crash loses at most one flush interval
+            rollups += [bucket.row(camera_id, resolution)
+                        for (camera_id, resolution), bucket in self.open_buckets.items()]
+        with db:
+            db.executemany("INSERT INTO samples VALUES (?, ?, ?, ?, ?)", samples)
+            db.executemany("INSERT OR REPLACE INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rollups)
+
+    def _prune(self, db):
+        now = time.time()
+        with db:
+            if self.retention.get("raw"):
+                db.execute("DELETE FROM samples WHERE ts < ?", (now - self.retention["raw"],))
+            for name, resolution in RESOLUTIONS.items():
+                if self.retention.get(name):
+                    db.execute("DELETE FROM rollups WHERE resolution = ? AND bucket < ?",
+                               (resolution, now - self.retention[name]))
+
+    def query(self, camera_id, start, end, resolution="minute", limit=5000):
+        """(points, truncated) for one camera between two unix times, oldest first.
+
+        When more than `limit` points match, the newest `limit` are returned and truncated is True.
+        """
+        if resolution == "raw":
+            return self._query_raw(camera_id, start, end, limit)
+
+        seconds = RESOLUTIONS[resolution]
+        db = self._connect()
+        try:
+            rows = db.execute(
+                "SELECT bucket, samples, fish_sum, fish_min, fish_max, unique_fish, species_sum FROM rollups "
+                "WHERE camera = ? AND resolution = ? AND bucket >= ? AND bucket <= ? ORDER BY bucket DESC LIMIT ?",
+                (camera_id, seconds, int(start // seconds * seconds), end, limit + 1)).fetchall()
+        finally:
+            db.close()
+        points = {row[0]: (*row[:6], json.loads(row[6])) for row in rows}
+
+        # Buckets not written yet: closed ones waiting for the writer, and the open one
+        with self.lock:
+            recent = [row[2:] for row in self.pending_rollups if row[0] == camera_id and row[1] == seconds]
+            bucket = self.open_buckets.get((camera_id, seconds))
+            if bucket is not None:
+                recent.append(bucket.row(camera_id, seconds)[2:])
+        for row in recent:
+            if int(start // seconds * seconds) <= row[0] <= end:
+                points[row[0]] = (*row[:6], json.loads(row[6]))
+        buckets = sorted(points)
+        return [rollup_point(*points[bucket]) for bucket in buckets[-limit:]], len(buckets) > limit
+
+    def _query_raw(self, camera_id, start, end, limit):
+        with self.lock:
+            ring = list(self.ring.get(camera_id, ()))
+        oldest_in_memory = ring[0][0] if ring else float("inf")
+
+        points = [sample for sample in ring if start <= sample[0] <= end]
+        if start < oldest_in_memory and len(points) <= limit:
+            db = self._connect()
+            try:
+                rows = db.execute(
+                    "SELECT ts, total_fish, unique_fish, species FROM samples "
+                    "WHERE camera = ? AND ts >= ? AND ts <= ? AND ts < ? ORDER BY ts DESC LIMIT ?",
+                    (camera_id, start, end, oldest_in_memory, limit + 1 - len(points))).fetchall()
+            finally:
+                db.close()
+            # Fetched newest first, so the older points are the ones cut by the limit
+            points = [(ts, total, unique, json.loads(species))
+                      for ts, total, unique, species in reversed(rows)] + points
+        return [{"t": ts, "total_fish": total, "unique_fish_total": unique, "species_count": species}
+                for ts, total, unique, species in points[-limit:]], len(points) > limit
+
+    def cameras(self):
+        with self.lock:
+            return list(self.ring)
+
+    def close(self):
+        """Write everything still pending and stop the writer"""
+        self.stop_event.set()
+        self.thread.join(timeout=10)
+        db = self._connect()
+        try:
+            self._flush(db)
+        finally:
+            db.close()
@@ -1,13 +1,24 @@
 import cv2
-from ultralytics import YOLO
 import torch
 import os
 import time
 from twilio.rest import Client
-from collections import defaultdict
 from dotenv import load_dotenv
 import os
 
+from alerts import AlertDispatcher, make_transport, parse_cooldowns
+from backends import load_model
+from batching import FrameBatcher, track_batch
+from config import env_flag
+from frame_skip import AdaptiveFrameSkip
+from motion import MotionGate
+from overlay import draw_counts, draw_detection, draw_zones, resize_for_display
+from postprocess import count_species, extract_detections
+from tiling import TiledDetector
+from tracking import CameraTracker
+from tracks import TrackRegistry
+from zones import ZoneEngine, default_zones, load_zone_config, parse_zones
+
 load_dotenv()
 
 # Twilio Setup
@@ -21,27 +32,26 @@ client = Client(account_sid, auth_token)
 SMS_ENABLED = True   # Change to False to disable SMS alerts
 GEOFENCE_ALERT_ENABLED = False # Toggle for geofence crossing alerts
 
+# Alerts are sent from a background dispatcher so the video loop never waits on the network
+alerts = AlertDispatcher(make_transport(os.getenv("ALERT_TRANSPORT"), client, twilio_number, recipient_number,
+                                        os.getenv("ALERT_FILE", "alerts.log")),
+                         parse_cooldowns(os.getenv("ALERT_COOLDOWNS")), enabled=lambda: SMS_ENABLED)
+
 # Function to send SMS alert
-def send_sms_alert(message_body):
-    if SMS_ENABLED:
-        try:
-            message = client.messages.create(
-                body=message_body,
-                from_=twilio_number,
-                to=recipient_number
-            )
-            print(f"SMS sent: {message_body} (SID: {message.sid})")
-        except Exception as e:
-            print(f"Failed to send SMS: {e}")
-    else:
-        print(f"SMS Disabled: {message_body}")
+def send_sms_alert(message_body, kind="alert"):
+    alerts.submit(kind, message_body)
 
 # Notify that the system is live
-send_sms_alert("AquaAnalyzer System is Live: Monitoring has started.")
+send_sms_alert("AquaAnalyzer System is Live: Monitoring has started.", "startup")
 
 # Load the trained model
-model = YOLO(os.getenv("PT_FILE"))
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+# INFERENCE_BACKEND is pytorch, onnx or openvino (exported once and cached in MODEL_CACHE_DIR)
+inference_backend = os.getenv("INFERENCE_BACKEND", "pytorch").lower()
+inference_imgsz = int(os.getenv("INFERENCE_IMGSZ", 640))
+model = load_model(os.getenv("PT_FILE"), inference_backend, inference_imgsz,
+                   env_flag("INFERENCE_INT8"),
+                   os.getenv("MODEL_CACHE_DIR", "model_cache"), os.getenv("INT8_DATA"))
+device = torch.device("cuda" if torch.cuda.is_available() and inference_backend == "pytorch" else "cpu")
 print(f"Using device: {device}")
 
 # Video path
@@ -63,124 +73,140 @@ if fps == 0:
     print("Warning: Unable to fetch FPS. Defaulting to 30.")
     fps = 30
 
-frame_skip = 2
+# Frame skipping: FRAME_SKIP is the starting factor; when adaptive, it is tuned from the measured inference
+# time so inference takes TARGET_REALTIME_RATIO seconds per second of video
+frame_skip = AdaptiveFrameSkip(fps, initial_skip=int(os.getenv("FRAME_SKIP", 2)),
+                               max_skip=int(os.getenv("MAX_FRAME_SKIP", 10)),
+                               target_ratio=float(os.getenv("TARGET_REALTIME_RATIO", 0.8)),
+                               adaptive=env_flag("ADAPTIVE_FRAME_SKIP", True))
+frames_until_next = 0
 delay = int(1000 / fps)
 frame_count = 0
 id_lifetime_frames = 30
-active_fish_ids = {}
-species_count = defaultdict(int)
-
-# Track last alert time
-last_alert_time = 0
-alert_interval = 3600  # 1 hour in seconds
+tracks = TrackRegistry(id_lifetime_frames)
+
+# Geofence zones: the "*" entry of GEOFENCE_ZONES, or the single line at geofence_line_y
+zone_config = load_zone_config(os.getenv("GEOFENCE_ZONES")).get("*")
+zone_engine = ZoneEngine(parse_zones(zone_config) if zone_config else default_zones(geofence_line_y))
+
+# Inference batching (frames per model call, max time to wait for a full batch)
+batcher = FrameBatcher(int(os.getenv("INFER_BATCH_SIZE", 4)), float(os.getenv("INFER_BATCH_TIMEOUT_MS", 100)))
+
+# Motion gate: static frames reuse the last detections instead of running the model
+motion_gate = MotionGate(float(os.getenv("MOTION_THRESHOLD", 0.002)), int(os.getenv("MOTION_PIXEL_DELTA", 25)),
+                         int(os.getenv("MOTION_MAX_REUSE", 10)),
+                         enabled=env_flag("MOTION_GATE", True))
+last_result = None
+
+# Tiled inference for high-resolution video: tiles are detected in one batch and merged, then tracked here
+tiled_detector = None
+if env_flag("TILED_INFERENCE"):
+    tiled_detector = TiledDetector(model, int(os.getenv("TILE_SIZE", 640)), float(os.getenv("TILE_OVERLAP", 0.2)),
+                                   int(os.getenv("MAX_TILES", 8)))
+    tiled_tracker = CameraTracker(frame_rate=fps)
+
+
+def process_batch():
+    """Run the pending batch through the model, then annotate and display each frame in order"""
+    global last_result
+    frame_indices, frames = batcher.drain()
+    started = time.monotonic()
+    try:
+        if tiled_detector is not None:
+            results = [tiled_tracker.update(result) for result in
+                       tiled_detector.predict(frames, conf=0.5, iou=0.5, imgsz=inference_imgsz)]
+        else:
+            results = track_batch(model, frames, conf=0.5, iou=0.5, imgsz=inference_imgsz)
+    except Exception as e:
+        print(f"Error during inference for frames {frame_indices[0]}-{frame_indices[-1]}: {e}")
+        return True
+    frame_skip.record_inference(time.monotonic() - started, len(frames))
+
+    for current_frame, frame, result in zip(frame_indices, frames, results):
+        last_result = result
+        if not show_frame(current_frame, frame, result):
+            return False
+
+    return True
+
+
+def show_frame(current_frame, frame, result):
+    """Count, annotate and display one frame; False once 'q' is pressed"""
+    try:
+        # One host transfer, then whole-array counting and zone lookups
+        detections = extract_detections(result)
+        species_count = count_species(detections.cls, model.names)
+        # Also drops the IDs that have not been seen for id_lifetime_frames
+        tracks.update(detections.ids, detections.cls, current_frame)
+        # Crossings are judged from each track's movement since its last sighting
+        crossed_zones = zone_engine.update(detections, frame.shape)
+        geofence_crossed = bool(crossed_zones)
+
+        # Draw the geofence zones and bounding boxes labelled with fish ID and species
+        draw_zones(frame, zone_engine.zones)
+        for (x1, y1, x2, y2), object_id, class_id in zip(detections.xyxy.tolist(), detections.ids.tolist(),
+                                                         detections.cls.tolist()):
+            draw_detection(frame, x1, y1, x2, y2, object_id if object_id >= 0 else None,
+                           model.names.get(class_id, "Unknown"))
+
+        # Display total fish count and species count
+        total_fish_count = len(tracks)
+        draw_counts(frame, total_fish_count, species_count)
+
+        # Send SMS alert if geofence is crossed and alerts are enabled (rate limited by the dispatcher)
+        if GEOFENCE_ALERT_ENABLED and geofence_crossed:
+            message = f"ALERT: Geofence {', '.join(crossed_zones)} crossed! Oxygen levels may be low."
+            if alerts.submit("geofence", message):
+                print(message)
+
+        # Display resized frame
+        cv2.imshow('frame', resize_for_display(frame))
+
+    except Exception as e:
+        print(f"Error during processing frame {current_frame}: {e}")
+
+    return cv2.waitKey(max(1, delay)) & 0xFF != ord('q')
 
-# Custom colors
-BOX_COLOR = (135, 206, 250)
-TEXT_COLOR = (0, 0, 0)  # Black text color
-TEXT_BG_COLOR = (255, 255, 255)  # White background
-LINE_THICKNESS = 2
-
-# Font settings
-font_scale = 0.8
-font_thickness = 2
 
 while True:
-    ret, frame = cap.read()
+    if frames_until_next > 0:
+        # Skipped frames are only grabbed, never retrieved into an image
+        ret, frame = cap.grab(), None
+    else:
+        ret, frame = cap.read()
 
     if not ret:
+        # Finish the frames already collected before the tracker state is reset
+        if len(batcher) and not process_batch():
+            break
         print("Reached the end of the video. Restarting...")
         cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
         frame_count = 0
-        active_fish_ids.clear()
-        species_count.clear()
+        frames_until_next = 0
+        tracks.clear_active()
+        zone_engine.reset()
+        motion_gate.reset()
         continue
 
-    if frame_count % frame_skip == 0:
-        try:
-            results = model.track(frame, persist=True, conf=0.5, iou=0.5)
-            current_frame = frame_count
-            geofence_crossed = False
-            species_count.clear()  # Reset species count for the current frame
-
-            # Draw the geofence line
-            cv2.line(frame, (0, geofence_line_y), (frame.shape[1], geofence_line_y), (0, 255, 0), 2)
-
-            for obj in results[0].boxes:
-                if hasattr(obj, 'id') and obj.id is not None:
-                    object_id = int(obj.id)
-                    active_fish_ids[object_id] = current_frame
-
-                if hasattr(obj, 'cls') and obj.cls is not None:
-                    class_id = int(obj.cls[0]) if isinstance(obj.cls, torch.Tensor) else int(obj.cls)
-                    class_name = model.names.get(class_id, "Unknown")
-                    species_count[class_name] += 1
-
-                x1, y1, x2, y2 = obj.xyxy[0].cpu().numpy()
-
-                # Draw bounding box
-                cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), BOX_COLOR, LINE_THICKNESS)
-
-                # Label with fish ID and species
-                label = f"id:{object_id} {class_name.upper()}"
-                text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness)[0]
-                text_x, text_y = int(x1), int(y1) - 10
-                cv2.rectangle(frame, (text_x, text_y - text_size[1] - 5),
-                              (text_x + text_size[0], text_y + 5), TEXT_BG_COLOR, -1)
-                cv2.putText(frame, label, (text_x, text_y),
-                            cv2.FONT_HERSHEY_SIMPLEX, font_scale, TEXT_COLOR, font_thickness)
-
-                # Check for geofence crossing
-                if y2 > geofence_line_y:
-                    geofence_crossed = True
-
-            # Remove inactive fish IDs
-            active_fish_ids = {id: frame for id, frame in active_fish_ids.items()
-                               if current_frame - frame <= id_lifetime_frames}
-
-            # Display total fish count
-            total_fish_count = len(active_fish_ids)
-            total_text = f"Total Fish Count: {total_fish_count}"
-            total_text_size = cv2.getTextSize(total_text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness)[0]
-            total_text_x, total_text_y = 10, 30
-            cv2.rectangle(frame, (total_text_x - 5, total_text_y - total_text_size[1] - 10),
-                          (total_text_x + total_text_size[0] + 10, total_text_y + 10), TEXT_BG_COLOR, -1)
-            cv2.putText(frame, total_text, (total_text_x, total_text_y),
-                        cv2.FONT_HERSHEY_SIMPLEX, font_scale, TEXT_COLOR, font_thickness)
-
-            # Display species count below total count with proper alignment
-            y_offset = total_text_y + 30  # Add spacing below the total count
-            for species, count in species_count.items():
-                species_text = f"{species}: {count}"
-                species_text_size = cv2.getTextSize(species_text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness)[0]
-                cv2.rectangle(frame, (total_text_x - 5, y_offset - species_text_size[1] - 10),
-                              (total_text_x + species_text_size[0] + 10, y_offset + 10), TEXT_BG_COLOR, -1)
-                cv2.putText(frame, species_text, (total_text_x, y_offset),
-                            cv2.FONT_HERSHEY_SIMPLEX, font_scale, TEXT_COLOR, font_thickness)
-                y_offset += 40  # Add spacing for the next line
-
-            # Send SMS alert if geofence is crossed and alerts are enabled
-            current_time = time.time()
-            if GEOFENCE_ALERT_ENABLED and geofence_crossed and (current_time - last_alert_time > alert_interval):
-                send_sms_alert("ALERT: Geofence line crossed! Oxygen levels may be low.")
-                print("ALERT: Geofence line crossed! Oxygen levels may be low.")
-                last_alert_time = current_time
-
-            # Display resized frame
-            height, width = frame.shape[:2]
-            if width > 0 and height > 0:
-                new_width = 1080
-                new_height = int((new_width / width) * height)
-                frame_resized = cv2.resize(frame, (new_width, new_height))
-                cv2.imshow('frame', frame_resized)
-            else:
-                print("Error: Invalid frame dimensions.")
-
-        except Exception as e:
-            print(f"Error during processing frame {frame_count}: {e}")
+    if frame is not None:
+        if last_result is None or motion_gate.should_infer(frame):
+            batcher.add(frame_count, frame)
+        else:
+            # Nothing moved: show the previous detections, after any frames still waiting for inference
+            if len(batcher) and not process_batch():
+                break
+            if not show_frame(frame_count, frame, last_result):
+                break
+        frames_until_next = frame_skip.skip
+
+    if batcher.ready() and not process_batch():
+        break
 
+    frames_until_next -= 1
     frame_count += 1
-    if cv2.waitKey(delay // frame_skip) & 0xFF == ord('q'):
-        break
 
 cap.release()
-cv2.destroyAllWindows()
\ No newline at end of file
+cv2.destroyAllWindows()
+alerts.close()
+print(f"Motion gate: {motion_gate.snapshot()}")
+print(f"Frame skip: {frame_skip.snapshot()}")
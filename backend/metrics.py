@@ -0,0 +1,155 @@
+import bisect
+import threading
+
+# Seconds; spans a cheap post-processing step up to a slow CPU inference batch
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in zip(names, values)) + "}"
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic count per label set.
+
+    Hot-path updates take no lock: every series is written by one thread
+    (the camera's analysis, decode or the scheduler thread), and under the GIL
+    a reader at worst sees a value one update old.
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.values = {}
+
+    def inc(self, *label_values, amount=1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        for label_values, value in list(self.values.items()):
+            yield self.name, format_labels(self.labels, label_values), value
+
+
+class Histogram:
+    """Bucketed observations per label set: one bisect and three increments per observe()"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, value, *label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            # [per-bucket counts (last one is +Inf), sum]
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self):
+        for label_values, (counts, total) in list(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), list(counts)):
+                cumulative += count
+                labels = format_labels(self.labels + ("le",), label_values + (format_value(bound),))
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = format_labels(self.labels, label_values)
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Gauge:
+    """Current value(s) read at scrape time from collect(), which returns {label values tuple: value}"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, labels=(), collect=None):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.collect = collect or dict
+
+    def samples(self):
+        for label_values, value in self.collect().items():
+            if value is not None:
+                yield self.name, format_labels(self.labels, label_values), value
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        """Add a metric (replacing one of the same name) and return it"""
+        with self.lock:
+            self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            try:
+                for name, labels, value in metric.samples():
+                    lines.append(f"{name}{labels} {format_value(value)}")
+            except Exception as e:
+                print(f"[ERROR] Could not collect metric {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+def process_rss_bytes():
+    """Resident set size of this process, from /proc (Linux only)"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+# The pipeline's own metrics; server.py registers the gauges that read server state
+REGISTRY = MetricsRegistry()
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "aqua_stage_seconds", "Time per frame spent in each analysis stage", ("camera", "stage")))
+FRAMES_ANALYSED = REGISTRY.register(Counter(
+    "aqua_frames_analysed_total", "Frames that went through counting and were published", ("camera",)))
+FRAMES_SKIPPED = REGISTRY.register(Counter(
+    "aqua_frames_skipped_total", "Frames dropped before analysis: frame_skip (grabbed, not decoded), "
+    "decode_queue or result_queue (dropped by a full stage queue)", ("camera", "reason")))
+INFERENCES_REUSED = REGISTRY.register(Counter(
+    "aqua_inferences_reused_total", "Analysed frames that reused the previous detections (motion gate)", ("camera",)))
+CAPTURE_LATENCY = REGISTRY.register(Histogram(
+    "aqua_capture_latency_seconds", "Live sources: time from a frame being read to its results being published",
+    ("camera",), buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0)))
+CAPTURE_DROPPED = REGISTRY.register(Counter(
+    "aqua_capture_frames_dropped_total", "Live sources: frames replaced by a newer one before analysis", ("camera",)))
+CAPTURE_RECONNECTS = REGISTRY.register(Counter(
+    "aqua_capture_reconnects_total", "Live sources: times the source was lost and reopened", ("camera",)))
+FRAME_ERRORS = REGISTRY.register(Counter(
+    "aqua_frame_errors_total", "Errors caught while processing frames, by stage", ("camera", "stage")))
@@ -0,0 +1,133 @@
+import importlib
+import threading
+import time
+
+import numpy as np
+
+from backends import load_model
+
+
+class ModelLoader:
+    """Load the YOLO model on a background thread so the HTTP server can come up straight away.
+
+    torch and ultralytics are imported on the loader thread too, since they
+    are most of the startup cost. Loading includes the one-off export for
+    non-PyTorch backends (see backends.py). After loading, a dummy frame and a
+    dummy batch of warmup_batch frames (the scheduler's batch size) go through
+    predict, so the first real batch doesn't pay for lazy initialisation (CUDA
+    context, kernel selection, fused layers, shape specialisation). The model
+    is published and the state set to "ready" together under the lock.
+    Callbacks registered with when_ready() run on the loader thread once the
+    model is usable.
+    """
+
+    def __init__(self, weights, backend="pytorch", imgsz=640, int8=False, cache_dir="model_cache",
+                 int8_data=None, warmup_batch=1):
+        self.weights = weights
+        self.backend = backend
+        self.imgsz = imgsz
+        self.int8 = int8
+        self.cache_dir = cache_dir
+        self.int8_data = int8_data
+        self.warmup_batch = max(1, int(warmup_batch))
+        self.model = None
+        self.device = None
+        self.state = "pending"
+        self.error = None
+        self.timings = {}
+        self.started_at = None
+        self.callbacks = []
+        self.lock = threading.Lock()
+        self.ready_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        with self.lock:
+            if self.thread is None:
+                self.started_at = time.monotonic()
+                self.thread = threading.Thread(target=self._run, name="model-loader", daemon=True)
+                self.thread.start()
+        return self
+
+    def _set_state(self, state, started, model=None):
+        """Record how long the current step took and move to the next; a model is published with the state"""
+        now = time.monotonic()
+        with self.lock:
+            self.timings[f"{self.state}_s"] = round(now - started, 3)
+            if model is not None:
+                self.model = model
+            self.state = state
+        return now
+
+    def _run(self):
+        step = time.monotonic()
+        try:
+            with self.lock:
+                self.state = "importing"
+            # Imported before loading so their cost shows up as its own step
+            import torch
+            importlib.import_module("ultralytics")
+
+            step = self._set_state("loading", step)
+            model = load_model(self.weights, self.backend, self.imgsz, self.int8, self.cache_dir, self.int8_data)
+            device = torch.device("cuda" if torch.cuda.is_available() and self.backend == "pytorch" else "cpu")
+            with self.lock:
+                self.device = device
+            print(f"[INFO] Model loaded on {device} ({self.backend} backend)")
+
+            step = self._set_state("warming_up", step)
+            dummy = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+            for batch_size in sorted({1, self.warmup_batch}):
+                model.predict([dummy] * batch_size, verbose=False)
+            self._set_state("ready", step, model)
+            print(f"[INFO] Model warmed up in {self.timings['warming_up_s']}s")
+        except Exception as e:
+            print(f"[ERROR] Failed to load model: {e}")
+            with self.lock:
+                self.error = str(e)
+                self.state = "failed"
+            self.ready_event.set()
+            return
+
+        self.ready_event.set()
+        with self.lock:
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self.model)
+            except Exception as e:
+                print(f"[ERROR] Model ready callback failed: {e}")
+
+    def when_ready(self, callback):
+        """Call callback(model) once the model is ready (straight away if it already is)"""
+        with self.lock:
+            if self.state != "ready":
+                self.callbacks.append(callback)
+                return
+        callback(self.model)
+
+    def ready(self):
+        with self.lock:
+            return self.state == "ready"
+
+    def failed(self):
+        with self.lock:
+            return self.state == "failed"
+
+    def wait(self, timeout=None):
+        """Block until the model is ready or failed; True if ready"""
+        self.ready_event.wait(timeout)
+        return self.ready()
+
+    def status(self):
+        """Loading progress for /status"""
+        with self.lock:
+            return {
+                "state": self.state,
+                "elapsed_s": None if self.started_at is None else round(time.monotonic() - self.started_at, 3),
+                "steps": dict(self.timings),
+                "backend": self.backend,
+                "int8": self.int8,
+                "device": str(self.device) if self.device else None,
+                "error": self.error,
+            }
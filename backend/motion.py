@@ -0,0 +1,71 @@
+import cv2
+
+
+class MotionGate:
+    """Decide per analysed frame whether anything moved enough to be worth running the model.
+
+    Frames are shrunk to `width` pixels wide, greyscaled and blurred. The result
+    is compared with the frame the model last ran on. If fewer than `threshold`
+    (a fraction) of the pixels changed by more than `pixel_delta` grey levels,
+    the previous detections and tracker state are reused. After `max_reuse`
+    reused frames in a row the model runs anyway, which bounds staleness.
+    Comparing against the last inferred frame, not the previous frame, means
+    slow drift still adds up to a change.
+    """
+
+    def __init__(self, threshold=0.002, pixel_delta=25, max_reuse=10, width=160, enabled=True):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.max_reuse = max(0, int(max_reuse))
+        self.width = width
+        self.enabled = enabled
+        self.reference = None
+        self.reused_in_row = 0
+        self.inferred = 0
+        self.reused = 0
+        self.last_change = None
+
+    def _prepare(self, frame):
+        height, width = frame.shape[:2]
+        small = cv2.resize(frame, (self.width, max(1, round(height * self.width / width))),
+                           interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (5, 5), 0)
+
+    def should_infer(self, frame):
+        """True if the model should run on this frame, False to reuse the previous detections"""
+        if not self.enabled:
+            self.inferred += 1
+            return True
+
+        small = self._prepare(frame)
+        if (self.reference is not None and self.reference.shape == small.shape
+                and self.reused_in_row < self.max_reuse):
+            _, changed = cv2.threshold(cv2.absdiff(small, self.reference), self.pixel_delta, 255, cv2.THRESH_BINARY)
+            self.last_change = cv2.countNonZero(changed) / changed.size
+            if self.last_change < self.threshold:
+                self.reused_in_row += 1
+                self.reused += 1
+                return False
+
+        self.reference = small
+        self.reused_in_row = 0
+        self.inferred += 1
+        return True
+
+    def reset(self):
+        """Forget the reference frame (e.g. when the video loops) so the next frame is inferred"""
+        self.reference = None
+        self.reused_in_row = 0
+
+    def snapshot(self):
+        """Counters for status reporting"""
+        total = self.inferred + self.reused
+        return {
+            "motion_gate": self.enabled,
+            "frames_inferred": self.inferred,
+            "inferences_saved": self.reused,
+            "saved_ratio": round(self.reused / total, 3) if total else None,
+            "last_change": None if self.last_change is None else round(float(self.last_change), 5),
+        }
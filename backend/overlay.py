@@ -0,0 +1,70 @@
+import cv2
+import numpy as np
+
+# Custom colors
+BOX_COLOR = (135, 206, 250)
+TEXT_COLOR = (0, 0, 0)  # Black text color
+TEXT_BG_COLOR = (255, 255, 255)  # White background
+GEOFENCE_COLOR = (0, 255, 0)
+LINE_THICKNESS = 2
+
+# Font settings
+font_scale = 0.8
+font_thickness = 2
+
+DISPLAY_WIDTH = 1080
+
+
+def draw_zones(frame, zones):
+    """Draw each geofence zone (polygon outline or line) with its name"""
+    for zone in zones:
+        points = np.round(zone.points).astype(np.int32)
+        cv2.polylines(frame, [points], zone.kind == "polygon", GEOFENCE_COLOR, 2)
+        label_x = int(min(max(points[:, 0].min(), 0), frame.shape[1] - 1)) + 5
+        label_y = int(points[:, 1].min()) - 5
+        cv2.putText(frame, zone.name, (label_x, max(label_y, 15)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, GEOFENCE_COLOR, 1)
+
+
+def draw_detection(frame, x1, y1, x2, y2, object_id, class_name):
+    """Draw a bounding box labelled with fish ID and species"""
+    cv2.rectangle(frame, (int(x1), int(y1)), (int(x2), int(y2)), BOX_COLOR, LINE_THICKNESS)
+
+    label = f"id:{object_id} {class_name.upper()}"
+    text_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness)[0]
+    text_x, text_y = int(x1), int(y1) - 10
+    cv2.rectangle(frame, (text_x, text_y - text_size[1] - 5),
+                  (text_x + text_size[0], text_y + 5), TEXT_BG_COLOR, -1)
+    cv2.putText(frame, label, (text_x, text_y),
+                cv2.FONT_HERSHEY_SIMPLEX, font_scale, TEXT_COLOR, font_thickness)
+
+
+def draw_counts(frame, total_fish_count, species_count):
+    """Draw the total fish count with the per-species counts listed below it"""
+    total_text = f"Total Fish Count: {total_fish_count}"
+    total_text_size = cv2.getTextSize(total_text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness)[0]
+    total_text_x, total_text_y = 10, 30
+    cv2.rectangle(frame, (total_text_x - 5, total_text_y - total_text_size[1] - 10),
+                  (total_text_x + total_text_size[0] + 10, total_text_y + 10), TEXT_BG_COLOR, -1)
+    cv2.putText(frame, total_text, (total_text_x, total_text_y),
+                cv2.FONT_HERSHEY_SIMPLEX, font_scale, TEXT_COLOR, font_thickness)
+
+    # Display species count below total count with proper alignment
+    y_offset = total_text_y + 30  # Add spacing below the total count
+    for species, count in species_count.items():
+        species_text = f"{species}: {count}"
+        species_text_size = cv2.getTextSize(species_text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, font_thickness)[0]
+        cv2.rectangle(frame, (total_text_x - 5, y_offset - species_text_size[1] - 10),
+                      (total_text_x + species_text_size[0] + 10, y_offset + 10), TEXT_BG_COLOR, -1)
+        cv2.putText(frame, species_text, (total_text_x, y_offset),
+                    cv2.FONT_HERSHEY_SIMPLEX, font_scale, TEXT_COLOR, font_thickness)
+        y_offset += 40  # Add spacing for the next line
+
+
+def resize_for_display(frame, new_width=DISPLAY_WIDTH):
+    """Scale a frame to the display width, keeping its aspect ratio"""
+    height, width = frame.shape[:2]
+    if width > 0 and height > 0:
+        new_height = int((new_width / width) * height)
+        return cv2.resize(frame, (new_width, new_height))
+    return frame
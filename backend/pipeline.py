@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from metrics import FRAMES_SKIPPED, STAGE_SECONDS
+
+
+class QueueClosed(Exception):
+    """Raised by DropOldestQueue.get once the queue is closed and empty"""
+
+
+class DropOldestQueue:
+    """Bounded FIFO between pipeline stages; a full queue discards its oldest item instead of blocking"""
+
+    def __init__(self, maxsize, condition=None):
+        self.items = deque()
+        self.maxsize = max(1, int(maxsize))
+        self.dropped = 0
+        self.closed = False
+        # Several queues can share one condition so a single consumer can wait on all of them
+        self.condition = condition or threading.Condition()
+
+    def __len__(self):
+        with self.condition:
+            return len(self.items)
+
+    def put(self, item):
+        """Append an item, dropping the oldest one if full. Returns False if the queue is closed"""
+        with self.condition:
+            if self.closed:
+                return False
+            if len(self.items) >= self.maxsize:
+                self.items.popleft()
+                self.dropped += 1
+            self.items.append(item)
+            self.condition.notify_all()
+            return True
+
+    def get(self, timeout=None):
+        """Pop the oldest item, or None if nothing arrived within the timeout"""
+        with self.condition:
+            if not self.items and not self.closed:
+                self.condition.wait(timeout)
+            if self.items:
+                return self.items.popleft()
+            if self.closed:
+                raise QueueClosed()
+            return None
+
+    def get_nowait(self):
+        """Pop the oldest item, or None if the queue is empty"""
+        with self.condition:
+            if self.items:
+                return self.items.popleft()
+            if self.closed:
+                raise QueueClosed()
+            return None
+
+    def close(self, discard=False):
+        """Stop accepting items and wake any waiting consumer"""
+        with self.condition:
+            self.closed = True
+            if discard:
+                self.items.clear()
+            self.condition.notify_all()
+
+
+def start_stage(name, target, *args):
+    """Start a pipeline stage in its own daemon thread"""
+    thread = threading.Thread(target=target, args=args, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def decode_stage(cap, out_queue, stop_event, skip_controller, fps, motion_gate=None, camera_id=None):
+    """Read frames from the capture, paced to the source FPS, and queue one in every skip_controller.skip.
+
+    Skipped frames are only grabbed: they advance the stream but are never
+    retrieved, so the colour conversion and frame copy are not paid for them.
+    Queued items are (frame_index, frame, reuse_from). reuse_from is None when
+    the frame needs inference; when the motion gate found it static, it is the
+    index of the frame the gate compared it with, whose detections can be
+    reused. If that frame never got inferred (a full queue dropped it), the
+    scheduler infers this one instead.
+    The frame index restarts at 0 whenever the video loops, which downstream
+    stages use to reset their per-run state. The stage owns the capture and
+    releases it on exit. Decode time and skipped frames are recorded in the
+    metrics under camera_id.
+    """
+    frame_interval = 1.0 / fps if fps > 0 else 0
+    next_frame_at = time.monotonic()
+    frame_count = 0
+    frames_until_next = 0
+    reference = None
+    dropped = out_queue.dropped
+    try:
+        while not stop_event.is_set():
+            if frames_until_next > 0:
+                ret, frame = cap.grab(), None
+                if ret:
+                    FRAMES_SKIPPED.inc(camera_id, "frame_skip")
+            else:
+                started = time.perf_counter()
+                ret, frame = cap.read()
+                if ret:
+                    STAGE_SECONDS.observe(time.perf_counter() - started, camera_id, "decode")
+
+            if not ret:
+                print("Reached the end of the video. Restarting...")
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                frame_count = 0
+                frames_until_next = 0
+                reference = None
+                if motion_gate is not None:
+                    motion_gate.reset()
+                continue
+
+            if frame is not None:
+                if motion_gate is None or motion_gate.should_infer(frame):
+                    reference, reuse_from = frame_count, None
+                else:
+                    reuse_from = reference
+                out_queue.put((frame_count, frame, reuse_from))
+                if out_queue.dropped != dropped:
+                    FRAMES_SKIPPED.inc(camera_id, "decode_queue", amount=out_queue.dropped - dropped)
+                    dropped = out_queue.dropped
+                frames_until_next = skip_controller.skip
+            frames_until_next -= 1
+            frame_count += 1
+
+            # Keep file sources at their native rate, like a live camera
+            next_frame_at += frame_interval
+            delay = next_frame_at - time.monotonic()
+            if delay > 0:
+                stop_event.wait(delay)
+            else:
+                next_frame_at = time.monotonic()
+    except Exception as e:
+        print(f"[ERROR] Decode stage error: {e}")
+    finally:
+        cap.release()
+        out_queue.close(discard=stop_event.is_set())
+
+
+def live_decode_stage(capture, out_queue, stop_event, skip_controller, motion_gate=None):
+    """Queue the newest frame of a LiveCapture, at most one in every skip_controller.skip captured frames.
+
+    There is no pacing and no rewinding: the source sets the pace and a lost
+    source is reconnected by the capture itself. out_queue should be short
+    (about one inference batch): while the pipeline is busy it discards its
+    oldest frames, so inference always gets the freshest ones, and those
+    discards are counted as frames the capture dropped. Frame indexes are the
+    capture's sequence numbers, which only ever increase. Items are queued as
+    in decode_stage.
+    """
+    last = -1
+    reference = None
+    try:
+        while not stop_event.is_set():
+            newest = capture.read_newest(last + max(1, skip_controller.skip) if last >= 0 else None, timeout=0.5)
+            if newest is None:
+                continue
+            last, frame = newest
+            if motion_gate is None or motion_gate.should_infer(frame):
+                reference, reuse_from = last, None
+            else:
+                reuse_from = reference
+            dropped = out_queue.dropped
+            out_queue.put((last, frame, reuse_from))
+            if out_queue.dropped != dropped:
+                capture.count_dropped(out_queue.dropped - dropped)
+    except Exception as e:
+        print(f"[ERROR] Live decode stage error: {e}")
+    finally:
+        capture.release()
+        out_queue.close(discard=stop_event.is_set())
@@ -0,0 +1,45 @@
+import numpy as np
+
+
+class FrameDetections:
+    """One frame's detections as host-side arrays.
+
+    xyxy is (N, 4) float, cls and ids are (N,) int (ids is -1 for untracked
+    boxes) and conf is (N,) float.
+    """
+
+    __slots__ = ("xyxy", "cls", "ids", "conf")
+
+    def __init__(self, xyxy, cls, ids, conf):
+        self.xyxy = xyxy
+        self.cls = cls
+        self.ids = ids
+        self.conf = conf
+
+    def __len__(self):
+        return len(self.cls)
+
+
+def extract_detections(result):
+    """Copy a Results object's boxes to the host in one transfer and split them into columns"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        data = np.empty((0, 6), dtype=np.float32)
+    else:
+        # Columns: x1, y1, x2, y2, [track id,] conf, cls
+        data = boxes.data.cpu().numpy()
+
+    ids = data[:, 4].astype(np.int64) if data.shape[1] == 7 else np.full(len(data), -1, dtype=np.int64)
+    return FrameDetections(data[:, :4], data[:, -1].astype(np.int64), ids, data[:, -2])
+
+
+def count_species(cls, names):
+    """Per-species box counts from a single bincount over the class column"""
+    if len(cls) == 0:
+        return {}
+    counts = np.bincount(cls)
+    species_count = {}
+    for class_id in np.flatnonzero(counts):
+        class_name = names.get(int(class_id), "Unknown")
+        species_count[class_name] = species_count.get(class_name, 0) + int(counts[class_id])
+    return species_count
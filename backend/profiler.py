@@ -0,0 +1,96 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+
+class SamplingProfiler:
+    """Sample the Python stacks of running threads for a bounded time, as collapsed stacks.
+
+    A sampler thread wakes `hz` times a second and reads every thread's
+    current frame with sys._current_frames(). It counts each stack, root
+    first, as "thread;func (file:line);...", which is the input format of
+    flamegraph.pl and speedscope. The profiled threads run untouched; the
+    cost is the sampler's own time holding the GIL on each wake-up. The
+    caller of profile() waits for the sampler without holding the GIL, and is
+    left out of the samples along with the sampler. Nothing runs outside
+    profile(), and only one profile runs at a time.
+    """
+
+    def __init__(self, max_seconds=60, max_hz=1000):
+        self.max_seconds = max_seconds
+        self.max_hz = max_hz
+        self.lock = threading.Lock()
+
+    def busy(self):
+        return self.lock.locked()
+
+    def profile(self, seconds=10, hz=100, thread_filter=None):
+        """Sample for `seconds` and return (collapsed stack lines, summary dict); None if one is already running.
+
+        thread_filter keeps threads whose name contains any of its substrings.
+        """
+        if not self.lock.acquire(blocking=False):
+            return None
+        try:
+            seconds = min(max(seconds, 0.1), self.max_seconds)
+            interval = 1.0 / min(max(hz, 1), self.max_hz)
+            result = {}
+            sampler = threading.Thread(target=self._sample, name="profiler", daemon=True,
+                                       args=(seconds, interval, thread_filter, threading.get_ident(), result))
+            sampler.start()
+            sampler.join()
+        finally:
+            self.lock.release()
+
+        elapsed = result["elapsed"]
+        lines = [f"{stack} {count}" for stack, count in result["stacks"].most_common()]
+        return lines, {
+            "seconds": round(elapsed, 3),
+            "samples": result["samples"],
+            "achieved_hz": round(result["samples"] / elapsed, 1) if elapsed > 0 else 0,
+            "sampler_overhead": round(result["sampling_time"] / elapsed, 4) if elapsed > 0 else 0,
+        }
+
+    def _sample(self, seconds, interval, thread_filter, caller, result):
+        """The sampler thread: fills result with stacks, samples, sampling_time and elapsed"""
+        me = threading.get_ident()
+        stacks = Counter()
+        samples = 0
+        sampling_time = 0.0
+
+        started = time.monotonic()
+        next_sample = started
+        while True:
+            now = time.monotonic()
+            if now - started >= seconds:
+                break
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, str(ident))
+                if ident in (me, caller) or (thread_filter and not any(part in name for part in thread_filter)):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(frame_label(frame))
+                    frame = frame.f_back
+                stack.append(name)
+                stacks[";".join(reversed(stack))] += 1
+            samples += 1
+            sampling_time += time.monotonic() - now
+
+            next_sample += interval
+            delay = next_sample - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # Fell behind (a busy GIL); don't try to catch up with a burst of samples
+                next_sample = time.monotonic()
+        result.update(stacks=stacks, samples=samples, sampling_time=sampling_time,
+                      elapsed=time.monotonic() - started)
@@ -0,0 +1,186 @@
+from collections import deque
+
+# Each window is kept as this many time slots, so it slides in steps of 1/SLOTS of its length
+SLOTS = 60
+
+
+def window_label(seconds):
+    """Short name for a window length: 10 -> 10s, 60 -> 1m, 600 -> 10m"""
+    for unit, size in (("h", 3600), ("m", 60)):
+        if seconds >= size and seconds % size == 0:
+            return f"{int(seconds // size)}{unit}"
+    return f"{seconds:g}s"
+
+
+def parse_windows(value):
+    """SPECIES_WINDOWS ("10,60,600") as a sorted tuple of seconds"""
+    windows = sorted({float(part) for part in str(value).split(",") if part.strip()})
+    if any(window <= 0 for window in windows):
+        raise ValueError("windows must be positive")
+    return tuple(windows)
+
+
+class SpeciesWindow:
+    """Per-species count statistics and unique track IDs over the last `seconds`, updated incrementally.
+
+    The window is split into SLOTS time slots. Frames only update the open
+    slot's running sum, presence count, max and min. When a slot closes, its
+    totals are added to running window totals, its max and min go on
+    monotonic deques, and the slots that aged out are subtracted again. So
+    an update costs O(species in the frame) plus an occasional O(species)
+    slot change, and a snapshot reads running totals and deque fronts,
+    never the frames in the window. Frames where a species wasn't detected
+    count as zero, so a species missing from any frame in the window has a
+    min of 0. Unique tracks work like TrackRegistry: each slot keeps the
+    IDs first refreshed in it, and an ID leaves the window with the last
+    slot it was seen in. Each ID counts for the species it had when it
+    entered the window. The window edge is accurate to one slot.
+    """
+
+    def __init__(self, seconds, slots=SLOTS):
+        self.seconds = seconds
+        self.slots = slots
+        self.slot_seconds = seconds / slots
+        self.slot = None
+        self.slot_frames = 0
+        self.slot_counts = {}  # species -> [sum, frames present, max, min] for the open slot
+        self.slot_tracks = []
+        self.closed = deque()  # (slot, frames, {species: (sum, frames present)})
+        self.frames = 0
+        self.sums = {}
+        self.present = {}
+        self.max_queue = {}  # species -> deque of (slot, max), maxima decreasing
+        self.min_queue = {}  # species -> deque of (slot, min), minima increasing
+        self.track_buckets = deque()  # (slot, IDs refreshed in it)
+        self.track_slot = {}  # track ID -> last slot seen
+        self.track_species = {}
+        self.unique = {}
+
+    def update(self, timestamp, species_count, track_ids=(), track_species=()):
+        """Add one analysed frame: its {species: count} and the (track ID, species) pairs it saw"""
+        slot = int(timestamp // self.slot_seconds)
+        if slot != self.slot:
+            self._advance(slot)
+
+        self.slot_frames += 1
+        for species, count in species_count.items():
+            stats = self.slot_counts.get(species)
+            if stats is None:
+                self.slot_counts[species] = [count, 1, count, count]
+            else:
+                stats[0] += count
+                stats[1] += 1
+                stats[2] = max(stats[2], count)
+                stats[3] = min(stats[3], count)
+
+        for track_id, species in zip(track_ids, track_species):
+            last_slot = self.track_slot.get(track_id)
+            if last_slot == slot:
+                continue
+            if last_slot is None:
+                self.track_species[track_id] = species
+                self.unique[species] = self.unique.get(species, 0) + 1
+            self.track_slot[track_id] = slot
+            self.slot_tracks.append(track_id)
+
+    def _advance(self, slot):
+        if self.slot is not None and self.slot_frames:
+            self._close_slot()
+        self.slot = slot
+        self.slot_frames = 0
+        self.slot_counts = {}
+        self.slot_tracks = []
+        self._evict(slot - self.slots)
+
+    def _close_slot(self):
+        slot = self.slot
+        totals = {}
+        for species, (count_sum, present, slot_max, slot_min) in self.slot_counts.items():
+            totals[species] = (count_sum, present)
+            self.sums[species] = self.sums.get(species, 0) + count_sum
+            self.present[species] = self.present.get(species, 0) + present
+
+            max_queue = self.max_queue.setdefault(species, deque())
+            while max_queue and max_queue[-1][1] <= slot_max:
+                max_queue.pop()
+            max_queue.append((slot, slot_max))
+            min_queue = self.min_queue.setdefault(species, deque())
+            while min_queue and min_queue[-1][1] >= slot_min:
+                min_queue.pop()
+            min_queue.append((slot, slot_min))
+        self.closed.append((slot, self.slot_frames, totals))
+        self.frames += self.slot_frames
+        if self.slot_tracks:
+            self.track_buckets.append((slot, self.slot_tracks))
+
+    def _evict(self, limit):
+        """Drop the closed slots numbered limit or lower"""
+        while self.closed and self.closed[0][0] <= limit:
+            slot, frames, totals = self.closed.popleft()
+            self.frames -= frames
+            for species, (count_sum, present) in totals.items():
+                self.sums[species] -= count_sum
+                self.present[species] -= present
+                for queue in (self.max_queue[species], self.min_queue[species]):
+                    while queue and queue[0][0] <= limit:
+                        queue.popleft()
+                if not self.present[species]:
+                    del self.sums[species], self.present[species]
+                    del self.max_queue[species], self.min_queue[species]
+
+        while self.track_buckets and self.track_buckets[0][0] <= limit:
+            slot, bucket = self.track_buckets.popleft()
+            for track_id in bucket:
+                # IDs seen again later are in a newer bucket and stay in the window
+                if self.track_slot.get(track_id) == slot:
+                    del self.track_slot[track_id]
+                    species = self.track_species.pop(track_id)
+                    self.unique[species] -= 1
+                    if not self.unique[species]:
+                        del self.unique[species]
+
+    def snapshot(self):
+        """{species: {"mean", "max", "min", "unique"}} for the species seen in the window"""
+        frames = self.frames + self.slot_frames
+        stats = {}
+        for species in sorted(set(self.sums) | set(self.slot_counts) | set(self.unique)):
+            count_sum, present = self.sums.get(species, 0), self.present.get(species, 0)
+            slot_max = slot_min = None
+            open_stats = self.slot_counts.get(species)
+            if open_stats is not None:
+                count_sum += open_stats[0]
+                present += open_stats[1]
+                slot_max, slot_min = open_stats[2], open_stats[3]
+
+            maxima = [value for value in (slot_max,) if value is not None]
+            minima = [value for value in (slot_min,) if value is not None]
+            if self.max_queue.get(species):
+                maxima.append(self.max_queue[species][0][1])
+                minima.append(self.min_queue[species][0][1])
+            stats[species] = {
+                "mean": round(count_sum / frames, 3) if frames else 0,
+                "max": max(maxima, default=0),
+                # Any frame in the window without this species makes the minimum 0
+                "min": min(minima) if minima and present >= frames else 0,
+                "unique": self.unique.get(species, 0),
+            }
+        return stats
+
+
+class SpeciesWindows:
+    """SpeciesWindow statistics for several window lengths, fed from an analysed frame"""
+
+    def __init__(self, windows, names):
+        self.names = names
+        self.windows = {window_label(seconds): SpeciesWindow(seconds) for seconds in windows}
+
+    def update(self, timestamp, species_count, detections):
+        """Add one frame's species counts and tracked detections (postprocess.FrameDetections)"""
+        tracked = detections.ids >= 0
+        track_ids = detections.ids[tracked].tolist()
+        track_species = [self.names.get(class_id, "Unknown") for class_id in detections.cls[tracked].tolist()]
+        for window in self.windows.values():
+            window.update(timestamp, species_count, track_ids, track_species)
+
+    def snapshot(self):
+        return {label: window.snapshot() for label, window in self.windows.items()}
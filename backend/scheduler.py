@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from metrics import FRAME_ERRORS, FRAMES_SKIPPED, INFERENCES_REUSED, STAGE_SECONDS
+from pipeline import DropOldestQueue, QueueClosed
+
+
+class CameraFeed:
+    """A running camera as seen by the scheduler: where frames come from and where results go"""
+
+    def __init__(self, camera_id, in_queue, out_queue, tracker, skip_controller=None):
+        self.camera_id = camera_id
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.tracker = tracker
+        self.skip_controller = skip_controller
+        # Reused for frames the motion gate found static, if they were compared with last_index
+        self.last_result = None
+        self.last_index = None
+
+
+class InferenceScheduler:
+    """Runs frames from every running camera through one shared model on a single thread.
+
+    Cameras are visited round-robin, taking one frame per camera per pass,
+    until the batch is full or its oldest frame has waited max_wait_ms. The
+    whole batch is one model.predict call. Each camera's frames then go through
+    that camera's own tracker in decode order, so track IDs never mix between
+    cameras. Frames marked static by the decode stage's motion gate skip both
+    and get their camera's previous result, as long as that result is from the
+    frame the gate compared them with. The thread starts with the first
+    registered camera and exits when the last one leaves.
+    """
+
+    def __init__(self, model, max_batch_size=4, max_wait_ms=100, conf=0.5, iou=0.5, imgsz=640):
+        self.model = model
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.conf = conf
+        self.iou = iou
+        self.imgsz = imgsz
+        self.feeds = OrderedDict()
+        self.rotation = 0
+        self.thread = None
+        # Shared by every camera's input queue, so one wait covers all of them
+        self.condition = threading.Condition()
+
+    def make_queue(self, depth):
+        """Create a camera input queue the scheduler can wait on"""
+        return DropOldestQueue(depth, condition=self.condition)
+
+    def register(self, camera_id, in_queue, out_queue, tracker, skip_controller=None):
+        with self.condition:
+            self.feeds[camera_id] = CameraFeed(camera_id, in_queue, out_queue, tracker, skip_controller)
+            self._rebalance()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="inference-scheduler", daemon=True)
+                self.thread.start()
+            self.condition.notify_all()
+
+    def unregister(self, camera_id):
+        with self.condition:
+            self.feeds.pop(camera_id, None)
+            self._rebalance()
+            self.condition.notify_all()
+
+    def camera_ids(self):
+        with self.condition:
+            return list(self.feeds)
+
+    def _rebalance(self):
+        """Give each camera's frame skip controller an equal share of the inference budget"""
+        for feed in self.feeds.values():
+            if feed.skip_controller is not None:
+                feed.skip_controller.set_share(1.0 / len(self.feeds))
+
+    def _take_round_robin(self, batch):
+        feeds = list(self.feeds.values())
+        if not feeds:
+            return
+        start = self.rotation % len(feeds)
+        self.rotation += 1
+        feeds = feeds[start:] + feeds[:start]
+        took = True
+        while took and len(batch) < self.max_batch_size:
+            took = False
+            for feed in feeds:
+                if len(batch) >= self.max_batch_size:
+                    break
+                try:
+                    item = feed.in_queue.get_nowait()
+                except QueueClosed:
+                    continue
+                if item is not None:
+                    batch.append((feed, *item))
+                    took = True
+
+    def _collect(self):
+        """Wait for the next batch of (feed, frame_index, frame, reuse_from); None once no camera is registered"""
+        batch = []
+        deadline = None
+        with self.condition:
+            while True:
+                if not self.feeds:
+                    self.thread = None
+                    return None
+                self._take_round_robin(batch)
+                now = time.monotonic()
+                if batch and deadline is None:
+                    deadline = now + self.max_wait
+                if len(batch) >= self.max_batch_size or (batch and now >= deadline):
+                    return batch
+                self.condition.wait(0.1 if deadline is None else deadline - now)
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+
+            # A static frame is inferred anyway if its reference frame was dropped before inference, since
+            # the last result then predates whatever moved (a camera's first frame has nothing to reuse)
+            infer = []
+            inferred_index = {}
+            for feed, frame_index, _, reuse_from in batch:
+                last_index = inferred_index.get(feed, feed.last_index if feed.last_result is not None else None)
+                needed = reuse_from is None or last_index is None or reuse_from != last_index
+                if needed:
+                    inferred_index[feed] = frame_index
+                infer.append(needed)
+            frames = [frame for (_, _, frame, _), needed in zip(batch, infer) if needed]
+            results = []
+            latency = 0.0
+            if frames:
+                started = time.monotonic()
+                try:
+                    results = self.model.predict(frames, conf=self.conf, iou=self.iou, imgsz=self.imgsz,
+                                                 verbose=False)
+                except Exception as e:
+                    print(f"Error during inference for a batch of {len(frames)} frames: {e}")
+                    # One failed call, counted once for each camera that had frames in it
+                    for camera_id in {feed.camera_id for (feed, _, _, _), needed in zip(batch, infer) if needed}:
+                        FRAME_ERRORS.inc(camera_id, "inference")
+                    continue
+                latency = time.monotonic() - started
+
+            results = iter(results)
+            frames_per_feed = defaultdict(int)
+            for (feed, frame_index, frame, _), needed in zip(batch, infer):
+                if needed:
+                    try:
+                        feed.last_result = feed.tracker.update(next(results))
+                        feed.last_index = frame_index
+                    except Exception as e:
+                        print(f"Error during tracking for camera {feed.camera_id}, frame {frame_index}: {e}")
+                        FRAME_ERRORS.inc(feed.camera_id, "tracking")
+                        continue
+                    frames_per_feed[feed] += 1
+                    # The batch's time, shared evenly between the frames in it
+                    STAGE_SECONDS.observe(latency / len(frames), feed.camera_id, "inference")
+                else:
+                    INFERENCES_REUSED.inc(feed.camera_id)
+                dropped = feed.out_queue.dropped
+                feed.out_queue.put((frame_index, frame, feed.last_result))
+                if feed.out_queue.dropped != dropped:
+                    FRAMES_SKIPPED.inc(feed.camera_id, "result_queue")
+
+            for feed, count in frames_per_feed.items():
+                if feed.skip_controller is not None:
+                    feed.skip_controller.record_inference(latency * count / len(frames), count)
@@ -347,16 +347,25 @@
 import os
 import time
 import threading
-from collections import defaultdict
 
-import cv2
-import torch
 from dotenv import load_dotenv
-from flask import Flask, json, jsonify, request
+from flask import Flask, jsonify, request
 from flask import Response, stream_with_context
 from flask_cors import CORS
 from twilio.rest import Client
-from ultralytics import YOLO
+
+from alerts import AlertDispatcher, make_transport, parse_cooldowns
+from broadcast import SSE_KEEPALIVE
+from cameras import DEFAULT_CAMERA_ID, FFMPEG_BIN, CameraRegistry, parse_camera_sources
+from config import env_flag
+from fmp4 import ffmpeg_available
+from history import RESOLUTIONS, HistoryStore, pick_resolution
+from metrics import REGISTRY, Gauge, process_rss_bytes
+from model_loader import ModelLoader
+from profiler import SamplingProfiler
+from scheduler import InferenceScheduler
+from tiling import TiledDetector
+from zones import load_zone_config, parse_zones
 
 # Load environment variables
 load_dotenv()
@@ -373,310 +382,334 @@ twilio_number = os.getenv("TWILIO_NUMBER")
 recipient_number = os.getenv("RECIPIENT_NUMBER")
 client = Client(account_sid, auth_token)
 
+# Alerts go through one background dispatcher. ALERT_TRANSPORT is twilio, file (ALERT_FILE) or loopback;
+# ALERT_COOLDOWNS sets seconds between alerts of a kind per camera ("geofence=3600,startup=0")
+alert_transport = make_transport(os.getenv("ALERT_TRANSPORT"), client, twilio_number, recipient_number,
+                                 os.getenv("ALERT_FILE", "alerts.log"))
+alerts = AlertDispatcher(alert_transport, parse_cooldowns(os.getenv("ALERT_COOLDOWNS")),
+                         enabled=lambda: SMS_ENABLED)
+
 # Global flags
 SMS_ENABLED = True
 GEOFENCE_ALERT_ENABLED = False
 
-# Analysis thread management
-analysis_thread = None
-analysis_running = False
-analysis_stop_event = threading.Event()
-
-# Shared variables for analysis results (thread-safe with locks)
-analysis_lock = threading.Lock()
-current_analysis = {
-    "total_fish": 0,
-    "species_count": {},
-    "active_fish_ids": {},
-    "geofence_crossed": False,
-    "frame_count": 0,
-    "last_update": time.time(),
-    "system_status": "stopped"  # Changed from "initializing" to "stopped"
-}
-
-# Load model
-try:
-    model = YOLO(os.getenv("PT_FILE"))
-    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-    print(f"[INFO] Model loaded on {device}")
-    
-    # Remove automatic startup SMS - will be sent when analysis starts
-    
-except Exception as e:
-    print(f"[ERROR] Failed to load model: {e}")
-    model = None
+# Inference batching (frames per model call, max time to wait for a full batch)
+INFER_BATCH_SIZE = int(os.getenv("INFER_BATCH_SIZE", 4))
+INFER_BATCH_TIMEOUT_MS = float(os.getenv("INFER_BATCH_TIMEOUT_MS", 100))
+
+# Geofence zones per camera: inline JSON or a JSON file, {"camera_id" or "*": [zones]} or a bare list
+GEOFENCE_ZONES = load_zone_config(os.getenv("GEOFENCE_ZONES"))
+
+# Inference backend: pytorch runs PT_FILE directly; onnx and openvino run an export of it, made once
+# and cached in MODEL_CACHE_DIR. INFERENCE_INT8 quantises the export (openvino needs INT8_DATA)
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "pytorch").lower()
+INFERENCE_INT8 = env_flag("INFERENCE_INT8")
+INFERENCE_IMGSZ = int(os.getenv("INFERENCE_IMGSZ", 640))
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", "model_cache")
+
+# Tiled inference for high-resolution feeds: each frame runs as up to MAX_TILES overlapping
+# TILE_SIZE crops (plus the whole frame) in one batch, merged with cross-tile NMS
+TILED_INFERENCE = env_flag("TILED_INFERENCE")
+TILE_SIZE = int(os.getenv("TILE_SIZE", 640))
+TILE_OVERLAP = float(os.getenv("TILE_OVERLAP", 0.2))
+MAX_TILES = int(os.getenv("MAX_TILES", 8))
+
+# Per-frame count history: recent frames in memory, rollups and raw frames spilled to HISTORY_DB;
+# raw frames are kept on disk for HISTORY_RAW_RETENTION_HOURS
+HISTORY_DB = os.getenv("HISTORY_DB", "history.db")
+HISTORY_RING_SIZE = int(os.getenv("HISTORY_RING_SIZE", 10000))
+HISTORY_RAW_RETENTION_HOURS = float(os.getenv("HISTORY_RAW_RETENTION_HOURS", 24))
+# Most points in one /history response; auto resolution picks the finest that fits
+HISTORY_MAX_POINTS = int(os.getenv("HISTORY_MAX_POINTS", 5000))
+history = HistoryStore(HISTORY_DB, HISTORY_RING_SIZE,
+                       retention={"raw": HISTORY_RAW_RETENTION_HOURS * 3600})
+
+# On-demand sampling profiler at /debug/profile (off unless PROFILING_ENABLED); a profile
+# runs for at most PROFILE_MAX_SECONDS and nothing samples outside one
+PROFILING_ENABLED = env_flag("PROFILING_ENABLED")
+profiler = SamplingProfiler(max_seconds=float(os.getenv("PROFILE_MAX_SECONDS", 60)))
+
+# Load model in the background so the HTTP server is up straight away; set by on_model_ready.
+# The warm-up batch is the scheduler's largest (of tiles when tiling), so its shape is ready too
+model = None
+device = None
+model_loader = ModelLoader(os.getenv("PT_FILE"), INFERENCE_BACKEND, INFERENCE_IMGSZ, INFERENCE_INT8,
+                           MODEL_CACHE_DIR, os.getenv("INT8_DATA"),
+                           warmup_batch=INFER_BATCH_SIZE * (MAX_TILES if TILED_INFERENCE else 1)).start()
 
 def send_sms_alert(message_body):
-    """Send SMS alert using Twilio"""
-    if SMS_ENABLED:
-        try:
-            message = client.messages.create(
-                body=message_body,
-                from_=twilio_number,
-                to=recipient_number
-            )
-            print(f"SMS sent: {message_body} (SID: {message.sid})")
-            return f"SMS sent: {message_body} (SID: {message.sid})"
-        except Exception as e:
-            print(f"Failed to send SMS: {e}")
-            return f"Failed to send SMS: {e}"
-    else:
-        print(f"SMS Disabled: {message_body}")
-        return f"SMS Disabled: {message_body}"
-
-def update_analysis_results(total_fish, species_count, active_fish_ids, geofence_crossed, frame_count, status="running"):
-    """Thread-safe update of analysis results"""
-    global current_analysis
-    with analysis_lock:
-        current_analysis.update({
-            "total_fish": total_fish,
-            "species_count": dict(species_count),
-            "active_fish_ids": dict(active_fish_ids),
-            "geofence_crossed": geofence_crossed,
-            "frame_count": frame_count,
-            "last_update": time.time(),
-            "system_status": status
-        })
-
-def get_analysis_results():
-    """Thread-safe get analysis results"""
-    with analysis_lock:
-        return current_analysis.copy()
-
-def run_fish_detection_analysis():
-    """Core fish detection and analysis logic from main.py"""
-    global analysis_running
-    
-    if model is None:
-        print("[ERROR] Model not loaded for analysis")
-        return
-
-    video_path = os.getenv("VIDEO_FEED")
-    if not video_path or not os.path.exists(video_path):
-        print(f"[ERROR] Video path invalid: {video_path}")
-        return
-
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        print("[ERROR] Could not open video for analysis")
-        return
-
-    # Settings from main.py
-    geofence_line_y = 50
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    if fps == 0:
-        print("Warning: Unable to fetch FPS. Defaulting to 30.")
-        fps = 30
-
-    frame_skip = 2
-    frame_count = 0
-    id_lifetime_frames = 30
-    active_fish_ids = {}
-    species_count = defaultdict(int)
-    
-    # Track last alert time
-    last_alert_time = 0
-    alert_interval = 3600  # 1 hour in seconds
-
-    print("[INFO] Starting fish detection analysis...")
-    analysis_running = True
-    
-    # Send startup SMS when analysis actually starts
-    threading.Thread(target=lambda: send_sms_alert("AquaAnalyzer System is Live: Monitoring has started."), daemon=True).start()
-    
-    # Update status to running
-    update_analysis_results(0, {}, {}, False, 0, "running")
-
-    try:
-        while not analysis_stop_event.is_set():
-            ret, frame = cap.read()
-
-            if not ret:
-                print("Reached the end of the video. Restarting...")
-                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                frame_count = 0
-                active_fish_ids.clear()
-                species_count.clear()
-                continue
-
-            if frame_count % frame_skip == 0:
-                try:
-                    results = model.track(frame, persist=True, conf=0.5, iou=0.5)
-                    current_frame = frame_count
-                    geofence_crossed = False
-                    species_count.clear()  # Reset species count for the current frame
-
-                    for obj in results[0].boxes:
-                        if hasattr(obj, 'id') and obj.id is not None:
-                            object_id = int(obj.id)
-                            active_fish_ids[object_id] = current_frame
-
-                        if hasattr(obj, 'cls') and obj.cls is not None:
-                            class_id = int(obj.cls[0]) if isinstance(obj.cls, torch.Tensor) else int(obj.cls)
-                            class_name = model.names.get(class_id, "Unknown")
-                            species_count[class_name] += 1
-
-                        x1, y1, x2, y2 = obj.xyxy[0].cpu().numpy()
-
-                        # Check for geofence crossing
-                        if y2 > geofence_line_y:
-                            geofence_crossed = False
-
-                    # Remove inactive fish IDs
-                    active_fish_ids = {id: frame for id, frame in active_fish_ids.items()
-                                       if current_frame - frame <= id_lifetime_frames}
-
-                    total_fish_count = len(active_fish_ids)
-
-                    # Update shared analysis results
-                    update_analysis_results(total_fish_count, species_count, active_fish_ids, geofence_crossed, frame_count)
-
-                    # Send SMS alert if geofence is crossed and alerts are enabled
-                    current_time = time.time()
-                    if GEOFENCE_ALERT_ENABLED and geofence_crossed and (current_time - last_alert_time > alert_interval):
-                        threading.Thread(target=lambda: send_sms_alert("ALERT: Geofence line crossed! Oxygen levels may be low."), daemon=True).start()
-                        print("ALERT: Geofence line crossed! Oxygen levels may be low.")
-                        last_alert_time = current_time
-
-                except Exception as e:
-                    print(f"Error during processing frame {frame_count}: {e}")
-
-            frame_count += 1
-
-    except Exception as e:
-        print(f"[ERROR] Analysis loop error: {e}")
-    finally:
-        cap.release()
-        analysis_running = False
-        update_analysis_results(0, {}, {}, False, frame_count, "stopped")
-        print("[INFO] Fish detection analysis stopped")
-
-def start_analysis_thread():
-    """Start the analysis thread"""
-    global analysis_thread, analysis_running
-    
-    if analysis_running:
-        print("[INFO] Analysis already running")
+    """Send an SMS right away, bypassing the alert queue"""
+    result = alerts.send_now(message_body)
+    print(result)
+    return result
+
+def handle_camera_alert(camera, message, kind):
+    """Queue an alert raised by a camera's analysis loop; returns True if it was accepted"""
+    if kind == "geofence" and not GEOFENCE_ALERT_ENABLED:
         return False
-    
-    # Reset the stop event
-    analysis_stop_event.clear()
-    
-    analysis_thread = threading.Thread(target=run_fish_detection_analysis, daemon=True)
-    analysis_thread.start()
-    print("[INFO] Analysis thread started")
-    return True
-
-def stop_analysis_thread():
+    if camera.camera_id != DEFAULT_CAMERA_ID:
+        message = f"[{camera.camera_id}] {message}"
+    accepted = alerts.submit(kind, message, camera.camera_id)
+    if accepted and kind != "startup":
+        print(message)
+    return accepted
+
+def stream_settings():
+    """Settings flags included in every streamed analysis payload"""
+    return {
+        "sms_enabled": SMS_ENABLED,
+        "geofence_alert_enabled": GEOFENCE_ALERT_ENABLED
+    }
+
+def configured_zones(camera_id):
+    """Zones from GEOFENCE_ZONES for a camera (its own entry, else "*"); None means the default line"""
+    config = GEOFENCE_ZONES.get(camera_id, GEOFENCE_ZONES.get("*"))
+    if not config:
+        return None
+    try:
+        return parse_zones(config)
+    except ValueError as e:
+        print(f"[ERROR] Invalid GEOFENCE_ZONES for camera {camera_id}: {e}")
+        return None
+
+# Every camera shares the one loaded model through a single inference scheduler
+scheduler = InferenceScheduler(model, INFER_BATCH_SIZE, INFER_BATCH_TIMEOUT_MS, conf=0.5, iou=0.5,
+                               imgsz=INFERENCE_IMGSZ)
+cameras = CameraRegistry(model, scheduler, stream_extras=stream_settings, alert_handler=handle_camera_alert,
+                         history=history)
+for camera_id, source in parse_camera_sources(os.getenv("VIDEO_FEED"), os.getenv("CAMERAS")).items():
+    cameras.add(camera_id, source, configured_zones(camera_id))
+
+# Server-state gauges for /metrics, read at scrape time; the pipeline records its own metrics
+REGISTRY.register(Gauge("aqua_stream_subscribers", "Clients connected to each camera's streams",
+                         ("camera", "stream"), lambda: {
+                             (camera.camera_id, stream): hub.subscribers
+                             for camera in cameras.all()
+                             for stream, hub in (("sse", camera.analysis_hub), ("mjpeg", camera.video_feed_hub),
+                                                 ("mjpeg_annotated", camera.annotated_feed_hub),
+                                                 ("mp4", camera.mp4_feed_hub))}))
+REGISTRY.register(Gauge("aqua_alert_queue_depth", "Alerts waiting to be sent",
+                        collect=lambda: {(): alerts.stats()["queued"]}))
+REGISTRY.register(Gauge("aqua_cameras_running", "Cameras registered with the inference scheduler",
+                        collect=lambda: {(): len(scheduler.camera_ids())}))
+REGISTRY.register(Gauge("aqua_model_ready", "1 once the model is loaded and warmed up",
+                        collect=lambda: {(): int(model_loader.ready())}))
+REGISTRY.register(Gauge("process_resident_memory_bytes", "Resident memory size in bytes",
+                        collect=lambda: {(): process_rss_bytes()}))
+
+# Cameras asked to start while the model was still loading
+pending_starts = set()
+pending_lock = threading.Lock()
+
+def on_model_ready(loaded_model):
+    """Hand the loaded model to the scheduler and cameras, then start the queued cameras"""
+    global model, device
+    # Only inference goes through the tiles; cameras just need the class names
+    scheduler.model = (TiledDetector(loaded_model, TILE_SIZE, TILE_OVERLAP, MAX_TILES) if TILED_INFERENCE
+                       else loaded_model)
+    device = model_loader.device
+    # Set last: request_start() queues cameras until cameras.model is there, and the queue is drained below
+    model = cameras.model = loaded_model
+    with pending_lock:
+        queued = list(pending_starts)
+        pending_starts.clear()
+    for camera_id in queued:
+        camera = cameras.get(camera_id)
+        if camera is not None:
+            print(f"[INFO] Model ready, starting queued analysis on camera {camera_id}")
+            camera.start()
+
+model_loader.when_ready(on_model_ready)
+
+def request_start(camera, endpoint=None):
+    """Start a camera's analysis, or queue it until the model is ready.
+
+    Returns "started", "running", "queued" or "failed" (the model could not be loaded).
+    """
+    with pending_lock:
+        if model_loader.failed():
+            return "failed"
+        # The loader reports ready just before on_model_ready hands the model over
+        if not model_loader.ready() or cameras.model is None:
+            pending_starts.add(camera.camera_id)
+            return "queued"
+    started = camera.ensure_started(endpoint) if endpoint else camera.start()
+    return "started" if started else "running"
+
+def cancel_queued_start(camera):
+    """Drop a start queued by request_start; True if there was one"""
+    with pending_lock:
+        if camera.camera_id in pending_starts:
+            pending_starts.discard(camera.camera_id)
+            return True
+    return False
+
+def lookup_camera(camera_id=None):
+    """The requested camera, or the default one for the original single-feed routes"""
+    return cameras.default() if camera_id is None else cameras.get(camera_id)
+
+def unknown_camera(camera_id):
+    return jsonify({"error": f"Unknown camera: {camera_id or DEFAULT_CAMERA_ID}"}), 404
+
+def start_analysis_thread(camera_id=None):
+    """Start the analysis thread (queued if the model is still loading); True unless already running or failed"""
+    camera = lookup_camera(camera_id)
+    return request_start(camera) in ("started", "queued") if camera else False
+
+def ensure_analysis_started(endpoint, camera_id=None):
+    """Start the analysis on behalf of a stream endpoint; True if this call started or queued it"""
+    camera = lookup_camera(camera_id)
+    return request_start(camera, endpoint) in ("started", "queued") if camera else False
+
+def stop_analysis_thread(camera_id=None):
     """Stop the analysis thread"""
-    global analysis_running
-    
-    if not analysis_running:
-        print("[INFO] Analysis not running")
+    camera = lookup_camera(camera_id)
+    if camera is None:
         return False
-    
-    print("[INFO] Stopping analysis thread...")
-    analysis_stop_event.set()
-    
-    if analysis_thread and analysis_thread.is_alive():
-        analysis_thread.join(timeout=5)  # Wait up to 5 seconds for thread to stop
-    
-    analysis_running = False
-    update_analysis_results(0, {}, {}, False, 0, "stopped")
-    print("[INFO] Analysis thread stopped")
-    return True
+    return cancel_queued_start(camera) or camera.stop()
+
+def get_analysis_results(camera_id=None):
+    """Thread-safe get analysis results"""
+    camera = lookup_camera(camera_id)
+    return camera.get_analysis_results() if camera else {}
 
 @app.route('/video_feed', methods=["GET"])
-def video_feed():
+@app.route('/cameras/<camera_id>/video_feed', methods=["GET"])
+def video_feed(camera_id=None):
     """Stream plain video frames without annotations"""
-    def generate_frames():
-        cap = cv2.VideoCapture(os.getenv("VIDEO_FEED"))
-        
-        if not cap.isOpened():
-            print("[ERROR] Could not open video for streaming")
-            return
+    camera = lookup_camera(camera_id)
+    if camera is None:
+        return unknown_camera(camera_id)
+
+    return Response(stream_with_context(camera.video_feed_hub.subscribe()),
+                    mimetype='multipart/x-mixed-replace; boundary=frame')
+
+@app.route('/video_feed.mp4', methods=["GET"])
+@app.route('/cameras/<camera_id>/video_feed.mp4', methods=["GET"])
+def video_feed_mp4(camera_id=None):
+    """Stream the plain video as H.264 in fragmented MP4, encoded once for all viewers"""
+    camera = lookup_camera(camera_id)
+    if camera is None:
+        return unknown_camera(camera_id)
+    if not ffmpeg_available(FFMPEG_BIN):
+        return jsonify({"error": f"{FFMPEG_BIN} not found; the MP4 feed needs ffmpeg with libx264"}), 503
+
+    # Joins at the newest fragment, which starts with a keyframe
+    return Response(stream_with_context(camera.mp4_feed_hub.subscribe(replay_latest=True)),
+                    mimetype='video/mp4')
+
+@app.route('/annotated_feed', methods=["GET"])
+@app.route('/cameras/<camera_id>/annotated_feed', methods=["GET"])
+def annotated_feed(camera_id=None):
+    """Stream the analysed frames with boxes, IDs, species labels and counts drawn on"""
+    if model_loader.failed():
+        return jsonify({"error": "Model not loaded."}), 500
+    camera = lookup_camera(camera_id)
+    if camera is None:
+        return unknown_camera(camera_id)
 
-        try:
-            while True:
-                success, frame = cap.read()
-                if not success:
-                    # Restart video when it ends
-                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    continue
-
-                # Resize frame to match main.py behavior
-                height, width = frame.shape[:2]
-                if width > 0 and height > 0:
-                    new_width = 1080
-                    new_height = int((new_width / width) * height)
-                    frame_resized = cv2.resize(frame, (new_width, new_height))
-                else:
-                    frame_resized = frame
-
-                # Encode and yield frame (plain video, no annotations)
-                _, buffer = cv2.imencode('.jpg', frame_resized)
-                frame_bytes = buffer.tobytes()
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-
-        except Exception as e:
-            print(f"[ERROR] Video streaming error: {e}")
-        finally:
-            cap.release()
-
-    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    # Frames start flowing once the model is ready, if it is still loading
+    request_start(camera, "/annotated_feed")
+
+    return Response(stream_with_context(camera.annotated_feed_hub.subscribe()),
+                    mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/analyze_stream', methods=['GET'])
-def stream_analysis():
+@app.route('/cameras/<camera_id>/analyze_stream', methods=['GET'])
+def stream_analysis(camera_id=None):
     """Stream analysis results as Server-Sent Events"""
     print("[SSE] /analyze_stream endpoint HIT")
-    if model is None:
+    if model_loader.failed():
         return jsonify({"error": "Model not loaded."}), 500
+    camera = lookup_camera(camera_id)
+    if camera is None:
+        return unknown_camera(camera_id)
 
-    # Start analysis when this endpoint is hit
-    if not analysis_running:
-        print("[INFO] Starting analysis thread from /analyze_stream")
-        start_analysis_thread()
+    # Start analysis when this endpoint is hit (queued while the model is loading)
+    if request_start(camera, "/analyze_stream") == "started":
         time.sleep(1)  # Give analysis thread time to start
 
-    def generate():
-        last_update = 0
-        while True:
-            results = get_analysis_results()
-            
-            # Only send update if data has changed
-            if results["last_update"] > last_update:
-                last_update = results["last_update"]
-                results.update({
-                    "timestamp": time.time(),
-                    "sms_enabled": SMS_ENABLED,
-                    "geofence_alert_enabled": GEOFENCE_ALERT_ENABLED
-                })
-                yield f"data: {json.dumps(results)}\n\n"
-            
-            time.sleep(0.1)  # Check for updates every 100ms
-
-    return Response(generate(), mimetype="text/event-stream")
+    # Each update is serialised once by Camera.publish_analysis_results and shared by every client
+    stream = camera.analysis_hub.subscribe(replay_latest=True, keepalive=SSE_KEEPALIVE)
+    return Response(stream_with_context(stream), mimetype="text/event-stream")
 
 @app.route('/start_analysis', methods=['POST'])
-def start_analysis():
+@app.route('/cameras/<camera_id>/start', methods=['POST'])
+def start_analysis(camera_id=None):
     """Manually start the analysis"""
-    if model is None:
-        return jsonify({"error": "Model not loaded."}), 500
-    
-    if start_analysis_thread():
+    camera = lookup_camera(camera_id)
+    if camera is None:
+        return unknown_camera(camera_id)
+
+    outcome = request_start(camera)
+    if outcome == "failed":
+        return jsonify({"error": "Model not loaded.", "model": model_loader.status()}), 500
+    if outcome == "queued":
+        return jsonify({"message": "Analysis will start when the model is ready",
+                        "model": model_loader.status()}), 202
+    if outcome == "started":
         return jsonify({"message": "Analysis started successfully"}), 200
     else:
         return jsonify({"message": "Analysis already running"}), 200
 
 @app.route('/stop_analysis', methods=['POST'])
-def stop_analysis():
+@app.route('/cameras/<camera_id>/stop', methods=['POST'])
+def stop_analysis(camera_id=None):
     """Manually stop the analysis"""
-    if stop_analysis_thread():
+    camera = lookup_camera(camera_id)
+    if camera is None:
+        return unknown_camera(camera_id)
+
+    if cancel_queued_start(camera):
+        return jsonify({"message": "Queued analysis start cancelled"}), 200
+    if camera.stop():
         return jsonify({"message": "Analysis stopped successfully"}), 200
     else:
         return jsonify({"message": "Analysis not running"}), 200
 
+@app.route('/cameras', methods=['GET', 'POST'])
+def camera_list():
+    """List cameras, or register a new one"""
+    if request.method == 'GET':
+        return jsonify({"cameras": [camera.status() for camera in cameras.all()]}), 200
+
+    data = request.get_json() or {}
+    camera_id = data.get('camera_id')
+    source = data.get('source')
+    if not camera_id or not source:
+        return jsonify({"error": "camera_id and source are required"}), 400
+
+    zones = None
+    if data.get('zones') is not None:
+        try:
+            zones = parse_zones(data['zones'])
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+    else:
+        zones = configured_zones(camera_id)
+
+    try:
+        camera = cameras.add(camera_id, source, zones)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 409
+
+    if data.get('start'):
+        request_start(camera)
+    return jsonify({"message": "Camera added", "camera": camera.status()}), 201
+
+@app.route('/cameras/<camera_id>', methods=['GET', 'DELETE'])
+def camera_detail(camera_id):
+    """Get one camera's status, or stop and remove it"""
+    if request.method == 'DELETE':
+        if not cameras.remove(camera_id):
+            return unknown_camera(camera_id)
+        return jsonify({"message": f"Camera {camera_id} removed"}), 200
+
+    camera = cameras.get(camera_id)
+    if camera is None:
+        return unknown_camera(camera_id)
+    return jsonify(camera.status()), 200
+
 @app.route('/settings', methods=['GET', 'POST'])
 def settings():
     """Get or update system settings"""
@@ -696,6 +729,10 @@ def settings():
         
         if 'geofence_alert_enabled' in data:
             GEOFENCE_ALERT_ENABLED = bool(data['geofence_alert_enabled'])
+
+        # Settings are part of the streamed payload
+        for camera in cameras.all():
+            camera.publish_analysis_results()
         
         return jsonify({
             "message": "Settings updated successfully",
@@ -715,18 +752,85 @@ def send_test_sms():
 @app.route('/status', methods=['GET'])
 def system_status():
     """Get system status"""
+    camera = lookup_camera()
     results = get_analysis_results()
     
     return jsonify({
-        "system_status": results["system_status"],
+        "system_status": results.get("system_status", "stopped"),
         "model_loaded": model is not None,
-        "analysis_running": analysis_running,
-        "last_update": results["last_update"],
-        "uptime": time.time() - results.get("start_time", time.time()),
-        "frame_count": results["frame_count"],
-        "device": str(device) if model else "N/A"
+        "model": model_loader.status(),
+        "analysis_running": camera.analysis_running if camera else False,
+        "last_update": results.get("last_update"),
+        "uptime": time.time() - results["start_time"]
+        if camera and camera.analysis_running and "start_time" in results else 0,
+        "frame_count": results.get("frame_count", 0),
+        "device": str(device) if model else "N/A",
+        "frame_skip": camera.frame_skip_controller.snapshot() if camera and camera.frame_skip_controller else None,
+        "motion": camera.motion_gate.snapshot() if camera and camera.motion_gate else None,
+        "capture": camera.capture.snapshot() if camera and camera.capture else None,
+        "tiled_inference": {"tile_size": TILE_SIZE, "overlap": TILE_OVERLAP, "max_tiles": MAX_TILES}
+        if TILED_INFERENCE else None,
+        "cameras": [registered.camera_id for registered in cameras.all()],
+        "cameras_running": scheduler.camera_ids(),
+        "alerts": alerts.stats()
     }), 200
 
+@app.route('/history', methods=['GET'])
+def history_query():
+    """Fish counts for a camera over a time range: ?camera=&from=&to=&resolution=
+
+    from and to are unix times (default: the last hour). resolution is raw,
+    second, minute, hour or auto (the default), which picks one from the range.
+    """
+    camera_id = request.args.get('camera', DEFAULT_CAMERA_ID)
+    try:
+        end = float(request.args.get('to', time.time()))
+        start = float(request.args.get('from', end - 3600))
+    except ValueError:
+        return jsonify({"error": "from and to must be unix timestamps"}), 400
+    if start > end:
+        return jsonify({"error": "from must not be after to"}), 400
+
+    resolution = request.args.get('resolution', 'auto')
+    if resolution == 'auto':
+        resolution = pick_resolution(end - start, HISTORY_MAX_POINTS)
+    if resolution != 'raw' and resolution not in RESOLUTIONS:
+        return jsonify({"error": f"resolution must be raw, auto or one of {', '.join(RESOLUTIONS)}"}), 400
+
+    # Capped at the newest HISTORY_MAX_POINTS; truncated says the older ones were left out
+    points, truncated = history.query(camera_id, start, end, resolution, HISTORY_MAX_POINTS)
+    return jsonify({"camera": camera_id, "from": start, "to": end, "resolution": resolution,
+                    "points": points, "truncated": truncated}), 200
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Pipeline and server metrics in the Prometheus text format"""
+    return Response(REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.route('/debug/profile', methods=['GET', 'POST'])
+def profile():
+    """Sample thread stacks for a while and return them collapsed, for flamegraph.pl or speedscope
+
+    ?seconds= (default 10), ?hz= (default 100) and ?threads= (comma-separated thread name
+    substrings, e.g. "analysis,decode,scheduler,Thread-"; default every thread).
+    """
+    if not PROFILING_ENABLED:
+        return jsonify({"error": "Profiling is disabled (set PROFILING_ENABLED)"}), 404
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        hz = float(request.args.get('hz', 100))
+    except ValueError:
+        return jsonify({"error": "seconds and hz must be numbers"}), 400
+    threads = [part for part in request.args.get('threads', '').split(',') if part]
+
+    profiled = profiler.profile(seconds, hz, threads)
+    if profiled is None:
+        return jsonify({"error": "A profile is already running"}), 409
+    lines, summary = profiled
+    print(f"[INFO] Profile taken: {summary}")
+    headers = {f"X-Profile-{key.replace('_', '-').title()}": str(value) for key, value in summary.items()}
+    return Response("\n".join(lines) + "\n", content_type="text/plain; charset=utf-8", headers=headers)
+
 @app.route('/', methods=['GET'])
 def root():
     """Root endpoint"""
@@ -734,6 +838,7 @@ def root():
 
 if __name__ == '__main__':
     # Remove automatic analysis thread start
+    # For many concurrent stream clients use the ASGI server instead: python asgi.py
     print(f"[INFO] Starting Flask server on http://0.0.0.0:5000")
     print(f"[INFO] Analysis will start when /analyze_stream endpoint is accessed")
-    app.run(host="0.0.0.0", port=5000, debug=True, threaded=True)
\ No newline at end of file
+    app.run(host="0.0.0.0", port=5000, threaded=True)
@@ -0,0 +1,72 @@
+from alerts import AlertDispatcher, LoopbackTransport
+
+
+def dispatcher(**kwargs):
+    clock = {"now": 1000.0}
+    # A long batch window keeps accepted alerts in the queue until close()
+    alerts = AlertDispatcher(LoopbackTransport(), cooldowns={"geofence": 3600}, batch_window=30, max_batch=10,
+                             clock=lambda: clock["now"], **kwargs)
+    return alerts, clock
+
+
+def test_cooldown_per_kind_and_source():
+    alerts, clock = dispatcher()
+    try:
+        assert alerts.submit("geofence", "crossed", "tank1")
+        assert not alerts.submit("geofence", "crossed again", "tank1")
+        assert alerts.submit("geofence", "crossed", "tank2")
+        clock["now"] += 3600
+        assert alerts.submit("geofence", "crossed later", "tank1")
+    finally:
+        alerts.close()
+    assert alerts.stats()["suppressed"] == 1
+
+
+def test_dropped_alert_does_not_hold_the_cooldown():
+    alerts, _ = dispatcher(queue_size=1)
+    try:
+        assert alerts.submit("geofence", "crossed", "tank1")
+        # The full queue drops tank1's alert before it was sent
+        assert alerts.submit("geofence", "crossed", "tank2")
+        assert alerts.stats()["dropped"] == 1
+        assert alerts.submit("geofence", "crossed again", "tank1")
+    finally:
+        alerts.close()
+    assert alerts.transport.sent == ["crossed again"]
+
+
+class FailFirstTransport(LoopbackTransport):
+    def send(self, body):
+        if body == "first":
+            raise ConnectionError("network down")
+        return super().send(body)
+
+
+def test_failed_alert_keeps_a_newer_alerts_cooldown():
+    clock = {"now": 1000.0}
+    alerts = AlertDispatcher(FailFirstTransport(), cooldowns={"geofence": 3600}, batch_window=0.5, max_batch=1,
+                             max_retries=0, clock=lambda: clock["now"])
+    try:
+        # Both queued for the same kind and source before the first one's delivery fails
+        assert alerts.submit("geofence", "first", "tank1")
+        clock["now"] += 3600
+        assert alerts.submit("geofence", "second", "tank1")
+    finally:
+        alerts.close()
+    assert alerts.stats()["failed"] == 1
+    assert alerts.transport.sent == ["second"]
+    # "second" was sent and still holds the cooldown
+    assert not alerts.submit("geofence", "third", "tank1")
+
+
+def test_dropped_alert_keeps_a_newer_alerts_cooldown():
+    alerts, clock = dispatcher(queue_size=2)
+    try:
+        assert alerts.submit("geofence", "first", "tank1")
+        clock["now"] += 3600
+        assert alerts.submit("geofence", "second", "tank1")
+        # Drops "first", whose cooldown "second" has already replaced
+        assert alerts.submit("geofence", "crossed", "tank2")
+        assert not alerts.submit("geofence", "third", "tank1")
+    finally:
+        alerts.close()
@@ -0,0 +1,37 @@
+import json
+import os
+import subprocess
+import sys
+
+from analyze_batch import find_videos
+
+
+def test_find_videos_names_same_named_files_apart(tmp_path):
+    for relative in ("tank1/day1.mp4", "tank2/day1.mp4", "tank2/notes.txt", "day1.avi"):
+        path = tmp_path / "videos" / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch()
+    single = tmp_path / "day1.mp4"
+    single.touch()
+
+    videos = find_videos([str(tmp_path / "videos"), str(single)])
+    assert [os.path.relpath(path, tmp_path) for path, _ in videos] == [
+        os.path.join("videos", "day1.avi"), os.path.join("videos", "tank1", "day1.mp4"),
+        os.path.join("videos", "tank2", "day1.mp4"), "day1.mp4"]
+    assert [name for _, name in videos] == [
+        "day1", os.path.join("tank1", "day1"), os.path.join("tank2", "day1"), "day1-2"]
+
+
+def test_failed_workers_are_reported_per_video(tmp_path):
+    for relative in ("a/day1.mp4", "b/day1.mp4"):
+        (tmp_path / relative).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / relative).touch()
+    # An unknown backend makes every worker's initializer fail
+    run = subprocess.run([sys.executable, "analyze_batch.py", str(tmp_path), "--workers", "2", "--backend", "bogus"],
+                         cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, timeout=300)
+    assert run.returncode == 1
+    summaries = [json.loads(line) for line in run.stdout.splitlines()]
+    assert sorted(summary["video"] for summary in summaries) == sorted(
+        str(tmp_path / relative) for relative in ("a/day1.mp4", "b/day1.mp4"))
+    assert all("error" in summary for summary in summaries)
+    assert json.loads(run.stderr.splitlines()[-1])["failed"] == 2
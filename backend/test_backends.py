@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+
+import pytest
+
+import backends
+from backends import cached_export_path, check_backend_packages, export_cached, load_model
+from benchmarks.bench_pipeline import StubDetector
+from postprocess import extract_detections
+
+
+@pytest.fixture
+def weights(tmp_path):
+    path = tmp_path / "fish.pt"
+    path.write_bytes(b"weights")
+    return str(path)
+
+
+class FakeYOLO:
+    """Exports an OpenVINO-style model directory next to the weights"""
+
+    def __init__(self, path, task=None):
+        self.path = path
+
+    def export(self, **options):
+        exported = os.path.splitext(self.path)[0] + "_openvino_model"
+        os.makedirs(exported)
+        with open(os.path.join(exported, "model.xml"), "w") as f:
+            f.write("exported")
+        return exported
+
+
+class StubYOLO(StubDetector):
+    """The benchmark stub detector behind ultralytics' YOLO: "exports" are files it can load again"""
+
+    loaded = []
+    exported = []
+
+    def __init__(self, path, task=None):
+        super().__init__()
+        self.path = path
+        StubYOLO.loaded.append((os.path.basename(path), task))
+
+    def export(self, format, imgsz, dynamic, **options):
+        StubYOLO.exported.append((format, imgsz))
+        exported = os.path.splitext(self.path)[0] + ".onnx"
+        with open(exported, "w") as f:
+            f.write("exported")
+        return exported
+
+
+def test_exported_backend_is_exported_once_and_detects_like_the_weights(weights, tmp_path, monkeypatch,
+                                                                         synthetic_frames, stub_detector):
+    import ultralytics
+
+    monkeypatch.setattr(ultralytics, "YOLO", StubYOLO)
+    monkeypatch.setattr(StubYOLO, "loaded", [])
+    monkeypatch.setattr(StubYOLO, "exported", [])
+    monkeypatch.setattr(backends, "check_backend_packages", lambda backend: None)
+    cache_dir = str(tmp_path / "cache")
+    models = [load_model(weights, "onnx", 320, cache_dir=cache_dir) for _ in range(2)]
+
+    target = os.path.basename(cached_export_path(weights, "onnx", 320, False, cache_dir))
+    assert StubYOLO.exported == [("onnx", 320)]
+    assert StubYOLO.loaded == [("fish.pt", None), (target, "detect"), (target, "detect")]
+    # The export's working copy is gone; only the model and its lock file remain
+    assert sorted(os.listdir(cache_dir)) == [target, f"{target}.lock"]
+    for model in models:
+        for result, expected in zip(model.predict(synthetic_frames[:8]), stub_detector.predict(synthetic_frames[:8])):
+            result, expected = extract_detections(result), extract_detections(expected)
+            assert len(result.xyxy) > 0
+            assert (result.xyxy == expected.xyxy).all() and (result.cls == expected.cls).all()
+
+
+def test_concurrent_exports_run_once(weights, tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    exports = []
+
+    def slow_export(weights, backend, imgsz, int8, cache_dir, int8_data, target):
+        exports.append(target)
+        time.sleep(0.2)
+        os.makedirs(target)
+
+    monkeypatch.setattr(backends, "_export", slow_export)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(export_cached(weights, "openvino", cache_dir=cache_dir)))
+               for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    target = cached_export_path(weights, "openvino", 640, False, cache_dir)
+    assert exports == [target]
+    assert results == [target] * 3
+
+
+def test_export_that_loses_the_race_keeps_the_existing_model(weights, tmp_path, monkeypatch):
+    import ultralytics
+
+    monkeypatch.setattr(ultralytics, "YOLO", FakeYOLO)
+    cache_dir = str(tmp_path / "cache")
+    target = cached_export_path(weights, "openvino", 640, False, cache_dir)
+    os.makedirs(target)
+    with open(os.path.join(target, "model.xml"), "w") as f:
+        f.write("first")
+
+    # The target appeared after the exists() check, e.g. written without the lock
+    backends._export(weights, "openvino", 640, False, cache_dir, None, target)
+    with open(os.path.join(target, "model.xml")) as f:
+        assert f.read() == "first"
+    assert sorted(os.listdir(cache_dir)) == [os.path.basename(target)]
+
+
+def test_missing_backend_package_is_named(monkeypatch):
+    monkeypatch.setattr(backends.importlib.util, "find_spec", lambda name: None if name == "onnxruntime" else True)
+    with pytest.raises(ImportError, match="onnxruntime"):
+        check_backend_packages("onnx")
+    check_backend_packages("openvino")
+    check_backend_packages("pytorch")
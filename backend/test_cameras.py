@@ -0,0 +1,39 @@
+import json
+
+from cameras import Camera, CameraRegistry
+
+
+def latest_payload(camera):
+    _, payload = camera.analysis_hub.latest()
+    assert payload.startswith(b"data: ")
+    return json.loads(payload[len(b"data: "):])
+
+
+def test_stop_keeps_the_run_totals():
+    camera = Camera("tank1", "/videos/tank1.mp4", CameraRegistry(None, None))
+    # What the analysis thread publishes as it winds down
+    camera.update_analysis_results(0, {}, {}, False, 120, "stopped", unique_fish_total=13,
+                                   unique_species_count={"tilapia": 9, "catfish": 4},
+                                   zones={"geofence": {"inside": 0, "entered": 5, "exited": 5}},
+                                   species_windows={"10s": {"tilapia": {"mean": 2.5, "max": 3, "min": 1,
+                                                                        "unique": 4}}})
+    camera.analysis_running = True
+
+    assert camera.stop()
+
+    payload = latest_payload(camera)
+    assert payload["system_status"] == "stopped"
+    assert payload["total_fish"] == 0
+    assert payload["species_count"] == {}
+    assert payload["active_fish_ids"] == {}
+    assert payload["frame_count"] == 120
+    assert payload["unique_fish_total"] == 13
+    assert payload["unique_species_count"] == {"tilapia": 9, "catfish": 4}
+    assert payload["zones"] == {"geofence": {"inside": 0, "entered": 5, "exited": 5}}
+    assert payload["species_windows"]["10s"]["tilapia"]["unique"] == 4
+    assert not camera.analysis_running
+
+
+def test_stop_when_not_running():
+    camera = Camera("tank1", "/videos/tank1.mp4", CameraRegistry(None, None))
+    assert not camera.stop()
@@ -0,0 +1,10 @@
+from config import env_flag
+
+
+def test_env_flag(monkeypatch):
+    monkeypatch.delenv("AQUA_TEST_FLAG", raising=False)
+    assert env_flag("AQUA_TEST_FLAG") is False
+    assert env_flag("AQUA_TEST_FLAG", True) is True
+    for value, expected in (("1", True), ("TRUE", True), (" yes ", True), ("0", False), ("off", False), ("", False)):
+        monkeypatch.setenv("AQUA_TEST_FLAG", value)
+        assert env_flag("AQUA_TEST_FLAG", True) is expected
@@ -0,0 +1,97 @@
+import math
+import threading
+import time
+
+import cv2
+
+from frame_skip import AdaptiveFrameSkip
+from pipeline import decode_stage
+
+
+class CountingCapture:
+    """A VideoCapture that counts decoded (read) and grabbed-only frames, and stops the stage instead of looping"""
+
+    def __init__(self, path, stop_event):
+        self.cap = cv2.VideoCapture(path)
+        self.stop_event = stop_event
+        self.reads = self.grabs = 0
+
+    def read(self):
+        self.reads += 1
+        return self.cap.read()
+
+    def grab(self):
+        self.grabs += 1
+        return self.cap.grab()
+
+    def set(self, prop, value):
+        # The decode stage rewinds at the end of the clip; end the test there instead
+        self.stop_event.set()
+
+    def release(self):
+        self.cap.release()
+
+
+class InferringQueue:
+    """Stands in for the decode queue: runs each frame through a detector as it is queued"""
+
+    def __init__(self, detector, skip_controller, stop_event, delay=0.0):
+        self.detector = detector
+        self.skip_controller = skip_controller
+        self.stop_event = stop_event
+        self.delay = delay
+        self.dropped = 0
+        self.indices = []
+        self.skips = []
+
+    def put(self, item):
+        frame_index, frame, _ = item
+        started = time.monotonic()
+        self.detector.predict([frame])
+        time.sleep(self.delay)
+        self.skip_controller.record_inference(time.monotonic() - started)
+        self.indices.append(frame_index)
+        self.skips.append(self.skip_controller.skip)
+
+    def close(self, discard=False):
+        pass
+
+
+def run_decode(path, controller, queue):
+    cap = CountingCapture(path, queue.stop_event)
+    decode_stage(cap, queue, queue.stop_event, controller, fps=0)
+    return cap
+
+
+def test_skipped_frames_are_grabbed_not_decoded(synthetic_video, stub_detector):
+    controller = AdaptiveFrameSkip(30, initial_skip=3, adaptive=False)
+    queue = InferringQueue(stub_detector, controller, threading.Event())
+    cap = run_decode(synthetic_video, controller, queue)
+    # 60 frames: 20 decoded and analysed, 40 only grabbed (plus the read that finds the end)
+    assert queue.indices == list(range(0, 60, 3))
+    assert cap.reads == 21
+    assert cap.grabs == 40
+
+
+def test_skip_adapts_to_the_measured_inference_time(synthetic_video, stub_detector):
+    controller = AdaptiveFrameSkip(30, initial_skip=1, max_skip=10, target_ratio=0.8)
+    # About 60 ms per frame: 1.8 s of inference per second of 30 fps video needs a skip of 3
+    queue = InferringQueue(stub_detector, controller, threading.Event(), delay=0.06)
+    run_decode(synthetic_video, controller, queue)
+    needed = math.ceil(controller.frame_latency * 30 / 0.8)
+    assert controller.skip == needed >= 3
+    # Once adapted, frames are queued exactly skip apart
+    assert queue.indices[-1] - queue.indices[-2] == queue.skips[-2]
+
+
+def test_skip_comes_back_down_with_headroom():
+    controller = AdaptiveFrameSkip(30, initial_skip=1, max_skip=10, target_ratio=0.8)
+    controller.record_inference(0.1)
+    assert controller.skip == 4
+    for _ in range(50):
+        controller.record_inference(0.02)
+    # 0.02 * 30 = 0.6 s per second of video fits the 0.8 target at skip 1
+    assert controller.skip == 1
+    controller.set_share(0.5)
+    controller.record_inference(0.02)
+    assert controller.skip == 2
@@ -0,0 +1,107 @@
+import os
+import random
+import time
+
+import pytest
+
+from history import HistoryStore, pick_resolution
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"), ring_size=50, flush_interval=60)
+    yield store
+    store.close()
+
+
+def open_files_under(path):
+    """Files under a directory this process has open (Linux)"""
+    names = []
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            names.append(os.readlink(f"/proc/self/fd/{fd}"))
+        except OSError:
+            pass
+    return [name for name in names if name.startswith(str(path))]
+
+
+def recent_start(seconds):
+    """A whole-minute unix time `seconds` ago, so samples are well inside every retention"""
+    return int((time.time() - seconds) // 60 * 60)
+
+
+def flush(store):
+    db = store._connect()
+    try:
+        store._flush(db)
+    finally:
+        db.close()
+
+
+def test_pick_resolution_fits_the_limit():
+    assert pick_resolution(3600) == "second"
+    assert pick_resolution(3 * 86400) == "minute"
+    # 10,080 minutes would not fit in 5000 points
+    assert pick_resolution(7 * 86400) == "hour"
+    assert pick_resolution(7 * 86400, limit=20000) == "minute"
+
+
+def test_rollups_match_the_samples(store):
+    random.seed(3)
+    start = recent_start(3600)
+    samples = [(start + i * 0.5, random.randint(0, 9), {"tilapia": random.randint(0, 3)}) for i in range(600)]
+    for ts, total, species in samples:
+        store.record("tank1", total, species, unique_fish=total, timestamp=ts)
+
+    # Closed buckets come from SQLite, the open one from memory
+    flush(store)
+    points, truncated = store.query("tank1", start, start + 300, "minute")
+    assert not truncated
+    assert [point["t"] for point in points] == [start + 60 * i for i in range(5)]
+    for point in points:
+        bucket = [sample for sample in samples if point["t"] <= sample[0] < point["t"] + 60]
+        counts = [total for _, total, _ in bucket]
+        assert point["samples"] == len(bucket)
+        assert point["fish_avg"] == round(sum(counts) / len(counts), 3)
+        assert point["fish_min"] == min(counts)
+        assert point["fish_max"] == max(counts)
+
+
+def test_query_keeps_the_newest_points(store):
+    start = recent_start(600)
+    for i in range(200):
+        store.record("tank1", i, {}, timestamp=start + i)
+    flush(store)
+
+    points, truncated = store.query("tank1", start, start + 200, "second", limit=30)
+    assert truncated
+    assert [point["t"] for point in points] == list(range(start + 170, start + 200))
+
+    points, truncated = store.query("tank1", start, start + 200, "second", limit=500)
+    assert not truncated
+    assert len(points) == 200
+
+
+def test_raw_query_keeps_the_newest_samples(store):
+    start = recent_start(600)
+    for i in range(200):
+        store.record("tank1", i, {}, timestamp=start + i)
+    flush(store)
+
+    # 50 samples in the ring, the older ones only on disk
+    points, truncated = store.query("tank1", start, start + 200, "raw", limit=80)
+    assert truncated
+    assert [point["total_fish"] for point in points] == list(range(120, 200))
+
+    points, truncated = store.query("tank1", start, start + 200, "raw", limit=200)
+    assert not truncated
+    assert [point["total_fish"] for point in points] == list(range(200))
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc/self/fd"), reason="needs /proc")
+def test_closed_store_leaves_no_connection_open(tmp_path):
+    store = HistoryStore(str(tmp_path / "history.db"), flush_interval=60)
+    store.record("tank1", 1, {})
+    store.query("tank1", 0, time.time() + 60, "second")
+    store.close()
+    assert open_files_under(tmp_path) == []
@@ -0,0 +1,54 @@
+import threading
+
+import model_loader
+from model_loader import ModelLoader
+
+
+class FakeModel:
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, frames, **kwargs):
+        self.batch_sizes.append(len(frames))
+        return []
+
+
+def test_warms_up_at_the_batch_size_and_publishes_the_model_when_ready(monkeypatch):
+    model = FakeModel()
+    monkeypatch.setattr(model_loader, "load_model", lambda *args: model)
+    loader = ModelLoader("fish.pt", imgsz=64, warmup_batch=4)
+
+    seen_ready_without_model = []
+    done = threading.Event()
+
+    def poll():
+        while not done.is_set():
+            with loader.lock:
+                if loader.state == "ready" and loader.model is None:
+                    seen_ready_without_model.append(True)
+
+    poller = threading.Thread(target=poll)
+    poller.start()
+    try:
+        loader.start()
+        assert loader.wait(30)
+    finally:
+        done.set()
+        poller.join()
+
+    assert loader.model is model
+    assert model.batch_sizes == [1, 4]
+    assert not seen_ready_without_model
+    assert loader.status()["state"] == "ready"
+    assert set(loader.status()["steps"]) == {"importing_s", "loading_s", "warming_up_s"}
+
+
+def test_failed_load_is_reported(monkeypatch):
+    def fail(*args):
+        raise FileNotFoundError("fish.pt")
+
+    monkeypatch.setattr(model_loader, "load_model", fail)
+    loader = ModelLoader("fish.pt").start()
+    assert not loader.wait(30)
+    assert loader.failed()
+    assert loader.status()["error"] == "fish.pt"
@@ -0,0 +1,34 @@
+import threading
+import time
+
+from profiler import SamplingProfiler
+
+
+def spin(stop):
+    while not stop.is_set():
+        sum(range(100))
+
+
+def test_samples_other_threads_but_not_the_caller():
+    stop = threading.Event()
+    worker = threading.Thread(target=spin, args=(stop,), name="worker", daemon=True)
+    worker.start()
+    try:
+        lines, summary = SamplingProfiler().profile(seconds=0.3, hz=200)
+    finally:
+        stop.set()
+    assert summary["samples"] > 10
+    assert any(line.startswith("worker;") and "spin (test_profiler.py" in line for line in lines)
+    # Neither the thread waiting in profile() nor the sampler shows up
+    assert not any("test_samples_other_threads" in line or line.startswith("profiler;") for line in lines)
+
+
+def test_one_profile_at_a_time():
+    profiler = SamplingProfiler()
+    first = threading.Thread(target=profiler.profile, kwargs={"seconds": 0.3})
+    first.start()
+    time.sleep(0.05)
+    assert profiler.busy()
+    assert profiler.profile(seconds=0.1) is None
+    first.join()
+    assert not profiler.busy()
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from rolling import SpeciesWindow, parse_windows, window_label
+
+
+def naive_snapshot(frames, window):
+    """The same statistics recomputed from every frame inside the window"""
+    last_slot = int(frames[-1][0] // window.slot_seconds)
+    inside = [frame for frame in frames if int(frame[0] // window.slot_seconds) > last_slot - window.slots]
+    species = set()
+    tracks = {}
+    for _, species_count, track_ids, track_species in inside:
+        species |= set(species_count)
+        tracks.update(zip(track_ids, track_species))
+    species |= set(tracks.values())
+
+    stats = {}
+    for name in sorted(species):
+        counts = [species_count.get(name, 0) for _, species_count, _, _ in inside]
+        stats[name] = {
+            "mean": round(sum(counts) / len(counts), 3),
+            "max": max(counts),
+            "min": min(counts),
+            "unique": sum(1 for track_species in tracks.values() if track_species == name),
+        }
+    return stats
+
+
+def test_matches_a_brute_force_window():
+    random.seed(7)
+    window = SpeciesWindow(6)
+    frames = []
+    timestamp = 1000.0
+    for _ in range(3000):
+        # Mostly steady frames, with the odd stall longer than the window
+        timestamp += random.choice([0.03, 0.04, 0.1, 0.5]) if random.random() > 0.002 else 20
+        species_count = {name: random.randint(1, 4) for name in "ABC" if random.random() < 0.6}
+        track_ids = random.sample(range(40), random.randint(0, 5))
+        # A track keeps its species, as it does once the tracker has assigned it
+        track_species = ["AB"[track_id % 2] for track_id in track_ids]
+        window.update(timestamp, species_count, track_ids, track_species)
+        frames.append((timestamp, species_count, track_ids, track_species))
+
+        assert window.snapshot() == naive_snapshot(frames, window)
+
+
+def test_window_labels_and_parsing():
+    assert [window_label(seconds) for seconds in (10, 60, 600, 7200, 1.5)] == ["10s", "1m", "10m", "2h", "1.5s"]
+    assert parse_windows("600, 10,60,10") == (10.0, 60.0, 600.0)
+    with pytest.raises(ValueError):
+        parse_windows("10,0")
@@ -0,0 +1,147 @@
+import threading
+import time
+
+import numpy as np
+
+from metrics import FRAME_ERRORS
+from pipeline import DropOldestQueue
+from scheduler import InferenceScheduler
+from tracking import CameraTracker
+
+
+class CountingModel:
+    """Returns each frame's first pixel as its "result" and remembers what it was given"""
+
+    def __init__(self):
+        self.frames = []
+
+    def predict(self, frames, **kwargs):
+        self.frames += [int(frame[0, 0, 0]) for frame in frames]
+        return [int(frame[0, 0, 0]) for frame in frames]
+
+
+class PassThroughTracker:
+    def update(self, result):
+        return result
+
+
+def frame(value):
+    return np.full((4, 4, 3), value, dtype=np.uint8)
+
+
+def start(model, queue_depth, batch_size=4):
+    scheduler = InferenceScheduler(model, max_batch_size=batch_size, max_wait_ms=10)
+    in_queue, out_queue = scheduler.make_queue(queue_depth), DropOldestQueue(16)
+    return scheduler, in_queue, out_queue
+
+
+def results(out_queue, count):
+    """(frame_index, result) of the next `count` analysed frames"""
+    items = [out_queue.get(timeout=2) for _ in range(count)]
+    assert None not in items
+    return [(frame_index, result) for frame_index, _, result in items]
+
+
+def test_static_frames_reuse_their_reference():
+    model = CountingModel()
+    scheduler, in_queue, out_queue = start(model, queue_depth=8)
+    for item in [(0, frame(10), None), (1, frame(11), 0), (2, frame(12), 0)]:
+        in_queue.put(item)
+    scheduler.register("tank1", in_queue, out_queue, PassThroughTracker())
+    try:
+        assert results(out_queue, 3) == [(0, 10), (1, 10), (2, 10)]
+        assert model.frames == [10]
+    finally:
+        scheduler.unregister("tank1")
+
+
+def test_static_frame_is_inferred_when_its_reference_was_dropped():
+    model = CountingModel()
+    busy, release = threading.Event(), threading.Event()
+
+    def slow_predict(frames, **kwargs):
+        busy.set()
+        release.wait(2)
+        return CountingModel.predict(model, frames)
+
+    model.predict = slow_predict
+    scheduler, in_queue, out_queue = start(model, queue_depth=1, batch_size=1)
+    scheduler.register("tank1", in_queue, out_queue, PassThroughTracker())
+    try:
+        in_queue.put((0, frame(10), None))
+        assert busy.wait(2)
+        # While frame 0 is inferred, frame 1 moves and is marked for inference, but the full queue
+        # drops it for frame 2, which the motion gate only compared with frame 1
+        in_queue.put((1, frame(20), None))
+        in_queue.put((2, frame(21), 1))
+        assert in_queue.dropped == 1
+        release.set()
+        # Frame 0's result predates the movement, so frame 2 is inferred rather than reusing it
+        assert results(out_queue, 2) == [(0, 10), (2, 21)]
+        assert model.frames == [10, 21]
+    finally:
+        release.set()
+        scheduler.unregister("tank1")
+
+
+class FailingModel:
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, frames, **kwargs):
+        self.calls += 1
+        raise RuntimeError("out of memory")
+
+
+def test_failed_batch_counts_one_error_per_camera():
+    model = FailingModel()
+    scheduler, in_queue, out_queue = start(model, queue_depth=8)
+    other_queue = scheduler.make_queue(8)
+    errors = {camera_id: FRAME_ERRORS.values.get((camera_id, "inference"), 0) for camera_id in ("tank1", "tank2")}
+    # tank1's two frames and its static frame, with tank2's frame, make one batch of four
+    for item in [(0, frame(10), None), (1, frame(11), None), (2, frame(11), 1)]:
+        in_queue.put(item)
+    other_queue.put((0, frame(30), None))
+    with scheduler.condition:
+        scheduler.register("tank1", in_queue, out_queue, PassThroughTracker())
+        scheduler.register("tank2", other_queue, DropOldestQueue(16), PassThroughTracker())
+    try:
+        deadline = time.monotonic() + 2
+        while model.calls == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+    finally:
+        scheduler.unregister("tank1")
+        scheduler.unregister("tank2")
+    assert model.calls == 1
+    assert FRAME_ERRORS.values[("tank1", "inference")] == errors["tank1"] + 1
+    assert FRAME_ERRORS.values[("tank2", "inference")] == errors["tank2"] + 1
+
+
+def tracked(result):
+    """(track ID, rounded box) pairs of a tracked result"""
+    boxes = result.boxes
+    if boxes is None or boxes.id is None:
+        return []
+    return sorted(zip(boxes.id.int().tolist(), boxes.xyxy.round().int().tolist()))
+
+
+def test_batched_frames_are_tracked_in_order_with_stable_ids(synthetic_frames, stub_detector):
+    # Frame by frame, as before batching
+    tracker = CameraTracker()
+    expected = [tracked(tracker.update(stub_detector.predict([frame])[0])) for frame in synthetic_frames]
+
+    scheduler = InferenceScheduler(stub_detector, max_batch_size=4, max_wait_ms=50)
+    in_queue, out_queue = scheduler.make_queue(len(synthetic_frames)), DropOldestQueue(len(synthetic_frames))
+    for frame_index, frame in enumerate(synthetic_frames):
+        in_queue.put((frame_index, frame, None))
+    scheduler.register("tank1", in_queue, out_queue, CameraTracker())
+    try:
+        items = [out_queue.get(timeout=10) for _ in synthetic_frames]
+    finally:
+        scheduler.unregister("tank1")
+
+    assert [frame_index for frame_index, _, _ in items] == list(range(len(synthetic_frames)))
+    assert [tracked(result) for _, _, result in items] == expected
+    # The four ellipses keep their IDs through the clip
+    assert {track_id for pairs in expected for track_id, _ in pairs} == {1, 2, 3, 4}
@@ -0,0 +1,103 @@
+import cv2
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+from postprocess import extract_detections
+from tiling import TiledDetector, merge_tile_detections, tile_grid
+
+NAMES = {0: "tilapia", 1: "catfish"}
+
+
+class CropModel:
+    """Stub detector: reports the fish from a known list that are visible in a crop, clipped to the crop.
+
+    Frames hold each pixel's own (y, x), so a crop tells the stub where it was cut from.
+    """
+
+    names = NAMES
+
+    def __init__(self, fish):
+        self.fish = np.asarray(fish, dtype=np.float32)
+
+    def predict(self, crops, **kwargs):
+        results = []
+        for crop in crops:
+            y0, x0 = crop[0, 0]
+            height, width = crop.shape[:2]
+            boxes = []
+            for x1, y1, x2, y2, cls in self.fish:
+                clipped = [max(x1 - x0, 0), max(y1 - y0, 0), min(x2 - x0, width), min(y2 - y0, height)]
+                visible = max(0, clipped[2] - clipped[0]) * max(0, clipped[3] - clipped[1]) / ((x2 - x1) * (y2 - y1))
+                if visible >= 0.2:
+                    # A partly visible fish is detected with less confidence
+                    boxes.append(clipped + [0.5 + 0.4 * visible, cls])
+            results.append(Results(crop, path="", names=NAMES,
+                                   boxes=torch.tensor(boxes, dtype=torch.float32).reshape(-1, 6)))
+        return results
+
+
+def coordinate_frame(height, width):
+    return np.stack(np.mgrid[0:height, 0:width], axis=-1).astype(np.int32)
+
+
+def boxes(result):
+    return sorted(result.boxes.data[:, [0, 1, 2, 3, 5]].round().int().tolist())
+
+
+def test_tile_grid_covers_the_frame_within_budget():
+    tiles = tile_grid(1080, 1920, tile_size=640, overlap=0.2, max_tiles=8)
+    assert len(tiles) <= 8
+    assert tiles[-1] == (0, 0, 1920, 1080)
+    covered = np.zeros((1080, 1920), dtype=bool)
+    for x0, y0, x1, y1 in tiles[:-1]:
+        covered[y0:y1, x0:x1] = True
+    assert covered.all()
+    assert tile_grid(480, 640) == [(0, 0, 640, 480)]
+
+
+def test_overlapping_fish_in_one_tile_both_survive():
+    # Two fish of the same species, one mostly on top of the other, well inside the top-left tile
+    fish = [[100, 100, 200, 160, 0], [120, 110, 210, 170, 0]]
+    detector = TiledDetector(CropModel(fish), tile_size=640, max_tiles=8)
+    result, = detector.predict([coordinate_frame(1080, 1920)])
+    assert boxes(result) == sorted([[100, 100, 200, 160, 0], [120, 110, 210, 170, 0]])
+
+
+def test_fish_cut_by_a_seam_is_merged():
+    detector = TiledDetector(CropModel([[560, 300, 680, 360, 1]]), tile_size=640, max_tiles=8, full_frame=False)
+    x0, _, x1, _ = detector._grid((1080, 1920))[0]
+    # The fish sticks out of the first tile's right edge, so that tile only sees part of it
+    assert x0 < 560 < x1 < 680
+    result, = detector.predict([coordinate_frame(1080, 1920)])
+    assert boxes(result) == [[560, 300, 680, 360, 1]]
+
+
+def test_stub_detector_finds_small_fish_only_in_tiles(stub_detector):
+    # The stub finds blobs on a 320-wide copy: fish this small vanish from a 2560-wide frame, not from a tile
+    frame = np.full((1440, 2560, 3), 50, dtype=np.uint8)
+    centres = [(200, 200), (560, 300), (1300, 700), (2000, 1200), (2400, 100), (1000, 1100)]
+    for centre in centres:
+        cv2.ellipse(frame, centre, (6, 4), 0, 0, 360, (230, 230, 230), -1)
+
+    assert len(extract_detections(stub_detector.predict([frame])[0]).xyxy) == 0
+    detections = extract_detections(TiledDetector(stub_detector, 640, 0.2, max_tiles=16).predict([frame])[0])
+    # (560, 300) and (1000, 1100) lie in two tiles each and are reported once
+    assert len(detections.xyxy) == len(centres)
+    assert len(set(detections.cls.tolist())) == 1
+    for x, y in centres:
+        assert sum((x1 < x < x2) and (y1 < y < y2) for x1, y1, x2, y2 in detections.xyxy.tolist()) == 1
+
+
+def test_merge_rules():
+    data = np.array([[0, 0, 100, 50, 0.9, 0],    # crop 0
+                     [20, 5, 110, 55, 0.8, 0],   # crop 0, overlaps the first: model NMS kept both
+                     [2, 1, 100, 50, 0.7, 0],    # crop 1, the first fish again
+                     [50, 0, 100, 50, 0.6, 0],   # crop 2, half of the first fish, cut at a seam
+                     [0, 0, 100, 50, 0.5, 1]],   # crop 1, another species in the same place
+                    dtype=np.float32)
+    kept = merge_tile_detections(data, [0, 0, 1, 2, 1], [False, False, False, True, False])
+    assert kept[:, 4].tolist() == np.float32([0.9, 0.8, 0.5]).tolist()
+    # Without the seam the half box is a different fish inside the big one
+    kept = merge_tile_detections(data, [0, 0, 1, 2, 1], [False] * 5)
+    assert kept[:, 4].tolist() == np.float32([0.9, 0.8, 0.6, 0.5]).tolist()
@@ -0,0 +1,62 @@
+import random
+
+import numpy as np
+
+from tracks import TrackRegistry
+
+
+class NaiveTracks:
+    """The original dict-based bookkeeping: every active ID checked on every frame"""
+
+    def __init__(self, lifetime_frames):
+        self.lifetime_frames = lifetime_frames
+        self.active = {}
+        self.first_class = {}
+
+    def update(self, ids, cls, frame_index):
+        for track_id, class_id in zip(ids, cls):
+            if track_id < 0:
+                continue
+            self.active[track_id] = frame_index
+            self.first_class.setdefault(track_id, class_id)
+        for track_id, seen_at in list(self.active.items()):
+            if frame_index - seen_at > self.lifetime_frames:
+                del self.active[track_id]
+
+    def unique_species_count(self, names):
+        counts = {}
+        for class_id in self.first_class.values():
+            name = names.get(class_id, "Unknown")
+            counts[name] = counts.get(name, 0) + 1
+        return counts
+
+
+def test_matches_the_naive_registry():
+    random.seed(5)
+    names = {0: "tilapia", 1: "catfish"}
+    tracks, naive = TrackRegistry(lifetime_frames=10, capacity=4), NaiveTracks(10)
+    frame_index = 0
+    for _ in range(2000):
+        # Gaps in the frame index, like frame skipping
+        frame_index += random.choice([1, 1, 2, 5])
+        ids = [random.choice([-1, random.randint(0, 300)]) for _ in range(random.randint(0, 6))]
+        cls = [random.randint(0, 1) for _ in ids]
+        tracks.update(np.array(ids, dtype=np.int64), np.array(cls, dtype=np.int64), frame_index)
+        naive.update(ids, cls, frame_index)
+
+        assert len(tracks) == len(naive.active)
+        assert tracks.active_ids() == naive.active
+        assert tracks.unique_total == len(naive.first_class)
+        assert tracks.unique_species_count(names) == naive.unique_species_count(names)
+
+
+def test_clear_active_keeps_lifetime_counts():
+    tracks = TrackRegistry(lifetime_frames=10)
+    tracks.update(np.array([1, 2]), np.array([0, 1]), 0)
+    tracks.clear_active()
+    assert len(tracks) == 0
+    assert tracks.active_ids() == {}
+    assert tracks.unique_total == 2
+    tracks.update(np.array([2, 3]), np.array([1, 0]), 1)
+    assert tracks.active_ids() == {2: 1, 3: 1}
+    assert tracks.unique_total == 3
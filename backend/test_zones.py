@@ -0,0 +1,105 @@
+import random
+
+import numpy as np
+import pytest
+
+from postprocess import FrameDetections
+from zones import ZoneEngine, default_zones, parse_zones
+
+ZONES = [
+    {"name": "pen", "type": "polygon", "points": [[50, 50], [150, 50], [150, 150], [50, 150]]},
+    {"name": "gate", "type": "line", "points": [[20, 180], [180, 20]], "alert": False},
+]
+
+
+def detections(points, ids):
+    """Boxes whose bottom-centre is each (x, y) point"""
+    xyxy = np.array([[x - 5, y - 10, x + 5, y] for x, y in points], dtype=np.float64).reshape(-1, 4)
+    return FrameDetections(xyxy, np.zeros(len(ids), dtype=np.int64), np.array(ids, dtype=np.int64),
+                           np.ones(len(ids)))
+
+
+def cross(a, b, p):
+    return (b[0] - a[0]) * (p[1] - a[1]) - (b[1] - a[1]) * (p[0] - a[0])
+
+
+class NaiveZones:
+    """The same counts from each track's previous point, one track and zone at a time"""
+
+    def __init__(self):
+        self.previous = {}
+        self.entered = {"pen": 0, "gate": 0}
+        self.exited = {"pen": 0, "gate": 0}
+
+    @staticmethod
+    def in_pen(point):
+        return 50 <= point[0] <= 150 and 50 <= point[1] <= 150
+
+    def update(self, points, ids):
+        for point, track_id in zip(points, ids):
+            if track_id < 0:
+                continue
+            before = self.previous.get(track_id)
+            self.previous[track_id] = point
+            if before is None:
+                continue
+            if self.in_pen(point) and not self.in_pen(before):
+                self.entered["pen"] += 1
+            elif self.in_pen(before) and not self.in_pen(point):
+                self.exited["pen"] += 1
+
+            a, b = (20, 180), (180, 20)
+            side_before, side_after = cross(a, b, before), cross(a, b, point)
+            if side_before * side_after < 0 and cross(before, point, a) * cross(before, point, b) <= 0:
+                if side_after > 0:
+                    self.entered["gate"] += 1
+                else:
+                    self.exited["gate"] += 1
+
+
+def test_matches_per_track_crossings():
+    random.seed(11)
+    engine, naive = ZoneEngine(parse_zones(ZONES), capacity=4), NaiveZones()
+    # Off the pen's edges, where rasterisation and the naive test could disagree
+    coordinates = [value for value in range(200) if value not in (50, 150)]
+    positions = {track_id: (random.choice(coordinates), random.choice(coordinates)) for track_id in range(12)}
+    for frame_index in range(500):
+        ids = random.sample(range(12), random.randint(0, 8)) + [-1] * random.randint(0, 2)
+        for track_id in ids:
+            if track_id >= 0 and random.random() < 0.5:
+                positions[track_id] = (random.choice(coordinates), random.choice(coordinates))
+        points = [positions[track_id] if track_id >= 0 else (100, 100) for track_id in ids]
+        engine.update(detections(points, ids), (200, 200, 3))
+        naive.update(points, ids)
+
+        assert engine.entered == naive.entered
+        assert engine.exited == naive.exited
+        assert engine.inside["pen"] == sum(NaiveZones.in_pen(point) for point in points)
+
+
+def test_only_alerting_zones_are_returned():
+    engine = ZoneEngine(parse_zones(ZONES))
+    engine.update(detections([(10, 10)], [1]), (200, 200, 3))
+    # Crosses the gate and enters the pen in one move
+    assert engine.update(detections([(120, 120)], [1]), (200, 200, 3)) == ["pen"]
+    snapshot = engine.snapshot()
+    assert snapshot["gate"] == {"type": "line", "inside": None, "entered": 1, "exited": 0, "crossed": True}
+    assert snapshot["pen"]["entered"] == 1 and snapshot["pen"]["inside"] == 1
+
+
+def test_reset_forgets_trajectories_but_keeps_totals():
+    engine = ZoneEngine(default_zones(100))
+    engine.update(detections([(50, 90)], [3]), (200, 200, 3))
+    assert engine.update(detections([(50, 110)], [3]), (200, 200, 3)) == ["geofence"]
+    engine.reset()
+    # After a reset the next point is a new start, not a crossing
+    assert engine.update(detections([(50, 90)], [3]), (200, 200, 3)) == []
+    assert engine.entered["geofence"] == 1 and engine.exited["geofence"] == 0
+
+
+def test_parse_zones_rejects_bad_config():
+    for config in ({"name": "x"}, [{"name": "a", "type": "line", "points": [[0, 0]]}],
+                   [{"name": "a", "type": "circle", "points": [[0, 0], [1, 1]]}],
+                   [ZONES[0], ZONES[0]]):
+        with pytest.raises(ValueError):
+            parse_zones(config)
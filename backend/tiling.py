@@ -0,0 +1,145 @@
+import math
+
+import numpy as np
+
+
+def tile_grid(height, width, tile_size=640, overlap=0.2, max_tiles=8, full_frame=True):
+    """Overlapping (x0, y0, x1, y1) crops covering the frame, at most max_tiles of them.
+
+    Tiles overlap by at least `overlap` of the tile size, so a fish cut by one
+    tile's edge is whole in its neighbour. If the grid would need more tiles
+    than allowed, the tiles grow until it fits. The whole frame is added as
+    one more crop (counted in max_tiles) so large fish spanning tiles are
+    still found in one piece. A frame no bigger than a tile is a single crop.
+    """
+    if height <= tile_size and width <= tile_size:
+        return [(0, 0, width, height)]
+
+    budget = max(1, max_tiles - (1 if full_frame else 0))
+    size = tile_size
+    while True:
+        stride = max(1, int(size * (1 - overlap)))
+        cols = max(1, math.ceil((width - size) / stride) + 1) if width > size else 1
+        rows = max(1, math.ceil((height - size) / stride) + 1) if height > size else 1
+        if cols * rows <= budget:
+            break
+        size = int(size * 1.25)
+
+    xs = np.linspace(0, max(0, width - size), cols).round().astype(int).tolist()
+    ys = np.linspace(0, max(0, height - size), rows).round().astype(int).tolist()
+    tiles = [(x, y, min(x + size, width), min(y + size, height)) for y in ys for x in xs]
+    if full_frame and len(tiles) > 1:
+        tiles.append((0, 0, width, height))
+    return tiles
+
+
+# Pixels from a crop's edge within which a box counts as cut by that edge
+SEAM_MARGIN = 2
+
+
+def cut_by_seam(xyxy, crop, frame_shape, margin=SEAM_MARGIN):
+    """Which boxes (frame coordinates) touch an edge of their crop that lies inside the frame"""
+    x0, y0, x1, y1 = crop
+    height, width = frame_shape[:2]
+    return (((x0 > 0) & (xyxy[:, 0] <= x0 + margin)) | ((y0 > 0) & (xyxy[:, 1] <= y0 + margin))
+            | ((x1 < width) & (xyxy[:, 2] >= x1 - margin)) | ((y1 < height) & (xyxy[:, 3] >= y1 - margin)))
+
+
+def merge_tile_detections(data, crop_ids, cut, threshold=0.5, iou_threshold=0.5):
+    """Cross-tile NMS over (N, 6) rows of x1, y1, x2, y2, conf, cls in frame coordinates.
+
+    crop_ids says which crop each box came from and cut whether its crop's
+    edge cut it (cut_by_seam). Boxes from the same crop are never merged:
+    the model's own NMS already ran on them, so overlapping boxes there are
+    different fish. Across crops, boxes of the same class are merged greedily
+    by score when their IoU is over iou_threshold (one fish seen whole in two
+    crops), or when one of them was cut at a seam and the intersection over
+    the smaller box is over threshold (a partial box lies almost entirely
+    inside the full one but has a low IoU with it).
+    """
+    if len(data) < 2:
+        return data
+    order = np.argsort(-data[:, 4], kind="stable")
+    data, crop_ids, cut = data[order], np.asarray(crop_ids)[order], np.asarray(cut)[order]
+    xyxy, cls = data[:, :4], data[:, 5]
+    area = np.prod(np.clip(xyxy[:, 2:] - xyxy[:, :2], 0, None), axis=1)
+    top_left = np.maximum(xyxy[:, None, :2], xyxy[None, :, :2])
+    bottom_right = np.minimum(xyxy[:, None, 2:], xyxy[None, :, 2:])
+    intersection = np.prod(np.clip(bottom_right - top_left, 0, None), axis=2)
+    iou = intersection / (area[:, None] + area[None, :] - intersection + 1e-9)
+    overlap = intersection / (np.minimum(area[:, None], area[None, :]) + 1e-9)
+    duplicate = (iou > iou_threshold) | ((overlap > threshold) & (cut[:, None] | cut[None, :]))
+    duplicate &= (cls[:, None] == cls[None, :]) & (crop_ids[:, None] != crop_ids[None, :])
+
+    keep = np.ones(len(data), dtype=bool)
+    for i in range(len(data)):
+        if keep[i]:
+            suppressed = duplicate[i].copy()
+            suppressed[:i + 1] = False
+            keep &= ~suppressed
+    return data[keep]
+
+
+class TiledDetector:
+    """Wraps a model so predict() runs every frame as overlapping tiles.
+
+    All tiles of all frames in a call go through a single model.predict batch.
+    Boxes are shifted back to frame coordinates and merged with cross-tile NMS
+    (merge_tile_detections).
+    They come back as one Results object per frame, like model.predict
+    returns, so the scheduler and per-camera trackers use it unchanged.
+    """
+
+    def __init__(self, model, tile_size=640, overlap=0.2, max_tiles=8, full_frame=True, merge_threshold=0.5):
+        self.model = model
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.max_tiles = max(1, int(max_tiles))
+        self.full_frame = full_frame
+        self.merge_threshold = merge_threshold
+        self.grids = {}
+
+    @property
+    def names(self):
+        return self.model.names
+
+    def _grid(self, shape):
+        """Tile layout for a frame size (computed once per size)"""
+        if shape not in self.grids:
+            self.grids[shape] = tile_grid(shape[0], shape[1], self.tile_size, self.overlap,
+                                          self.max_tiles, self.full_frame)
+        return self.grids[shape]
+
+    def predict(self, frames, conf=0.5, iou=0.5, imgsz=None, verbose=False):
+        import torch
+        from ultralytics.engine.results import Results
+
+        if not isinstance(frames, list):
+            frames = [frames]
+        crops, owners = [], []
+        for index, frame in enumerate(frames):
+            for crop in self._grid(frame.shape[:2]):
+                x0, y0, x1, y1 = crop
+                crops.append(frame[y0:y1, x0:x1])
+                owners.append((index, crop))
+        tile_results = self.model.predict(crops, conf=conf, iou=iou, imgsz=imgsz or self.tile_size, verbose=False)
+
+        per_frame = [([], [], []) for _ in frames]
+        for crop_id, ((index, crop), result) in enumerate(zip(owners, tile_results)):
+            if result.boxes is None or len(result.boxes) == 0:
+                continue
+            data = result.boxes.data.cpu().numpy()[:, :6].copy()
+            data[:, [0, 2]] += crop[0]
+            data[:, [1, 3]] += crop[1]
+            parts, crop_ids, cut = per_frame[index]
+            parts.append(data)
+            crop_ids.append(np.full(len(data), crop_id))
+            cut.append(cut_by_seam(data, crop, frames[index].shape))
+
+        results = []
+        for frame, (parts, crop_ids, cut) in zip(frames, per_frame):
+            data = merge_tile_detections(np.concatenate(parts), np.concatenate(crop_ids), np.concatenate(cut),
+                                         self.merge_threshold, iou) if parts else np.empty((0, 6), dtype=np.float32)
+            results.append(Results(frame, path="", names=self.model.names,
+                                   boxes=torch.as_tensor(data, dtype=torch.float32)))
+        return results
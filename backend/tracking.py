@@ -0,0 +1,44 @@
+import torch
+from ultralytics.trackers.track import TRACKER_MAP
+from ultralytics.utils import IterableSimpleNamespace
+from ultralytics.utils.checks import check_yaml
+
+try:
+    from ultralytics.utils import YAML
+    load_yaml = YAML.load
+except ImportError:  # older ultralytics releases
+    from ultralytics.utils import yaml_load as load_yaml
+
+# Same default as model.track()
+DEFAULT_TRACKER = "botsort.yaml"
+
+
+class CameraTracker:
+    """A tracker owned by a single camera, fed with detections from a shared (batched) predict call.
+
+    This mirrors what model.track(persist=True) does internally, but keeps the
+    tracker outside the predictor so frames from different cameras can share
+    one inference batch without mixing their track IDs.
+    """
+
+    def __init__(self, tracker_cfg=DEFAULT_TRACKER, frame_rate=30):
+        cfg = IterableSimpleNamespace(**load_yaml(check_yaml(tracker_cfg)))
+        tracker_cls = TRACKER_MAP[cfg.tracker_type]
+        try:
+            self.tracker = tracker_cls(args=cfg, frame_rate=int(frame_rate))
+        except TypeError:  # newer releases dropped the frame_rate argument
+            self.tracker = tracker_cls(args=cfg)
+
+    def update(self, result):
+        """Assign track IDs to one frame's detections; returns the tracked Results"""
+        det = result.boxes.cpu().numpy()
+        tracks = self.tracker.update(det, result.orig_img)
+        if len(tracks) == 0:
+            return result
+        idx = tracks[:, -1].astype(int)
+        result = result[idx]
+        result.update(boxes=torch.as_tensor(tracks[:, :-1], device=result.boxes.data.device))
+        return result
+
+    def reset(self):
+        self.tracker.reset()
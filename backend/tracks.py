@@ -0,0 +1,92 @@
+from collections import deque
+
+import numpy as np
+
+
+class TrackRegistry:
+    """Active track IDs with expiry, plus lifetime unique counts.
+
+    State lives in arrays indexed by track ID (tracker IDs are small,
+    increasing integers), grown on demand. Every analysed frame appends one
+    bucket of the IDs it saw, so buckets are in expiry order. Eviction only
+    pops buckets that have aged out and clears the IDs not seen since. A frame
+    therefore costs O(seen + expired), not O(every ID ever known). The
+    {track ID: last seen frame} mapping of active IDs is kept up to date the
+    same way, so reading it doesn't walk the buckets.
+    """
+
+    def __init__(self, lifetime_frames=30, capacity=256):
+        self.lifetime_frames = lifetime_frames
+        self.last_seen = np.full(capacity, -1, dtype=np.int64)  # -1 when not active
+        self.first_class = np.full(capacity, -1, dtype=np.int64)  # -1 until first seen
+        self.buckets = deque()  # (frame_index, ids) in the order frames were analysed
+        self.active = {}  # track ID -> last seen frame, for the active IDs
+        self.active_count = 0
+        self.unique_total = 0
+        self.unique_per_class = np.zeros(0, dtype=np.int64)
+
+    def _grow(self, max_id):
+        size = len(self.last_seen)
+        while size <= max_id:
+            size *= 2
+        pad = size - len(self.last_seen)
+        self.last_seen = np.concatenate([self.last_seen, np.full(pad, -1, dtype=np.int64)])
+        self.first_class = np.concatenate([self.first_class, np.full(pad, -1, dtype=np.int64)])
+
+    def update(self, ids, cls, frame_index):
+        """Record a frame's track IDs (-1 for untracked boxes) and class IDs, then evict expired ones"""
+        tracked = ids >= 0
+        if tracked.any():
+            ids, first = np.unique(ids[tracked], return_index=True)
+            cls = cls[tracked][first]
+            if ids[-1] >= len(self.last_seen):
+                self._grow(ids[-1])
+
+            self.active_count += int(np.count_nonzero(self.last_seen[ids] < 0))
+            new = self.first_class[ids] < 0
+            if new.any():
+                new_cls = cls[new]
+                self.first_class[ids[new]] = new_cls
+                self.unique_total += int(np.count_nonzero(new))
+                counts = np.bincount(new_cls, minlength=len(self.unique_per_class))
+                counts[:len(self.unique_per_class)] += self.unique_per_class
+                self.unique_per_class = counts
+            self.last_seen[ids] = frame_index
+            self.active.update(dict.fromkeys(ids.tolist(), frame_index))
+            self.buckets.append((frame_index, ids))
+
+        while self.buckets and frame_index - self.buckets[0][0] > self.lifetime_frames:
+            seen_at, bucket = self.buckets.popleft()
+            # IDs seen again later have a newer bucket and stay active
+            expired = bucket[self.last_seen[bucket] == seen_at]
+            self.last_seen[expired] = -1
+            self.active_count -= len(expired)
+            for track_id in expired.tolist():
+                del self.active[track_id]
+
+    def clear_active(self):
+        """Drop every active ID (e.g. when the video loops) but keep the lifetime counts"""
+        for _, bucket in self.buckets:
+            self.last_seen[bucket] = -1
+        self.buckets.clear()
+        self.active.clear()
+        self.active_count = 0
+
+    def __len__(self):
+        return self.active_count
+
+    def active_ids(self):
+        """{track_id: last seen frame} for the IDs still active.
+
+        A copy of the maintained mapping (one C-level dict copy), since the
+        result is published to other threads while the next frame updates it.
+        """
+        return dict(self.active)
+
+    def unique_species_count(self, names):
+        """Lifetime unique track IDs per species, by the class each ID was first seen as"""
+        species_count = {}
+        for class_id in np.flatnonzero(self.unique_per_class):
+            class_name = names.get(int(class_id), "Unknown")
+            species_count[class_name] = species_count.get(class_name, 0) + int(self.unique_per_class[class_id])
+        return species_count
@@ -0,0 +1,218 @@
+import json
+import os
+
+import cv2
+import numpy as np
+
+ZONE_TYPES = ("polygon", "line")
+# Past any frame's right edge, so the default line spans the whole width
+FRAME_EDGE = 100000
+
+
+class Zone:
+    """A named polygon or line in source-frame pixel coordinates.
+
+    Polygons report how many boxes are inside and count tracks entering and
+    leaving. Lines count tracks crossing them; "entered" is a crossing to the
+    right of the first->second point direction (downwards for a left-to-right
+    line), "exited" the other way.
+    """
+
+    def __init__(self, name, kind, points, alert=True):
+        self.name = name
+        self.kind = kind
+        self.points = np.asarray(points, dtype=np.float64)
+        self.alert = alert
+
+    def to_dict(self):
+        """The zone as parse_zones() input"""
+        return {"name": self.name, "type": self.kind, "points": self.points.tolist(), "alert": self.alert}
+
+
+def parse_zones(config):
+    """Build Zones from a list of {"name", "type", "points", "alert"} dicts; raises ValueError if invalid"""
+    if not isinstance(config, list):
+        raise ValueError("zones must be a list")
+    zones = []
+    names = set()
+    for entry in config:
+        if not isinstance(entry, dict):
+            raise ValueError(f"Invalid zone: {entry!r}")
+        name = str(entry.get("name", ""))
+        kind = entry.get("type", "polygon")
+        points = entry.get("points")
+        if not name or name in names:
+            raise ValueError(f"Zone names must be unique and non-empty: {name!r}")
+        if kind not in ZONE_TYPES:
+            raise ValueError(f"Zone {name}: type must be one of {', '.join(ZONE_TYPES)}")
+        try:
+            points = np.asarray(points, dtype=np.float64)
+        except (TypeError, ValueError):
+            raise ValueError(f"Zone {name}: points must be a list of [x, y] pairs")
+        if points.ndim != 2 or points.shape[1] != 2:
+            raise ValueError(f"Zone {name}: points must be a list of [x, y] pairs")
+        if (kind == "line" and len(points) != 2) or (kind == "polygon" and len(points) < 3):
+            raise ValueError(f"Zone {name}: a line needs 2 points and a polygon at least 3")
+        names.add(name)
+        zones.append(Zone(name, kind, points, bool(entry.get("alert", True))))
+    return zones
+
+
+def default_zones(geofence_line_y):
+    """The original single geofence: a horizontal line across the frame"""
+    return [Zone("geofence", "line", [[0, geofence_line_y], [FRAME_EDGE, geofence_line_y]])]
+
+
+def load_zone_config(value):
+    """Read GEOFENCE_ZONES (inline JSON or a JSON file path) as {camera_id or "*": [zone dicts]}"""
+    if not value:
+        return {}
+    try:
+        if os.path.isfile(value):
+            with open(value) as f:
+                config = json.load(f)
+        else:
+            config = json.loads(value)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Could not read GEOFENCE_ZONES: {e}")
+        return {}
+    if isinstance(config, list):
+        # A bare list applies to every camera
+        return {"*": config}
+    if not isinstance(config, dict):
+        print("[ERROR] GEOFENCE_ZONES must be a list of zones or an object keyed by camera id")
+        return {}
+    return config
+
+
+class ZoneEngine:
+    """Per-frame zone membership and crossings for one camera.
+
+    Every box is reduced to its bottom-centre point (the original geofence
+    tested the box bottom). Polygons are rasterised once per frame size into a
+    mask holding one bit per polygon, so membership is one array lookup per
+    box. Lines are tested with vectorised cross products. Crossings come from
+    each track ID's previous point and membership, kept in arrays indexed by
+    track ID, so a fish counts when it moves across a boundary rather than
+    whenever it happens to be past it.
+    """
+
+    def __init__(self, zones, capacity=256):
+        self.zones = zones
+        self.polygons = [zone for zone in zones if zone.kind == "polygon"]
+        self.lines = [zone for zone in zones if zone.kind == "line"]
+        if len(self.polygons) > 64:
+            raise ValueError("At most 64 polygon zones per camera are supported")
+        self.mask_dtype = next(dtype for dtype in (np.uint8, np.uint16, np.uint32, np.uint64)
+                               if len(self.polygons) <= np.iinfo(dtype).bits)
+        self.bits = np.left_shift(np.ones(len(self.polygons), dtype=self.mask_dtype),
+                                  np.arange(len(self.polygons), dtype=self.mask_dtype))
+        self.mask = None
+
+        self.prev_point = np.zeros((capacity, 2), dtype=np.float64)
+        self.prev_bits = np.zeros(capacity, dtype=self.mask_dtype)
+        self.has_prev = np.zeros(capacity, dtype=bool)
+
+        self.entered = {zone.name: 0 for zone in zones}
+        self.exited = {zone.name: 0 for zone in zones}
+        self.inside = {zone.name: 0 for zone in self.polygons}
+        self.crossed = []
+
+    def _prepare(self, shape):
+        """Rasterise the polygons for this frame size (only redone if the size changes)"""
+        if self.mask is not None and self.mask.shape == shape:
+            return
+        self.mask = np.zeros(shape, dtype=self.mask_dtype)
+        layer = np.zeros(shape, dtype=np.uint8)
+        for zone, bit in zip(self.polygons, self.bits):
+            layer[:] = 0
+            cv2.fillPoly(layer, [np.round(zone.points).astype(np.int32)], 1)
+            self.mask[layer.astype(bool)] |= bit
+
+    def _grow(self, max_id):
+        size = len(self.has_prev)
+        while size <= max_id:
+            size *= 2
+        pad = size - len(self.has_prev)
+        self.prev_point = np.concatenate([self.prev_point, np.zeros((pad, 2), dtype=np.float64)])
+        self.prev_bits = np.concatenate([self.prev_bits, np.zeros(pad, dtype=self.mask_dtype)])
+        self.has_prev = np.concatenate([self.has_prev, np.zeros(pad, dtype=bool)])
+
+    def update(self, detections, frame_shape):
+        """Update occupancy and crossings from one frame; returns the alerting zones crossed in it"""
+        height, width = frame_shape[:2]
+        self._prepare((height, width))
+        self.crossed = []
+
+        points = np.column_stack(((detections.xyxy[:, 0] + detections.xyxy[:, 2]) / 2, detections.xyxy[:, 3]))
+        xs = np.clip(points[:, 0].astype(np.int64), 0, width - 1)
+        ys = np.clip(points[:, 1].astype(np.int64), 0, height - 1)
+        box_bits = self.mask[ys, xs]
+
+        # (boxes, polygons) membership matrix
+        membership = (box_bits[:, None] & self.bits) != 0
+        for zone, count in zip(self.polygons, membership.sum(axis=0).tolist()):
+            self.inside[zone.name] = count
+
+        tracked = detections.ids >= 0
+        ids = detections.ids[tracked]
+        if len(ids) == 0:
+            return []
+        if ids.max() >= len(self.has_prev):
+            self._grow(ids.max())
+        points, box_bits, membership = points[tracked], box_bits[tracked], membership[tracked]
+        moved = self.has_prev[ids]
+
+        if self.polygons:
+            was_inside = (self.prev_bits[ids][:, None] & self.bits) != 0
+            entering = (membership & ~was_inside)[moved].sum(axis=0)
+            leaving = (was_inside & ~membership)[moved].sum(axis=0)
+            for zone, n_in, n_out in zip(self.polygons, entering.tolist(), leaving.tolist()):
+                self._count(zone, n_in, n_out)
+
+        if self.lines:
+            start, end = self.prev_point[ids][moved], points[moved]
+            for zone in self.lines:
+                a, b = zone.points
+                side_start = _side(a, b, start)
+                side_end = _side(a, b, end)
+                # The movement and the line segment must straddle each other
+                crosses = (side_start * side_end < 0) & (_side(start, end, a) * _side(start, end, b) <= 0)
+                self._count(zone, int(np.count_nonzero(crosses & (side_end > 0))),
+                            int(np.count_nonzero(crosses & (side_end < 0))))
+
+        self.prev_point[ids] = points
+        self.prev_bits[ids] = box_bits
+        self.has_prev[ids] = True
+        return [zone.name for zone in self.zones if zone.alert and zone.name in self.crossed]
+
+    def _count(self, zone, n_in, n_out):
+        self.entered[zone.name] += n_in
+        self.exited[zone.name] += n_out
+        if n_in or n_out:
+            self.crossed.append(zone.name)
+
+    def reset(self):
+        """Forget every trajectory (e.g. when the video loops) but keep the totals"""
+        self.has_prev[:] = False
+
+    def snapshot(self):
+        """Per-zone state for the analysis payload"""
+        return {
+            zone.name: {
+                "type": zone.kind,
+                "inside": self.inside.get(zone.name),
+                "entered": self.entered[zone.name],
+                "exited": self.exited[zone.name],
+                "crossed": zone.name in self.crossed,
+            }
+            for zone in self.zones
+        }
+
+
+def _side(a, b, points):
+    """Sign of the cross product (b - a) x (p - a) for each point p: >0 right of a->b in image coordinates"""
+    points = np.atleast_2d(points)
+    a = np.atleast_2d(a)
+    b = np.atleast_2d(b)
+    return np.sign((b[:, 0] - a[:, 0]) * (points[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (points[:, 0] - a[:, 0]))